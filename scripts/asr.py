@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Speech-to-Text Fallback
+Transcribes podcast episodes, and videos without captions, with a local
+CPU speech-to-text model (faster-whisper)
+
+Each episode's audio is downloaded and decoded to 16 kHz mono. Voice
+activity detection (VAD) finds the speech, and the speech is cut at pauses
+into chunks of up to CHUNK_SECONDS. The chunks are transcribed in parallel
+by a process pool with one model per process, so a long episode spreads
+over every core. Segment times are shifted back by each chunk's offset,
+and the result has the same schema (segments/full_text) that
+save_transcript writes for captions.
+
+While one episode's chunks are being transcribed, the next episode is
+downloaded and split. Attempts are recorded in their own ledger
+(data/cache/asr_attempts.json), so audio that can't be transcribed is
+retried with backoff like caption fetches are. Audio longer than
+MAX_AUDIO_SECONDS is rejected before it is decoded (from the episode's
+itunes:duration, yt-dlp's metadata or the downloaded file's header) and
+is not retried.
+
+faster-whisper (and yt-dlp for video audio) are optional and are only
+imported when this stage runs; see requirements-asr.txt.
+
+Usage:
+    python asr.py                    # transcribe up to ASR_MAX_ITEMS items
+    python asr.py --max-items 10 --workers 4
+"""
+
+import argparse
+import importlib.util
+import os
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import dedup
+import feed_store
+import http_client
+import metrics
+import storage
+import transcript
+import transcript_store
+from transcript_ledger import ERROR, NO_CAPTIONS, TOO_LONG, UNAVAILABLE, AttemptLedger
+
+# Paths
+SCRIPT_DIR = Path(__file__).parent
+DATA_DIR = SCRIPT_DIR.parent / "data"
+FEEDS_FILE = DATA_DIR / "feeds.json"
+TRANSCRIPTS_DIR = DATA_DIR / "transcripts"
+ATTEMPTS_FILE = DATA_DIR / "cache" / "asr_attempts.json"
+
+# Model settings (faster-whisper / CTranslate2)
+ASR_MODEL = os.environ.get("OASIS_ASR_MODEL", "small")
+ASR_COMPUTE_TYPE = "int8"
+ASR_LANGUAGE = os.environ.get("OASIS_ASR_LANGUAGE") or None  # None = detect per chunk
+ASR_BEAM_SIZE = 1  # Greedy decoding; beam search costs ~2x CPU for little gain on speech
+
+# Work settings
+ASR_WORKERS = max(1, os.cpu_count() or 1)  # Processes, one model each
+THREADS_PER_WORKER = 1  # CTranslate2 threads per process
+ASR_MAX_ITEMS = 3  # Items transcribed per run; ASR is slow, the rest wait for later runs
+MAX_AUDIO_SECONDS = 2 * 3600  # Decoded audio is held in memory: 2 h is ~460 MB of float32
+DOWNLOAD_TIMEOUT = 60
+DOWNLOAD_CHUNK = 1 << 20
+
+# Chunking
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 60.0  # Longest chunk; pauses between speech spans are the cut points
+MIN_SILENCE_MS = 500  # Pause length VAD treats as the end of a speech span
+SPEECH_PAD_MS = 200
+
+ledger = AttemptLedger(ATTEMPTS_FILE)
+
+
+class AudioTooLong(ValueError):
+    """Raised by prepare() for audio longer than MAX_AUDIO_SECONDS"""
+
+
+def plan_chunks(spans, max_samples):
+    """
+    Group speech spans into chunks, cutting only between spans
+
+    Args:
+        spans: [(start, end)] speech spans in samples, in order
+        max_samples: longest chunk; a longer single span is split evenly
+
+    Returns:
+        [(start, end)] chunks in samples
+    """
+    chunks = []
+    for start, end in spans:
+        if chunks and end - chunks[-1][0] <= max_samples:
+            chunks[-1] = (chunks[-1][0], end)
+            continue
+        # A span longer than a chunk is cut into equal parts
+        parts = max(1, -(-(end - start) // max_samples))
+        step = -(-(end - start) // parts)
+        for part_start in range(start, end, step):
+            chunks.append((part_start, min(end, part_start + step)))
+    return chunks
+
+
+# ---------- worker processes ----------
+
+_model = None
+
+
+def _init_worker(model_name, compute_type, cpu_threads):
+    """Load one model per process"""
+    global _model
+    from faster_whisper import WhisperModel
+    _model = WhisperModel(model_name, device="cpu", compute_type=compute_type,
+                          cpu_threads=cpu_threads, num_workers=1)
+
+
+def _transcribe_chunk(audio, offset, language=None, beam_size=ASR_BEAM_SIZE):
+    """
+    Transcribe one chunk of 16 kHz audio in a worker process
+
+    Returns:
+        (detected language, [{"start", "end", "text"}] with times shifted by offset)
+    """
+    segments, info = _model.transcribe(audio, language=language, beam_size=beam_size,
+                                       vad_filter=False, condition_on_previous_text=False)
+    result = []
+    for segment in segments:
+        text = segment.text.strip()
+        if text:
+            result.append({
+                "start": round(offset + segment.start, 2),
+                "end": round(offset + segment.end, 2),
+                "text": text,
+            })
+    return info.language, result
+
+
+# ---------- audio ----------
+
+def audio_source(item):
+    """
+    URL (and request headers) of an item's audio
+
+    Podcasts carry the enclosure URL; video audio is resolved with yt-dlp
+    if it is installed.
+
+    Returns:
+        (url, headers, duration in seconds or None), or (None, None, None)
+        if there is no audio to fetch
+    """
+    if item["platform"] == "podcast":
+        return item.get("url") or None, {}, item.get("duration")
+    try:
+        import yt_dlp
+    except ImportError:
+        return None, None, None
+    options = {"format": "bestaudio/best", "quiet": True, "no_warnings": True, "skip_download": True}
+    with yt_dlp.YoutubeDL(options) as ydl:
+        info = ydl.extract_info(item["url"], download=False)
+    return info.get("url"), info.get("http_headers") or {}, info.get("duration")
+
+
+def probe_duration(path):
+    """Duration of an audio file from its container header, or None (PyAV ships with faster-whisper)"""
+    try:
+        import av
+        with av.open(path) as container:
+            if container.duration:
+                return container.duration / av.time_base
+    except Exception:
+        pass
+    return None
+
+
+def check_duration(seconds):
+    """Raise AudioTooLong if a known duration is over MAX_AUDIO_SECONDS"""
+    if seconds and seconds > MAX_AUDIO_SECONDS:
+        raise AudioTooLong(f"audio is {seconds / 3600:.1f} h, longer than {MAX_AUDIO_SECONDS // 3600} h")
+
+
+def download_audio(url, headers):
+    """
+    Stream an audio file to a temp file (outside data/)
+
+    Returns:
+        path of the file
+
+    Raises:
+        ValueError if the URL isn't audio (e.g. an episode web page)
+    """
+    response = http_client.get_session().get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT)
+    with response:
+        response.raise_for_status()
+        if response.headers.get("Content-Type", "").startswith("text/"):
+            raise ValueError(f"not audio ({response.headers['Content-Type']})")
+        fd, path = tempfile.mkstemp(prefix="oasis-asr-", suffix=".audio")
+        size = 0
+        with os.fdopen(fd, "wb") as f:
+            for block in response.iter_content(DOWNLOAD_CHUNK):
+                f.write(block)
+                size += len(block)
+    metrics.incr("asr.download_bytes", size)
+    return path
+
+
+def prepare(item):
+    """
+    Download, decode and VAD-split an item's audio
+
+    Returns:
+        (audio, [(start, end)] chunks in samples)
+
+    Raises:
+        AudioTooLong if the audio is longer than MAX_AUDIO_SECONDS
+        ValueError if the item has no usable audio
+    """
+    from faster_whisper import decode_audio
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    url, headers, duration = audio_source(item)
+    if not url:
+        raise ValueError("no audio URL")
+    check_duration(duration)
+
+    with metrics.timer("asr.download", item["id"]):
+        path = download_audio(url, headers)
+    try:
+        # Decoded audio is held in memory, so reject long files before decoding
+        check_duration(probe_duration(path))
+        with metrics.timer("asr.decode", item["id"]):
+            audio = decode_audio(path, sampling_rate=SAMPLE_RATE)
+    finally:
+        os.unlink(path)
+
+    # Containers without a duration in the header
+    check_duration(len(audio) / SAMPLE_RATE)
+
+    with metrics.timer("asr.vad", item["id"]):
+        options = VadOptions(min_silence_duration_ms=MIN_SILENCE_MS, speech_pad_ms=SPEECH_PAD_MS)
+        spans = [(s["start"], s["end"]) for s in get_speech_timestamps(audio, options)]
+    if not spans:
+        raise ValueError("no speech found")
+    return audio, plan_chunks(spans, int(CHUNK_SECONDS * SAMPLE_RATE))
+
+
+def build_transcript(results, audio_seconds, model_name=ASR_MODEL):
+    """Transcript dict, same schema as the caption fetchers, from per-chunk results"""
+    segments = [segment for _, chunk_segments in results for segment in chunk_segments]
+    languages = Counter()
+    for language, chunk_segments in results:
+        languages[language] += sum(s["end"] - s["start"] for s in chunk_segments)
+    language = languages.most_common(1)[0][0] if languages else None
+
+    full_text = ' '.join(seg["text"] for seg in segments)
+    # Chinese has no spaces between words, count characters like Bilibili CC
+    word_count = len(full_text) if (language or "").startswith("zh") else len(full_text.split())
+    return {
+        "source": "asr",
+        "model": model_name,
+        "language": language,
+        "duration": round(audio_seconds, 2),
+        "full_text": full_text,
+        "segments": segments,
+        "word_count": word_count,
+        "fetched_at": datetime.utcnow().isoformat() + "Z",
+    }
+
+
+# ---------- stage ----------
+
+def candidates(items, caption_ledger=None, retry_all=False):
+    """
+    Items to transcribe, newest first: podcasts, and videos whose caption
+    fetch found no captions, that have no stored transcript yet
+
+    Duplicates follow the transcript stage's rule (see
+    dedup.covered_by_canonical), and one whose canonical item is itself
+    a candidate is left to it.
+    """
+    caption_ledger = caption_ledger or transcript.ledger
+    # Video audio needs yt-dlp
+    videos = importlib.util.find_spec("yt_dlp") is not None
+    by_id = {item["id"]: item for item in items}
+    selected = []
+    for item in items:
+        if dedup.covered_by_canonical(item, by_id, caption_ledger):
+            continue
+        if transcript_store.transcript_exists(TRANSCRIPTS_DIR, item["id"]):
+            continue
+        if (item.get("duration") or 0) > MAX_AUDIO_SECONDS:
+            continue
+        if item["platform"] != "podcast":
+            if not videos:
+                continue
+            entry = caption_ledger.get(item["id"])
+            if not entry or entry["reason"] != NO_CAPTIONS:
+                continue
+        if not retry_all and not ledger.is_due(item["id"]):
+            continue
+        selected.append(item)
+    selected_ids = {item["id"] for item in selected}
+    selected = [item for item in selected if item.get("duplicateOf") not in selected_ids]
+    selected.sort(key=lambda x: x.get("published", ""), reverse=True)
+    return selected
+
+
+def transcribe_items(items, workers=ASR_WORKERS, max_items=ASR_MAX_ITEMS, model_name=ASR_MODEL,
+                     on_transcript=None, caption_ledger=None, retry_all=False):
+    """
+    Transcribe candidate items with a process pool
+
+    Args:
+        items: feed items (candidates are picked from them)
+        on_transcript: optional callback(item, transcript_data), called after
+            each transcript is saved
+
+    Returns:
+        counts dict (transcribed, failed, unavailable, too_long, audio_seconds, seconds)
+    """
+    try:
+        import faster_whisper  # noqa: F401
+    except ImportError:
+        print("  ! faster-whisper not installed, skipping speech-to-text (pip install -r requirements-asr.txt)")
+        return {}
+
+    todo = candidates(items, caption_ledger, retry_all)[:max(0, max_items)]
+    counts = {"transcribed": 0, "failed": 0, UNAVAILABLE: 0, TOO_LONG: 0, "audio_seconds": 0.0, "seconds": 0.0}
+    if not todo:
+        return counts
+
+    print(f"Transcribing {len(todo)} items with {workers} ASR workers ({model_name})...")
+    started = time.perf_counter()
+    TRANSCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
+
+    def prepared(item):
+        """Prepared audio of an item, or None after recording why not"""
+        try:
+            return prepare(item)
+        except AudioTooLong as e:
+            ledger.record_failure(item["id"], TOO_LONG)
+            counts[TOO_LONG] += 1
+            print(f"  ✗ [asr] {(item.get('title') or item['id'])[:50]}: {e}")
+        except ValueError as e:
+            ledger.record_failure(item["id"], UNAVAILABLE)
+            counts[UNAVAILABLE] += 1
+            print(f"  ✗ [asr] {(item.get('title') or item['id'])[:50]}: {e}")
+        except Exception as e:
+            ledger.record_failure(item["id"], ERROR)
+            counts["failed"] += 1
+            print(f"  ✗ [asr] {(item.get('title') or item['id'])[:50]}: {e}")
+        return None
+
+    with ProcessPoolExecutor(max_workers=max(1, workers), initializer=_init_worker,
+                             initargs=(model_name, ASR_COMPUTE_TYPE, THREADS_PER_WORKER)) as pool:
+        # Submit an item's chunks, then prepare the next item while they run
+        queue = list(todo)
+        current = None
+        while queue or current:
+            if current is None:
+                item = queue.pop(0)
+                ready = prepared(item)
+                if ready is None:
+                    continue
+                current = (item, ready)
+
+            item, (audio, chunks) = current
+            item_start = time.perf_counter()
+            futures = [
+                pool.submit(_transcribe_chunk, audio[start:end], start / SAMPLE_RATE, ASR_LANGUAGE)
+                for start, end in chunks
+            ]
+
+            current = None
+            while queue and current is None:
+                upcoming = queue.pop(0)
+                ready = prepared(upcoming)
+                if ready is not None:
+                    current = (upcoming, ready)
+
+            title = (item.get("title") or item["id"])[:50]
+            try:
+                results = [future.result() for future in futures]
+            except Exception as e:
+                ledger.record_failure(item["id"], ERROR)
+                counts["failed"] += 1
+                print(f"  ✗ [asr] {title}: {e}")
+                continue
+
+            audio_seconds = len(audio) / SAMPLE_RATE
+            elapsed = time.perf_counter() - item_start
+            metrics.observe("asr.transcribe", elapsed, item["id"])
+            transcript_data = build_transcript(results, audio_seconds, model_name)
+            if not transcript_data["segments"]:
+                ledger.record_failure(item["id"], UNAVAILABLE)
+                counts[UNAVAILABLE] += 1
+                print(f"  ✗ [asr] {title}: no speech recognized")
+                continue
+
+            transcript_store.save_transcript(TRANSCRIPTS_DIR, item["id"], transcript_data)
+            ledger.record_success(item["id"])
+            counts["transcribed"] += 1
+            counts["audio_seconds"] += audio_seconds
+            if on_transcript is not None:
+                on_transcript(item, transcript_data)
+            print(f"  ✓ [asr] {title}: {transcript_data['word_count']} words, "
+                  f"{audio_seconds / 60:.0f} min audio in {elapsed:.0f}s ({len(chunks)} chunks)")
+
+    ledger.save()
+    counts["seconds"] = time.perf_counter() - started
+    if counts["audio_seconds"]:
+        print(f"ASR real-time factor: {counts['seconds'] / counts['audio_seconds']:.3f} "
+              f"({counts['seconds'] * workers / counts['audio_seconds']:.3f} per core)")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe podcasts and caption-less videos locally")
+    parser.add_argument("--workers", type=int, default=ASR_WORKERS,
+                        help=f"ASR processes (default: {ASR_WORKERS})")
+    parser.add_argument("--max-items", type=int, default=ASR_MAX_ITEMS,
+                        help=f"items transcribed in this run (default: {ASR_MAX_ITEMS})")
+    parser.add_argument("--model", default=ASR_MODEL, help=f"faster-whisper model (default: {ASR_MODEL})")
+    parser.add_argument("--retry-all", action="store_true", help="ignore the backoff of failed items")
+    args = parser.parse_args()
+
+    feeds = storage.read_json(FEEDS_FILE)
+    if feeds is None:
+        print("No feeds.json found. Run fetch_all.py first.")
+        return
+
+    print("=" * 50)
+    print("Oasis Speech-to-Text")
+    print("=" * 50)
+
+    updates = {}
+
+    def on_transcript(item, transcript_data):
+        transcript.update_feed_with_transcript(updates, item["id"], transcript_data)
+
+    counts = transcribe_items(feeds.get("items", []), workers=args.workers, max_items=args.max_items,
+                              model_name=args.model, on_transcript=on_transcript,
+                              caption_ledger=transcript.ledger, retry_all=args.retry_all)
+    feed_store.update_feeds(updates, FEEDS_FILE)
+
+    metrics.add_counters("asr", counts)
+    metrics.write_run("asr", {"workers": args.workers, "model": args.model})
+
+
+if __name__ == "__main__":
+    main()
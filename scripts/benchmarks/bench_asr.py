@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: speech-to-text real-time factor vs. number of worker processes
+
+Decodes an audio file, splits it into VAD chunks like asr.py does and
+transcribes the chunks with 1..N worker processes. Reports wall-clock
+real-time factor (RTF = processing seconds / audio seconds) and RTF per
+core (core-seconds per audio second; flat means linear scaling). The
+first row transcribes the whole clip in one call, as a single process
+would without chunking. Model loading is excluded from the timings.
+
+Needs faster-whisper (requirements-asr.txt) and a speech recording.
+
+Usage (from scripts/):
+    python -m benchmarks.bench_asr --audio episode.mp3 [--seconds 300] [--workers 1,2,4] [--model small]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import asr
+
+
+def run_pool(audio, chunks, workers, model):
+    """Seconds to transcribe all chunks with a pool of warmed-up workers"""
+    with ProcessPoolExecutor(max_workers=workers, initializer=asr._init_worker,
+                             initargs=(model, asr.ASR_COMPUTE_TYPE, asr.THREADS_PER_WORKER)) as pool:
+        # One short chunk per worker loads every model before timing
+        warmup = audio[:asr.SAMPLE_RATE]
+        wait([pool.submit(asr._transcribe_chunk, warmup, 0.0, "en") for _ in range(workers)])
+
+        start = time.perf_counter()
+        futures = [pool.submit(asr._transcribe_chunk, audio[s:e], s / asr.SAMPLE_RATE, asr.ASR_LANGUAGE)
+                   for s, e in chunks]
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+    return elapsed, results
+
+
+def run_single(audio, model):
+    """Seconds to transcribe the whole clip in one call (no chunking, VAD inside the call)"""
+    asr._init_worker(model, asr.ASR_COMPUTE_TYPE, asr.THREADS_PER_WORKER)
+    start = time.perf_counter()
+    segments, _ = asr._model.transcribe(audio, language=asr.ASR_LANGUAGE, beam_size=asr.ASR_BEAM_SIZE,
+                                        vad_filter=True)
+    words = sum(len(segment.text.split()) for segment in segments)
+    return time.perf_counter() - start, words
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--audio", required=True, help="audio file with speech (mp3/m4a/wav)")
+    parser.add_argument("--seconds", type=float, default=300, help="length of the clip to use")
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}", help="comma separated pool sizes")
+    parser.add_argument("--model", default=asr.ASR_MODEL, help="faster-whisper model")
+    args = parser.parse_args()
+
+    try:
+        from faster_whisper import decode_audio
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+    except ImportError:
+        sys.exit("faster-whisper is not installed (pip install -r requirements-asr.txt)")
+
+    start = time.perf_counter()
+    audio = decode_audio(args.audio, sampling_rate=asr.SAMPLE_RATE)[:int(args.seconds * asr.SAMPLE_RATE)]
+    decoded = time.perf_counter()
+    options = VadOptions(min_silence_duration_ms=asr.MIN_SILENCE_MS, speech_pad_ms=asr.SPEECH_PAD_MS)
+    spans = [(s["start"], s["end"]) for s in get_speech_timestamps(audio, options)]
+    chunks = asr.plan_chunks(spans, int(asr.CHUNK_SECONDS * asr.SAMPLE_RATE))
+    split = time.perf_counter()
+
+    seconds = len(audio) / asr.SAMPLE_RATE
+    print(f"{seconds:.0f}s audio, {len(chunks)} chunks, model {args.model}, "
+          f"decode {decoded - start:.2f}s, VAD {split - decoded:.2f}s, {os.cpu_count()} cores")
+    print(f"{'run':>16} {'wall':>9} {'RTF':>7} {'RTF/core':>9} {'words':>7}")
+
+    elapsed, words = run_single(audio, args.model)
+    print(f"{'single call':>16} {elapsed:>8.1f}s {elapsed / seconds:>7.3f} {elapsed / seconds:>9.3f} {words:>7}")
+
+    for workers in map(int, args.workers.split(",")):
+        elapsed, results = run_pool(audio, chunks, workers, args.model)
+        words = len(asr.build_transcript(results, seconds, args.model)["full_text"].split())
+        print(f"{f'{workers} workers':>16} {elapsed:>8.1f}s {elapsed / seconds:>7.3f} "
+              f"{elapsed * workers / seconds:>9.3f} {words:>7}")
+
+
+if __name__ == "__main__":
+    main()
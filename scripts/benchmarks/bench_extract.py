@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-entry extraction cost before and after fetchers.utils
+
+Times the per-entry work the fetchers do (published date, HTML cleanup,
+image/ID extraction) with the previous inline implementations (dateutil,
+ad-hoc re calls, chained str.replace) and with the shared helpers.
+
+Usage (from scripts/):
+    python -m benchmarks.bench_extract [--entries 2000]
+"""
+
+import argparse
+import re
+import time
+
+from dateutil import parser as date_parser
+
+from fetchers import utils
+
+RFC822_DATES = [f"Mon, {d:02d} Jun 2026 0{d % 10}:15:00 +0000" for d in range(1, 29)]
+GMT_DATES = [f"Tue, {d:02d} Jun 2026 12:00:00 GMT" for d in range(1, 29)]
+ISO_DATES = [f"2026-06-{d:02d}T08:00:00+00:00" for d in range(1, 29)]
+
+TWEET_HTML = (
+    '<p>Shipping a new <a href="https://example.com">agent</a> release today &amp; the '
+    'benchmarks look &quot;great&quot; &#39;so far&#39;</p>\n\n<p>More soon &gt;&gt;</p>'
+    '<img src="https://pbs.twimg.com/media/abc.jpg" /><img src="https://example.com/x.png" />'
+)
+SHOW_NOTES = ("<p>We talk about <b>compute</b>, <i>open models</i> and startups.</p>\n  " * 30)
+BILI_DESC = '<img src="//i0.hdslb.com/bfs/archive/cover.jpg"><br>视频简介 ' * 3
+BILI_LINK = "https://www.bilibili.com/video/BV1xx411c7mD"
+
+
+def legacy_published(value):
+    try:
+        return date_parser.parse(value).isoformat()
+    except Exception:
+        return None
+
+
+def legacy_clean_content(html):
+    text = re.sub(r'<[^>]+>', '', html)
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = text.replace('&amp;', '&')
+    text = text.replace('&lt;', '<')
+    text = text.replace('&gt;', '>')
+    text = text.replace('&quot;', '"')
+    text = text.replace('&#39;', "'")
+    return text
+
+
+def legacy_images(html):
+    return [m.group(1) for m in re.finditer(r'<img[^>]+src=["\']([^"\']+)["\']', html)]
+
+
+def legacy_bvid(url):
+    match = re.search(r'BV[\w]+', url)
+    return match.group(0) if match else None
+
+
+def new_images(html):
+    return [m.group(1) for m in utils.IMG_SRC_RE.finditer(html)]
+
+
+def new_bvid(url):
+    match = utils.BVID_RE.search(url)
+    return match.group(0) if match else None
+
+
+CASES = [
+    ("date rfc822 +0000", RFC822_DATES, legacy_published, utils.published_iso),
+    ("date rfc822 GMT", GMT_DATES, legacy_published, utils.published_iso),
+    ("date iso8601", ISO_DATES, legacy_published, utils.published_iso),
+    ("tweet html->text", [TWEET_HTML], legacy_clean_content, utils.html_to_text),
+    ("show notes html->text", [SHOW_NOTES], legacy_clean_content, utils.html_to_text),
+    ("img src", [TWEET_HTML, BILI_DESC], legacy_images, new_images),
+    ("bvid", [BILI_LINK], legacy_bvid, new_bvid),
+]
+
+
+def per_call(func, inputs, entries):
+    """Microseconds per call over `entries` calls"""
+    start = time.perf_counter()
+    for i in range(entries):
+        func(inputs[i % len(inputs)])
+    return (time.perf_counter() - start) / entries * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=2000, help="calls timed per case")
+    args = parser.parse_args()
+
+    print(f"{'case':>22} {'before':>10} {'after':>10} {'speedup':>8}")
+    for name, inputs, before, after in CASES:
+        old = per_call(before, inputs, args.entries)
+        new = per_call(after, inputs, args.entries)
+        print(f"{name:>22} {old:>8.1f}us {new:>8.1f}us {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming feed parser vs. feedparser on large feeds
+
+Generates podcast feeds with many long-show-note episodes and a YouTube
+Atom feed, and compares parse time and peak memory of feedparser (whole
+document) with fetchers.feed_stream (first 10 entries). The fields the
+fetchers read are checked to be identical for both parsers.
+
+Usage (from scripts/):
+    python -m benchmarks.bench_feed_parse [--episodes 50,200,500] [--repeat 3]
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+
+import feedparser
+
+from fetchers import feed_stream
+
+LIMIT = 10
+FIELDS = ["id", "link", "title", "published", "summary", "itunes_duration", "yt_videoid"]
+
+NOTES = (
+    "<p>In this episode we talk about <b>compute</b>, <a href=\"https://example.com\">open models</a> "
+    "and what it takes to build a startup in 2026 &amp; beyond.</p>"
+) * 20
+
+
+def make_podcast(episodes):
+    """Podcast RSS with iTunes tags and ~3 KB of HTML show notes per episode"""
+    items = []
+    for i in range(episodes):
+        items.append(f"""
+    <item>
+      <title>Episode {i}: the future of agents</title>
+      <guid isPermaLink="false">ep-{i}-guid</guid>
+      <link>https://example.com/ep/{i}</link>
+      <pubDate>Mon, {i % 28 + 1:02d} Jun 2026 08:00:00 +0000</pubDate>
+      <description><![CDATA[{NOTES}]]></description>
+      <content:encoded><![CDATA[{NOTES}{NOTES}]]></content:encoded>
+      <enclosure url="https://cdn.example.com/ep/{i}.mp3" type="audio/mpeg" length="52428800"/>
+      <itunes:duration>01:{i % 60:02d}:30</itunes:duration>
+      <itunes:image href="https://cdn.example.com/ep/{i}.jpg"/>
+    </item>""")
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd"
+     xmlns:content="http://purl.org/rss/1.0/modules/content/">
+  <channel>
+    <title>Bench Podcast</title>
+    <link>https://example.com</link>
+    <description>Benchmark feed</description>
+    <image><url>https://cdn.example.com/cover.jpg</url><title>Bench</title><link>https://example.com</link></image>
+    <itunes:image href="https://cdn.example.com/cover.jpg"/>{"".join(items)}
+  </channel>
+</rss>""".encode("utf-8")
+
+
+def make_youtube(entries=15):
+    """YouTube channel Atom feed"""
+    parts = []
+    for i in range(entries):
+        vid = f"vid{i:08d}"
+        parts.append(f"""
+  <entry>
+    <id>yt:video:{vid}</id>
+    <yt:videoId>{vid}</yt:videoId>
+    <yt:channelId>UCbench</yt:channelId>
+    <title>Video {i}: scaling laws</title>
+    <link rel="alternate" href="https://www.youtube.com/watch?v={vid}"/>
+    <author><name>Bench</name><uri>https://www.youtube.com/channel/UCbench</uri></author>
+    <published>2026-06-{i % 28 + 1:02d}T08:00:00+00:00</published>
+    <updated>2026-06-{i % 28 + 1:02d}T09:00:00+00:00</updated>
+    <media:group>
+      <media:title>Video {i}: scaling laws</media:title>
+      <media:content url="https://www.youtube.com/v/{vid}?version=3" type="application/x-shockwave-flash" width="640" height="390"/>
+      <media:thumbnail url="https://i1.ytimg.com/vi/{vid}/hqdefault.jpg" width="480" height="360"/>
+      <media:description>Description of video {i}</media:description>
+    </media:group>
+  </entry>""")
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns:media="http://search.yahoo.com/mrss/"
+      xmlns="http://www.w3.org/2005/Atom">
+  <title>Bench</title>{"".join(parts)}
+</feed>""".encode("utf-8")
+
+
+def measure(func, repeat):
+    """Median seconds and peak traced memory (bytes) of func()"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def check_same(content):
+    """Assert both parsers yield the same fields for the first LIMIT entries"""
+    full = feedparser.parse(content)
+    fast = feed_stream.parse(content, LIMIT)
+    assert fast is not None, "streaming parser rejected the feed"
+    for a, b in zip(full.entries[:LIMIT], fast.entries):
+        for field in FIELDS:
+            assert a.get(field) == b.get(field), (field, a.get(field), b.get(field))
+        assert [e.get("href") for e in a.get("enclosures", [])] == [e.get("href") for e in b.get("enclosures", [])]
+        assert (a.get("image") or {}).get("href") == (b.get("image") or {}).get("href")
+    assert full.feed.get("image", {}).get("href") == fast.feed.get("image", {}).get("href")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--episodes", default="50,200,500", help="comma separated podcast sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per parser")
+    args = parser.parse_args()
+
+    feeds = [("youtube (15)", make_youtube())]
+    feeds += [(f"podcast ({n})", make_podcast(n)) for n in map(int, args.episodes.split(","))]
+
+    print(f"{'feed':>16} {'size':>8} {'feedparser':>12} {'stream':>10} {'speedup':>8} {'peak mem':>20}")
+    for name, content in feeds:
+        check_same(content)
+        slow, slow_mem = measure(lambda: feedparser.parse(content), args.repeat)
+        fast, fast_mem = measure(lambda: feed_stream.parse(content, LIMIT), args.repeat)
+        print(f"{name:>16} {len(content) / 1e6:>6.1f}MB {slow * 1000:>10.1f}ms {fast * 1000:>8.1f}ms "
+              f"{slow / fast:>7.1f}x {slow_mem / 1e6:>8.1f}MB -> {fast_mem / 1e6:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
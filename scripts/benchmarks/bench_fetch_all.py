@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fetch_all wall time vs. number of sources
+
+Serves fake podcast feeds from a local server with a fixed per-request
+latency and compares sequential fetching with the concurrent pool.
+
+Usage (from scripts/):
+    python -m benchmarks.bench_fetch_all [--latency 0.2] [--workers 8]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from benchmarks.fake_server import FakeServer
+from fetch_all import fetch_all
+
+
+def make_sources(server, count):
+    """Build podcast sources pointing at the fake server"""
+    return [
+        {
+            "id": f"bench_{i}",
+            "name": f"Bench {i}",
+            "platform": "podcast",
+            "feed_url": server.url(f"/feed/{i}.xml"),
+            "domains": ["Tech"],
+        }
+        for i in range(count)
+    ]
+
+
+def time_fetch(sources, workers, host_limit):
+    """Run fetch_all quietly and return (seconds, item count)"""
+    host = sources[0]["feed_url"].split("/")[2]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        items = fetch_all(sources=sources, workers=workers, host_limits={host: host_limit})
+    return time.perf_counter() - start, len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.2, help="per-request latency in seconds")
+    parser.add_argument("--workers", type=int, default=8, help="worker pool size for the concurrent run")
+    parser.add_argument("--sizes", default="5,10,20,40", help="comma separated source counts")
+    args = parser.parse_args()
+
+    sizes = [int(n) for n in args.sizes.split(",")]
+
+    print(f"Latency per request: {args.latency * 1000:.0f} ms, workers: {args.workers}")
+    print(f"{'sources':>8} {'sequential':>12} {'concurrent':>12} {'speedup':>8}")
+
+    with FakeServer(latency=args.latency) as server:
+        for size in sizes:
+            sources = make_sources(server, size)
+            seq, seq_items = time_fetch(sources, workers=1, host_limit=1)
+            par, par_items = time_fetch(sources, workers=args.workers, host_limit=args.workers)
+            assert seq_items == par_items, "concurrent run returned a different item count"
+            print(f"{size:>8} {seq:>11.2f}s {par:>11.2f}s {seq / par:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: search index build time and query latency vs. corpus size
+
+Builds in-memory indexes over synthetic items with mixed English/Chinese
+transcripts and times a fixed set of queries against each.
+
+Usage (from scripts/):
+    python -m benchmarks.bench_search [--sizes 100,500,2000] [--segments 200]
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from search_index import SearchIndex
+
+WORDS = (
+    "model agent training data startup founder market product growth compute "
+    "inference reactor energy policy chip design code open source research "
+    "language vision robot scale network capital customer revenue team"
+).split()
+HANZI = "人工智能模型训练数据创业市场产品增长算力推理能源政策芯片设计代码开源研究语言视觉机器规模网络资本客户收入团队"
+
+QUERIES = ["agent", "open source", "startup founder market", "人工智能", "芯片设计", "model 训练"]
+
+
+def make_item(rng, i, segments):
+    """Synthetic feed item with a transcript of `segments` segments"""
+    transcript = {"segments": []}
+    for s in range(segments):
+        if rng.random() < 0.5:
+            text = " ".join(rng.choice(WORDS) for _ in range(10))
+        else:
+            start = rng.randrange(len(HANZI) - 12)
+            text = HANZI[start:start + 12]
+        transcript["segments"].append({"start": s * 4.0, "end": s * 4.0 + 4.0, "text": text})
+    item = {
+        "id": f"bench_{i}",
+        "title": " ".join(rng.choice(WORDS) for _ in range(6)),
+        "source": f"Source {i % 30}",
+        "platform": "youtube",
+        "published": f"2026-01-{i % 28 + 1:02d}",
+    }
+    return item, transcript
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="100,500,2000", help="comma separated item counts")
+    parser.add_argument("--segments", type=int, default=200, help="transcript segments per item")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'items':>7} {'tokens':>10} {'terms':>7} {'build':>8} {'p50 query':>10} {'p95 query':>10}")
+
+    for size in [int(n) for n in args.sizes.split(",")]:
+        corpus = [make_item(rng, i, args.segments) for i in range(size)]
+
+        index = SearchIndex()
+        start = time.perf_counter()
+        for item, transcript in corpus:
+            index.add(item, transcript)
+        build = time.perf_counter() - start
+
+        latencies = []
+        for _ in range(args.repeat):
+            for query in QUERIES:
+                start = time.perf_counter()
+                index.search(query)
+                latencies.append(time.perf_counter() - start)
+
+        latencies.sort()
+        tokens = sum(meta["bounds"][-1] for meta in index.docs.values())
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f"{size:>7} {tokens:>10} {len(index.postings):>7} {build:>7.2f}s "
+              f"{statistics.median(latencies) * 1000:>8.2f}ms {p95 * 1000:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
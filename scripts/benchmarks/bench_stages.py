@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Benchmark: throughput and latency of the fetch, transcript and summary stages
+
+Runs fetch_all, fetch_all_transcripts and generate_all_summaries offline
+against a local server (see fake_apis): recorded feeds for every fetcher,
+the Bilibili subtitle APIs and the GLM chat endpoint, with configurable
+latency and a fraction of requests answered with 429. Each row runs in a
+fresh scratch data directory, so caches and the attempt ledger start
+empty. Transcripts are synthetic, from 1 minute to 5 hours by default.
+
+Columns: wall time, items per second, p50/p95 latency per unit of work
+(a source, a video's transcript, an item's summary), requests the server
+saw, client retries and injected 429s.
+
+Only Bilibili transcripts are fetched; YouTube captions go through
+youtube-transcript-api, which can't be pointed at a local server.
+
+Usage (from scripts/):
+    python -m benchmarks.bench_stages [--stage all] [--latency 0.1] [--rate-limit 0.05]
+    python -m benchmarks.bench_stages --stage summary --durations 60,3600,18000 --llm-latency 2
+"""
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+
+import http_client
+import metrics
+import storage
+import summarize
+import transcript
+import transcript_store
+from benchmarks import fake_apis
+from benchmarks.fake_server import FakeServer
+from fetch_all import MAX_WORKERS, fetch_all
+
+COLUMNS = f"{'':>14} {'items':>6} {'wall':>8} {'items/s':>8} {'p50':>7} {'p95':>7} " \
+          f"{'requests':>9} {'retries':>8} {'429s':>5}"
+
+
+def format_duration(seconds):
+    """60 -> 1m, 18000 -> 5h"""
+    if seconds >= 3600 and seconds % 3600 == 0:
+        return f"{seconds // 3600}h"
+    if seconds >= 60 and seconds % 60 == 0:
+        return f"{seconds // 60}m"
+    return f"{seconds}s"
+
+
+def make_items(seconds, count):
+    """count Bilibili feed items standing for videos of the given length"""
+    items = []
+    for i in range(count):
+        bvid = f"BV1bench{seconds}x{i}"
+        items.append({
+            "id": f"bl_{bvid}",
+            "source": "Bench",
+            "sourceId": "bench",
+            "platform": "bilibili",
+            "domains": ["Tech"],
+            "title": f"Benchmark video {format_duration(seconds)} #{i}",
+            "url": f"https://www.bilibili.com/video/{bvid}",
+            "published": "2026-05-01T00:00:00Z",
+            "hasTranscript": False,
+            "transcriptPreview": None,
+        })
+    return items
+
+
+def write_feeds(items):
+    """Write feeds.json of the current sandbox"""
+    storage.write_json(transcript.FEEDS_FILE, {"last_updated": "2026-05-01T00:00:00Z", "items": items})
+
+
+def measure(server, run, verbose=False):
+    """
+    Run one stage with fresh metrics, quietly unless verbose
+
+    Returns:
+        (seconds, run's return value, metrics snapshot, server requests,
+        client retries, injected 429s)
+    """
+    requests_before, throttled_before = server.requests, server.throttled
+    retries_before = http_client.stats()["retries"]
+    metrics.reset()
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+    return (elapsed, result, metrics.snapshot(), server.requests - requests_before,
+            http_client.stats()["retries"] - retries_before, server.throttled - throttled_before)
+
+
+def report(label, items, elapsed, timing, requests, retries, throttled):
+    """Print one row; timing is a metrics timing summary (p50/p95)"""
+    timing = timing or metrics.summarize_timings([])
+    rate = items / elapsed if elapsed else 0.0
+    print(f"{label:>14} {items:>6} {elapsed:>7.2f}s {rate:>8.1f} {timing['p50']:>6.2f}s "
+          f"{timing['p95']:>6.2f}s {requests:>9} {retries:>8} {throttled:>5}")
+
+
+def bench_fetch(server, args):
+    """fetch_all over growing numbers of sources"""
+    print(f"\n[fetch] latency {args.latency * 1000:.0f} ms, {args.workers} workers; "
+          f"p50/p95 per source")
+    print(COLUMNS)
+    for count in map(int, args.sources.split(",")):
+        sources = fake_apis.make_sources(server, count)
+        with tempfile.TemporaryDirectory() as directory, fake_apis.sandbox(server, directory):
+            elapsed, items, snapshot, requests, retries, throttled = measure(
+                server, lambda: fetch_all(sources=sources, workers=args.workers,
+                                          host_limits={server.host: args.workers}),
+                args.verbose)
+        # Every source is fetched once, so each source.* timing has one value
+        timing = metrics.summarize_timings(
+            [t["total"] for name, t in snapshot["timings"].items() if name.startswith("source.")])
+        report(f"{count} sources", len(items), elapsed, timing, requests, retries, throttled)
+
+
+def bench_transcripts(server, args, videos):
+    """fetch_all_transcripts for videos of each duration"""
+    print(f"\n[transcript] latency {args.latency * 1000:.0f} ms, {args.transcript_workers} workers, "
+          f"{args.items} videos per length; p50/p95 per video")
+    print(COLUMNS)
+    for seconds in args.durations:
+        items = make_items(seconds, args.items)
+        videos.clear()
+        videos.update({
+            item["id"][len("bl_"):]: fake_apis.make_transcript(seconds, seed=i)
+            for i, item in enumerate(items)
+        })
+        with tempfile.TemporaryDirectory() as directory, fake_apis.sandbox(server, directory):
+            write_feeds(items)
+            elapsed, _, snapshot, requests, retries, throttled = measure(
+                server, lambda: transcript.fetch_all_transcripts(workers=args.transcript_workers),
+                args.verbose)
+        fetched = snapshot["counters"].get("transcripts.fetched", 0)
+        report(format_duration(seconds), fetched, elapsed, snapshot["timings"].get("transcript.bilibili"),
+               requests, retries, throttled)
+
+
+def bench_summaries(server, args):
+    """generate_all_summaries for transcripts of each duration"""
+    print(f"\n[summary] LLM latency {args.llm_latency:.1f}s + {args.llm_per_kchar:.2f}s/kchar, "
+          f"{args.max_in_flight} in flight, {args.items} items per length; p50/p95 per item")
+    print(COLUMNS)
+    for seconds in args.durations:
+        items = make_items(seconds, args.items)
+        with tempfile.TemporaryDirectory() as directory, fake_apis.sandbox(server, directory):
+            for i, item in enumerate(items):
+                transcript_store.save_transcript(summarize.TRANSCRIPTS_DIR, item["id"],
+                                                 fake_apis.make_transcript(seconds, seed=i))
+                item["hasTranscript"] = True
+            write_feeds(items)
+            elapsed, _, snapshot, requests, retries, throttled = measure(
+                server, lambda: summarize.generate_all_summaries(max_in_flight=args.max_in_flight),
+                args.verbose)
+        generated = snapshot["counters"].get("summaries.generated", 0)
+        report(format_duration(seconds), generated, elapsed, snapshot["timings"].get("summary.generate"),
+               requests, retries, throttled)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--stage", choices=["fetch", "transcript", "summary", "all"], default="all")
+    parser.add_argument("--latency", type=float, default=0.1, help="feed/API latency in seconds")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="base GLM latency in seconds")
+    parser.add_argument("--llm-per-kchar", type=float, default=0.02,
+                        help="extra GLM latency per 1000 prompt characters")
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                        help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of injected 429s")
+    parser.add_argument("--sources", default="8,40", help="comma separated source counts (fetch)")
+    parser.add_argument("--durations", default="60,600,3600,18000",
+                        help="comma separated video lengths in seconds (transcript, summary)")
+    parser.add_argument("--items", type=int, default=4, help="videos per length")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="fetch_all workers")
+    parser.add_argument("--transcript-workers", type=int, default=transcript.MAX_WORKERS)
+    parser.add_argument("--max-in-flight", type=int, default=summarize.MAX_IN_FLIGHT)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the 429 injection")
+    parser.add_argument("--verbose", action="store_true", help="show the stages' own output")
+    args = parser.parse_args()
+    args.durations = [int(s) for s in args.durations.split(",")]
+
+    videos = {}
+    with FakeServer(latency=args.latency, error_rate=args.rate_limit,
+                    retry_after=args.retry_after, seed=args.seed) as server:
+        fake_apis.add_feed_routes(server)
+        fake_apis.add_bilibili_api(server, videos)
+        fake_apis.add_glm_api(server, args.llm_latency, args.llm_per_kchar)
+
+        if args.rate_limit:
+            print(f"Injecting 429 (Retry-After {args.retry_after:g}s) on {args.rate_limit:.0%} of requests")
+        if args.stage in ("fetch", "all"):
+            bench_fetch(server, args)
+        if args.stage in ("transcript", "all"):
+            bench_transcripts(server, args, videos)
+        if args.stage in ("summary", "all"):
+            bench_summaries(server, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Fake Remote APIs
+Offline stand-ins for everything the pipeline talks to, served by
+FakeServer: recorded feeds for every fetcher, the Bilibili view/player/
+subtitle APIs and the Zhipu GLM chat endpoint. sandbox() points the
+pipeline modules at the server and at a temporary data directory.
+
+Feed fixtures live in benchmarks/fixtures/ and are real feed layouts
+(YouTube Atom, RSSHub, Nitter, iTunes podcast) with "__N__" in place of
+the channel/user id, so every fake source returns distinct items.
+"""
+
+import json
+import random
+import re
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import feed_store
+import metrics
+import summarize
+import transcript
+from fetchers import bilibili, http_cache, twitter, youtube
+from fetchers.health import HealthTable
+from transcript_ledger import AttemptLedger
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+SEGMENT_SECONDS = 4.0  # Caption length of synthetic transcripts
+GLM_PATH = "/api/paas/v4/chat/completions"
+
+PHRASES = {
+    "zh": [
+        "我们先来看一下这个问题的背景", "其实成本下降的速度比大家想象的要快", "这里有一个非常关键的数据",
+        "很多创业公司在这一步就放弃了", "模型的能力边界还在不断扩展", "所以我觉得接下来一年会很不一样",
+        "从工程角度看这件事并不简单", "用户真正关心的是能不能解决问题", "我们内部做过一次很大的评测",
+        "算力仍然是最主要的瓶颈之一",
+    ],
+    "en": [
+        "so the first thing to understand is where the costs actually come from",
+        "and honestly nobody expected the quality to improve this quickly",
+        "we ran a pretty large internal evaluation on exactly this question",
+        "the bottleneck right now is still compute and power, not ideas",
+        "what users care about is whether it solves their problem end to end",
+        "a lot of founders give up right at this step, which is a mistake",
+        "if you look at the numbers from last year the trend is very clear",
+        "I think the next twelve months will look very different from the last",
+    ],
+}
+
+CHUNK_RE = re.compile(r"（(\d+)-(\d+)秒）")
+CANDIDATE_RE = re.compile(r"^\d+\. \[", re.MULTILINE)
+MARKER_RE = re.compile(r"^\[(\d+):(\d{2})\]", re.MULTILINE)  # summarize.format_timestamp()
+
+
+@lru_cache(maxsize=None)
+def _fixture(name):
+    return (FIXTURES_DIR / name).read_bytes()
+
+
+def load_fixture(name, token):
+    """A recorded feed with its "__N__" placeholders replaced by token"""
+    return _fixture(name).replace(b"__N__", str(token).encode("utf-8"))
+
+
+def make_transcript(seconds, lang="zh", seed=0):
+    """
+    Synthetic transcript of a video of the given length
+
+    Segments are SEGMENT_SECONDS long with speech-like text in the given
+    language ("zh" or "en"), in the format the transcript fetchers return.
+    """
+    rng = random.Random(seed)
+    phrases = PHRASES[lang]
+    segments = []
+    start = 0.0
+    while start < seconds:
+        end = min(seconds, start + SEGMENT_SECONDS)
+        segments.append({"start": round(start, 2), "end": round(end, 2), "text": rng.choice(phrases)})
+        start = end
+
+    separator = "" if lang == "zh" else " "
+    full_text = separator.join(seg["text"] for seg in segments)
+    return {
+        "source": "synthetic",
+        "language": lang,
+        "full_text": full_text,
+        "segments": segments,
+        "word_count": len(full_text) if lang == "zh" else len(full_text.split()),
+        "fetched_at": datetime.utcnow().isoformat() + "Z",
+    }
+
+
+def _json(data, status=200):
+    return status, "application/json", json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+def _token(path):
+    """Last path component without its extension ("/youtube/7.xml" -> "7")"""
+    return urlparse(path).path.rsplit("/", 1)[-1].split(".")[0]
+
+
+def add_feed_routes(server):
+    """Serve the recorded feed of every fetcher"""
+    for prefix, name in (("/youtube/", "youtube.xml"), ("/rsshub/", "bilibili.xml"),
+                         ("/nitter/", "nitter.xml"), ("/podcast/", "podcast.xml")):
+        server.route("GET", prefix, lambda path, body, name=name: (
+            200, "application/xml; charset=utf-8", load_fixture(name, _token(path))))
+
+
+def make_sources(server, count):
+    """count fake sources, spread evenly over the platforms, served by add_feed_routes()"""
+    sources = []
+    for i in range(count):
+        platform = ("youtube", "bilibili", "x", "podcast")[i % 4]
+        source = {"id": f"bench_{platform}_{i}", "name": f"Bench {platform} {i}",
+                  "platform": platform, "domains": ["Tech"]}
+        if platform == "youtube":
+            source["channel_id"] = str(i)
+        elif platform == "bilibili":
+            source["uid"] = str(i)
+        elif platform == "x":
+            source["username"] = str(i)
+        else:
+            source["feed_url"] = server.url(f"/podcast/{i}.xml")
+        sources.append(source)
+    return sources
+
+
+def add_bilibili_api(server, videos):
+    """
+    Serve the Bilibili view, player/v2 and subtitle APIs
+
+    Args:
+        videos: dict of bvid -> transcript (see make_transcript); read on
+            every request, so the caller can change it between runs.
+            Unknown bvids get the "video not found" code.
+    """
+    subtitles = {}
+
+    def view(path, body):
+        bvid = parse_qs(urlparse(path).query).get("bvid", [""])[0]
+        if bvid not in videos:
+            return _json({"code": -404, "message": "啥都木有"})
+        number = sum(map(ord, bvid))
+        return _json({"code": 0, "data": {"bvid": bvid, "aid": number, "cid": number * 10}})
+
+    def player(path, body):
+        bvid = parse_qs(urlparse(path).query).get("bvid", [""])[0]
+        tracks = []
+        if videos.get(bvid, {}).get("segments"):
+            tracks.append({"lan": videos[bvid]["language"], "lan_doc": "中文（自动生成）",
+                           "subtitle_url": server.url(f"/bilibili/subtitle/{bvid}.json")})
+        return _json({"code": 0, "data": {"subtitle": {"subtitles": tracks}}})
+
+    def subtitle(path, body):
+        bvid = _token(path)
+        if bvid not in videos:
+            return _json({}, status=404)
+        segments = videos[bvid]["segments"]
+        if subtitles.get(bvid, (None,))[0] is not segments:
+            payload = _json({"body": [{"from": s["start"], "to": s["end"], "content": s["text"]}
+                                      for s in segments]})
+            subtitles[bvid] = (segments, payload)
+        return subtitles[bvid][1]
+
+    server.route("GET", "/bilibili/x/web-interface/view", view)
+    server.route("GET", "/bilibili/x/player/v2", player)
+    server.route("GET", "/bilibili/subtitle/", subtitle)
+
+
+def _prompt(body):
+    try:
+        return json.loads(body)["messages"][-1]["content"]
+    except (ValueError, KeyError, IndexError, TypeError):
+        return ""
+
+
+def fake_completion(prompt):
+    """A plausible GLM answer for a summary, chunk (map) or reduce prompt"""
+    content = "这一部分讨论了成本、能力和落地之间的关系，并结合具体数据说明了趋势。" * 4
+
+    if "候选要点" in prompt:
+        candidates = len(CANDIDATE_RE.findall(prompt))
+        step = max(1, candidates // 6)
+        answer = {"summary": content, "key_points": list(range(1, candidates + 1, step))[:8],
+                  "tags": ["人工智能", "创业", "算力"]}
+    elif CHUNK_RE.search(prompt):
+        start, end = map(int, CHUNK_RE.search(prompt).groups())
+        answer = {"summary": content[:100],
+                  "key_points": [{"timestamp": t, "title": "片段要点", "content": content}
+                                 for t in (start, (start + end) // 2)],
+                  "tags": ["人工智能", "创业"]}
+    else:
+        timestamps = [int(m) * 60 + int(s) for m, s in MARKER_RE.findall(prompt)]
+        answer = {"summary": content,
+                  "key_points": [{"timestamp": t, "title": "要点", "content": content}
+                                 for t in (timestamps or [0])[::2][:6]],
+                  "tags": ["人工智能", "创业", "算力"]}
+
+    return json.dumps(answer, ensure_ascii=False)
+
+
+def add_glm_api(server, base_latency=1.0, per_kchar=0.02):
+    """
+    Serve the GLM chat completions endpoint
+
+    A request takes base_latency plus per_kchar seconds per 1000 prompt
+    characters, roughly how prefill time grows with the input.
+    """
+    def completions(path, body):
+        prompt = _prompt(body)
+        content = fake_completion(prompt)
+        return _json({
+            "id": "bench",
+            "model": summarize.ZHIPU_MODEL,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt), "completion_tokens": len(content),
+                      "total_tokens": len(prompt) + len(content)},
+        })
+
+    server.route("POST", GLM_PATH, completions,
+                 latency=lambda path, body: base_latency + per_kchar * len(_prompt(body)) / 1000)
+
+
+@contextmanager
+def sandbox(server, directory):
+    """
+    Point the pipeline at the fake server and a scratch data directory
+
+    Module-level paths and endpoint URLs are patched for the duration of
+    the block and restored afterwards. YouTube transcripts go through
+    youtube-transcript-api and can't be redirected, so only Bilibili
+    transcripts may be fetched inside a sandbox.
+
+    Yields:
+        the scratch data directory
+    """
+    data_dir = Path(directory) / "data"
+    feeds_file = data_dir / "feeds.json"
+    transcripts_dir = data_dir / "transcripts"
+    cache_dir = data_dir / "cache"
+    patches = [
+        (feed_store, "FEEDS_FILE", feeds_file),
+        (feed_store, "STORE_DIR", data_dir / "feeds"),
+        (metrics, "METRICS_DIR", data_dir / "metrics"),
+        (metrics, "HISTORY_FILE", data_dir / "metrics" / "history.jsonl"),
+        (transcript, "FEEDS_FILE", feeds_file),
+        (http_cache, "FEEDS_FILE", feeds_file),
+        (transcript, "TRANSCRIPTS_DIR", transcripts_dir),
+        (transcript, "ledger", AttemptLedger(cache_dir / "transcript_attempts.json")),
+        (transcript, "BILIBILI_API", server.url("/bilibili")),
+        (summarize, "FEEDS_FILE", feeds_file),
+        (summarize, "TRANSCRIPTS_DIR", transcripts_dir),
+        (summarize, "SUMMARIES_DIR", data_dir / "summaries"),
+        (summarize, "SUMMARY_CACHE_DIR", data_dir / "summary_cache"),
+        (summarize, "ZHIPU_API_URL", server.url(GLM_PATH)),
+        (youtube, "RSS_URL", server.url("/youtube/{channel_id}.xml")),
+        (bilibili, "RSS_URL", server.url("/rsshub/{uid}.xml")),
+        (twitter, "NITTER_INSTANCES", [server.host]),
+        (twitter, "NITTER_URL", "http://{instance}/nitter/{username}.xml"),
+        (twitter, "health", HealthTable(cache_dir / "nitter_health.json")),
+    ]
+    saved = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    for module, name, value in patches:
+        setattr(module, name, value)
+    try:
+        yield data_dir
+    finally:
+        for module, name, value in saved:
+            setattr(module, name, value)
@@ -0,0 +1,145 @@
+"""
+Fake RSS Server
+Local stand-in for remote feed hosts and APIs, used by the benchmarks
+"""
+
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_rss(name, entries=10):
+    """Build a small podcast-style RSS document"""
+    items = []
+    for i in range(entries):
+        items.append(f"""
+    <item>
+      <title>{name} episode {i}</title>
+      <guid>{name}-episode-{i}</guid>
+      <link>https://example.com/{name}/{i}</link>
+      <pubDate>Mon, 0{i % 9 + 1} Jun 2026 08:00:00 +0000</pubDate>
+      <description>Episode {i} of {name}</description>
+      <enclosure url="https://example.com/{name}/{i}.mp3" type="audio/mpeg" length="1000"/>
+    </item>""")
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0">
+  <channel>
+    <title>{name}</title>
+    <link>https://example.com/{name}</link>
+    <description>Fake feed {name}</description>{"".join(items)}
+  </channel>
+</rss>""".encode("utf-8")
+
+
+class FakeServer:
+    """
+    Threaded HTTP server that answers every GET with an RSS document
+    after a fixed delay, simulating a remote round trip.
+
+    Other endpoints are added with route(); a handler gets the request
+    path and body and returns (status, content type, body bytes). With
+    error_rate set, that fraction of requests is answered with 429 and a
+    Retry-After header instead.
+
+    Usage:
+        with FakeServer(latency=0.2) as server:
+            url = server.url("/feed/1.xml")
+    """
+
+    def __init__(self, latency=0.1, error_rate=0.0, retry_after=1, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.requests = 0
+        self.throttled = 0
+        self._routes = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    def route(self, method, prefix, handler, latency=None):
+        """
+        Serve requests whose path starts with prefix
+
+        Args:
+            method: "GET" or "POST"
+            prefix: path prefix; the longest matching prefix wins
+            handler: callable(path, body) -> (status, content_type, body)
+            latency: seconds, or callable(path, body) -> seconds
+                (defaults to the server latency)
+        """
+        self._routes.append((method, prefix, handler, latency))
+        self._routes.sort(key=lambda r: len(r[1]), reverse=True)
+
+    def _dispatch(self, method, path, body):
+        """(latency, status, headers, body) for a request"""
+        with self._lock:
+            self.requests += 1
+            throttle = self.error_rate and self._random.random() < self.error_rate
+            if throttle:
+                self.throttled += 1
+        if throttle:
+            return self.latency, 429, {"Retry-After": str(self.retry_after)}, b"rate limited"
+
+        for route_method, prefix, handler, latency in self._routes:
+            if route_method == method and path.startswith(prefix):
+                if latency is None:
+                    latency = self.latency
+                elif callable(latency):
+                    latency = latency(path, body)
+                status, content_type, payload = handler(path, body)
+                return latency, status, {"Content-Type": content_type}, payload
+
+        if method == "GET":
+            payload = make_rss(path.strip("/").replace("/", "_") or "feed")
+            return self.latency, 200, {"Content-Type": "application/rss+xml"}, payload
+        return self.latency, 404, {"Content-Type": "text/plain"}, b"not found"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def respond(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                latency, status, headers, payload = server._dispatch(method, self.path, body)
+                time.sleep(latency)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self.respond("GET")
+
+            def do_POST(self):
+                self.respond("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def host(self):
+        """host:port of the running server"""
+        address, port = self._httpd.server_address[:2]
+        return f"{address}:{port}"
+
+    def url(self, path):
+        """Absolute URL for a path on this server"""
+        return f"http://{self.host}{path}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Duplicate Detection
+Finds items that are the same content published on several sources
+(e.g. 硅谷101 on YouTube and Bilibili, a podcast re-upload of a YouTube
+episode, a tweet linking a video we already have) and marks every
+non-canonical copy with `duplicateOf: <canonical id>`
+
+Two signals are used:
+  - direct links: a tweet or episode whose text links a YouTube/Bilibili
+    video that is itself an item
+  - near-duplicate text: MinHash signatures over title, description and
+    transcript prefix, with LSH banding to find candidate pairs in
+    sub-quadratic time; candidates are confirmed by estimated Jaccard
+    similarity
+
+transcript.py and summarize.py skip a duplicate only while its canonical
+item has a transcript or may still get one (see covered_by_canonical);
+otherwise the duplicate is tried itself, and once it has a transcript
+rank_clusters() makes it the canonical copy.
+
+Usage:
+    python dedup.py            # mark duplicates in feeds.json
+"""
+
+import hashlib
+import json
+import random
+import re
+from pathlib import Path
+
+import feed_store
+import storage
+import transcript_store
+from search_index import item_content, tokenize
+from transcript_ledger import ERROR
+
+# Paths
+SCRIPT_DIR = Path(__file__).parent
+DATA_DIR = SCRIPT_DIR.parent / "data"
+FEEDS_FILE = DATA_DIR / "feeds.json"
+TRANSCRIPTS_DIR = DATA_DIR / "transcripts"
+
+# MinHash / LSH settings: 16 bands of 4 rows puts the LSH threshold near 0.5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SIMILARITY_THRESHOLD = 0.6  # Estimated Jaccard needed to confirm a candidate pair
+MIN_SHINGLES = 4  # Items with less text than this are never matched by similarity
+TRANSCRIPT_PREFIX_CHARS = 2000
+
+# Preferred canonical platform, most preferred first
+PLATFORM_PRIORITY = ["youtube", "bilibili", "podcast", "x"]
+VIDEO_PLATFORMS = ("youtube", "bilibili")  # Platforms transcript.py fetches captions for
+
+YOUTUBE_LINK_RE = re.compile(r'(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/shorts/)([\w-]{11})')
+BILIBILI_LINK_RE = re.compile(r'\bBV[0-9A-Za-z]{10}\b')
+
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(101)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+
+def item_text(item):
+    """Text used for similarity: title, description/content and transcript prefix"""
+    parts = [item.get("title") or "", item_content(item)]
+
+    reader = transcript_store.open_transcript(TRANSCRIPTS_DIR, item["id"])
+    if reader:
+        with reader:
+            parts.append(reader.preview(TRANSCRIPT_PREFIX_CHARS))
+
+    return " ".join(parts)
+
+
+def shingles(text):
+    """Set of token bigrams (CJK text is already character bigrams)"""
+    tokens = tokenize(text)
+    if len(tokens) < 2:
+        return set(tokens)
+    return {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def minhash(shingle_set):
+    """MinHash signature of a shingle set"""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+        for s in shingle_set
+    ]
+    return [min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
+
+
+def lsh_candidates(signatures):
+    """
+    Candidate pairs sharing at least one LSH band
+
+    Args:
+        signatures: dict of item id -> signature
+
+    Returns:
+        set of (id_a, id_b) pairs with id_a < id_b
+    """
+    buckets = {}
+    for item_id, sig in signatures.items():
+        for band in range(BANDS):
+            key = (band, tuple(sig[band * ROWS:(band + 1) * ROWS]))
+            buckets.setdefault(key, []).append(item_id)
+
+    pairs = set()
+    for ids in buckets.values():
+        if len(ids) > 1:
+            ids = sorted(ids)
+            for i, a in enumerate(ids):
+                for b in ids[i + 1:]:
+                    pairs.add((a, b))
+    return pairs
+
+
+def linked_video_ids(item):
+    """Item ids of YouTube/Bilibili videos linked from an item's text"""
+    text = " ".join([item.get("content") or "", item.get("transcriptPreview") or ""])
+    return (
+        {f"yt_{vid}" for vid in YOUTUBE_LINK_RE.findall(text)}
+        | {f"bl_{bvid}" for bvid in BILIBILI_LINK_RE.findall(text)}
+    )
+
+
+def canonical_rank(item):
+    """Sort key: items with transcripts, preferred platforms, then earliest"""
+    platform = item.get("platform")
+    priority = PLATFORM_PRIORITY.index(platform) if platform in PLATFORM_PRIORITY else len(PLATFORM_PRIORITY)
+    return (not item.get("hasTranscript"), priority, item.get("published") or "", item["id"])
+
+
+def find_duplicate_pairs(items):
+    """All pairs of item ids judged to be the same content"""
+    ids = {item["id"] for item in items}
+    pairs = set()
+
+    for item in items:
+        for linked in linked_video_ids(item) & ids:
+            if linked != item["id"]:
+                pairs.add(tuple(sorted((item["id"], linked))))
+
+    signatures = {}
+    for item in items:
+        shingle_set = shingles(item_text(item))
+        if len(shingle_set) >= MIN_SHINGLES:
+            signatures[item["id"]] = minhash(shingle_set)
+
+    for a, b in lsh_candidates(signatures):
+        if similarity(signatures[a], signatures[b]) >= SIMILARITY_THRESHOLD:
+            pairs.add((a, b))
+
+    return pairs
+
+
+def mark_duplicates(items):
+    """
+    Set duplicateOf on non-canonical copies (and clear it elsewhere)
+
+    Returns:
+        number of items marked as duplicates
+    """
+    by_id = {item["id"]: item for item in items}
+
+    # Union-find over duplicate pairs
+    parent = {}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in find_duplicate_pairs(items):
+        parent.setdefault(a, a)
+        parent.setdefault(b, b)
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    clusters = {}
+    for item_id in parent:
+        clusters.setdefault(find(item_id), []).append(item_id)
+
+    duplicate_of = {}
+    for members in clusters.values():
+        members = sorted(members, key=lambda i: canonical_rank(by_id[i]))
+        for member in members[1:]:
+            duplicate_of[member] = members[0]
+
+    for item in items:
+        if item["id"] in duplicate_of:
+            item["duplicateOf"] = duplicate_of[item["id"]]
+        else:
+            item.pop("duplicateOf", None)
+
+    return len(duplicate_of)
+
+
+def rank_clusters(items):
+    """
+    Re-pick the canonical item of each existing duplicate cluster
+
+    Clusters are the current duplicateOf groups (similarity isn't
+    recomputed), so this is cheap enough to run after every transcript
+    update, e.g. when a duplicate got the transcript its canonical lacks.
+
+    Returns:
+        {item_id: new duplicateOf, None for the new canonical} for the
+        items whose duplicateOf changed
+    """
+    by_id = {item["id"]: item for item in items}
+    clusters = {}
+    for item in items:
+        canonical = item.get("duplicateOf")
+        if canonical in by_id:
+            clusters.setdefault(canonical, [by_id[canonical]]).append(item)
+
+    changes = {}
+    for members in clusters.values():
+        canonical = min(members, key=canonical_rank)["id"]
+        for member in members:
+            duplicate_of = None if member["id"] == canonical else canonical
+            if member.get("duplicateOf") != duplicate_of:
+                changes[member["id"]] = duplicate_of
+    return changes
+
+
+def covered_by_canonical(item, by_id, ledger=None):
+    """
+    Whether a duplicate can leave its transcript and summary to its canonical item
+
+    It can when the canonical has a transcript, or is a video whose caption
+    fetch hasn't been tried yet or failed with a retryable error. A
+    canonical without captions, unavailable, or not a video leaves the
+    duplicate to be tried itself.
+
+    Args:
+        item: feed item (items that aren't duplicates are never covered)
+        by_id: item id -> feed item
+        ledger: transcript attempt ledger; without it only a canonical
+            with a transcript covers the duplicate
+    """
+    canonical = by_id.get(item.get("duplicateOf"))
+    if canonical is None:
+        return False
+    if canonical.get("hasTranscript"):
+        return True
+    if ledger is None or canonical.get("platform") not in VIDEO_PLATFORMS:
+        return False
+    entry = ledger.get(canonical["id"])
+    return entry is None or entry.get("reason") == ERROR
+
+
+def dedup_feeds():
+    """Mark duplicates in feeds.json"""
+    if not FEEDS_FILE.exists():
+        print("No feeds.json found. Run fetch_all.py first.")
+        return
+
+    with storage.file_lock(FEEDS_FILE):
+        with open(FEEDS_FILE, "r", encoding="utf-8") as f:
+            feeds_data = json.load(f)
+
+        items = feeds_data.get("items", [])
+        before = {item["id"]: item.get("duplicateOf") for item in items}
+        count = mark_duplicates(items)
+
+        if any(item.get("duplicateOf") != before[item["id"]] for item in items):
+            feed_store.save_feeds(feeds_data, FEEDS_FILE)
+
+    print(f"Marked {count} of {len(items)} items as duplicates")
+
+
+if __name__ == "__main__":
+    dedup_feeds()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Sharded Feed Store
+Splits the feed index into small files so readers and writers only touch
+what they need:
+
+    data/feeds/manifest.json                 shard list with counts per domain
+    data/feeds/shards/<YYYY-MM>/<platform>.json
+                                             card fields of a month's items on
+                                             one platform, newest first
+    data/feeds/items/<id>.json               full item (detail page)
+
+Shards leave out detail-only fields (transcriptPreview). The store is
+written from the same item list as feeds.json, which stays the
+compatibility format during migration (the web home page still filters
+the whole feed); unchanged shards and items are not rewritten. The web
+detail and saved pages read the per-item files instead of feeds.json.
+Per-item updates go to the SQLite item database (item_store) first, and
+feeds.json and the store are exported from it; only the shards and item
+files of the updated items are rebuilt. All files are
+replaced atomically, and writers of feeds.json and the store hold the
+feeds.json lock (see storage), so concurrent stages merge their updates
+instead of overwriting each other's.
+
+Usage:
+    python feed_store.py                     # build the store from feeds.json
+    python feed_store.py --export            # rewrite feeds.json and the store from the item database
+    python feed_store.py --platform youtube --domain AI
+"""
+
+import argparse
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+
+import dedup
+import item_store
+import storage
+
+# Paths
+SCRIPT_DIR = Path(__file__).parent
+DATA_DIR = SCRIPT_DIR.parent / "data"
+FEEDS_FILE = DATA_DIR / "feeds.json"
+STORE_DIR = DATA_DIR / "feeds"
+
+STORE_VERSION = 1
+DETAIL_ONLY_FIELDS = ("transcriptPreview",)  # Kept out of shards
+HASHES_FILE = ".item_hashes.json"  # id -> hash of the item file, to skip unchanged items
+
+
+def _dump(data):
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def _sha1(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def shard_key(item):
+    """(month, platform) of the shard an item belongs to"""
+    month = (item.get("published") or "")[:7]
+    if len(month) != 7 or month[4] != "-":
+        month = "unknown"
+    return month, item.get("platform") or "unknown"
+
+
+def shard_path(directory, month, platform):
+    return Path(directory) / "shards" / month / f"{platform}.json"
+
+
+def item_path(directory, item_id):
+    return Path(directory) / "items" / f"{item_id}.json"
+
+
+def card(item):
+    """Item without its detail-only fields"""
+    return {k: v for k, v in item.items() if k not in DETAIL_ONLY_FIELDS}
+
+
+def load_manifest(directory=None):
+    """The store manifest, or None if the store hasn't been written"""
+    manifest = storage.read_json(Path(directory or STORE_DIR) / "manifest.json")
+    if not manifest or manifest.get("version") != STORE_VERSION:
+        return None
+    return manifest
+
+
+def write_store(items, directory=None, last_updated=None, touched=None):
+    """
+    Write the sharded store for a full list of items
+
+    Only shards and item files whose content changed are written; files
+    of shards and items that disappeared are removed.
+
+    Args:
+        touched: ids of the items a per-item update changed. Only the
+            shards holding them and their item files are rebuilt, and the
+            other manifest entries are kept; the update must not move
+            items between shards or remove them.
+
+    Returns:
+        (shards_written, items_written, files_removed)
+    """
+    directory = Path(directory or STORE_DIR)
+    old_manifest = load_manifest(directory)
+    if old_manifest is None:
+        old_manifest = {"shards": []}
+        touched = None  # No store yet, build all of it
+    old_hashes = {s["key"]: s["hash"] for s in old_manifest["shards"]}
+    item_hashes = storage.read_json(directory / HASHES_FILE, {})
+
+    if touched is not None:
+        touched_keys = {shard_key(item) for item in items if item["id"] in touched}
+    groups = {}
+    for item in items:
+        key = shard_key(item)
+        if touched is None or key in touched_keys:
+            groups.setdefault(key, []).append(item)
+
+    shards = []
+    shards_written = 0
+    for (month, platform), group in groups.items():
+        group.sort(key=lambda x: x.get("published", ""), reverse=True)
+        text = _dump({"month": month, "platform": platform, "items": [card(i) for i in group]})
+        digest = _sha1(text)
+        key = f"{month}/{platform}"
+        path = shard_path(directory, month, platform)
+        if old_hashes.get(key) != digest or not path.exists():
+            storage.atomic_write(path, text)
+            shards_written += 1
+
+        domains = {}
+        for item in group:
+            for domain in item.get("domains", []):
+                domains[domain] = domains.get(domain, 0) + 1
+        shards.append({
+            "key": key,
+            "month": month,
+            "platform": platform,
+            "path": path.relative_to(directory).as_posix(),
+            "count": len(group),
+            "domains": dict(sorted(domains.items())),
+            "newest": group[0].get("published"),
+            "hash": digest,
+        })
+
+    new_hashes = {} if touched is None else dict(item_hashes)
+    items_written = 0
+    for item in items:
+        if touched is not None and item["id"] not in touched:
+            continue
+        text = _dump(item)
+        digest = _sha1(text)
+        new_hashes[item["id"]] = digest
+        path = item_path(directory, item["id"])
+        if item_hashes.get(item["id"]) != digest or not path.exists():
+            storage.atomic_write(path, text)
+            items_written += 1
+
+    removed = 0
+    live_shards = {s["key"] for s in shards}
+    if touched is not None:
+        # Shards without touched items are left as they are
+        shards += [s for s in old_manifest["shards"] if s["key"] not in live_shards]
+    else:
+        # Remove files of shards and items that are gone
+        for old in old_manifest["shards"]:
+            if old["key"] not in live_shards:
+                (directory / old["path"]).unlink(missing_ok=True)
+                removed += 1
+        for item_id in set(item_hashes) - set(new_hashes):
+            item_path(directory, item_id).unlink(missing_ok=True)
+            removed += 1
+
+    shards.sort(key=lambda s: (s["month"], s["platform"]), reverse=True)
+    changed = shards_written or items_written or removed
+    if changed or not (directory / "manifest.json").exists():
+        manifest = {
+            "version": STORE_VERSION,
+            "last_updated": last_updated or datetime.utcnow().isoformat() + "Z",
+            "count": len(items),
+            "shards": shards,
+        }
+        storage.atomic_write(directory / HASHES_FILE, json.dumps(new_hashes, sort_keys=True))
+        # Manifest last, so readers never see shards it doesn't describe
+        storage.atomic_write(directory / "manifest.json", _dump(manifest))
+
+    return shards_written, items_written, removed
+
+
+def save_feeds(data, feeds_file=None):
+    """
+    Atomically write feeds.json, the item database and the store for its items
+
+    Takes the feeds.json lock; callers doing a read-modify-write hold it
+    around the read as well.
+
+    Returns:
+        (shards_written, items_written, files_removed) of the store
+    """
+    feeds_file = feeds_file or FEEDS_FILE
+    with storage.file_lock(feeds_file), item_store.connect(feeds_file) as conn:
+        item_store.replace_items(conn, data)
+        storage.write_json(feeds_file, data)
+        item_store.mark_synced(conn, feeds_file)
+        return write_store(data.get("items", []), last_updated=data.get("last_updated"))
+
+
+def export_feeds(conn, feeds_file=None, touched=None):
+    """
+    Write feeds.json and the store from the item database
+
+    Args:
+        touched: ids of the items that changed since the last export, to
+            rebuild only their shards (see write_store); all if None
+
+    Returns:
+        the exported feeds.json document
+    """
+    feeds_file = feeds_file or FEEDS_FILE
+    with storage.file_lock(feeds_file):
+        data = item_store.export(conn)
+        storage.write_json(feeds_file, data)
+        item_store.mark_synced(conn, feeds_file)
+        write_store(data["items"], last_updated=data.get("last_updated"), touched=touched)
+    return data
+
+
+def update_feeds(updates, feeds_file=None):
+    """
+    Merge per-item field updates into feeds.json
+
+    The updates are indexed point updates in the item database (see
+    item_store), which is synced from feeds.json first if another writer
+    changed the file; feeds.json and the store are then exported from it.
+    Items that are no longer in feeds.json are skipped. When transcripts
+    were added, the canonical item of each duplicate cluster is re-picked
+    (see dedup.rank_clusters), so a duplicate that got a transcript its
+    canonical lacks takes its place.
+
+    Args:
+        updates: {item_id: {field: value}}
+
+    Returns:
+        number of items updated
+    """
+    if not updates:
+        return 0
+    feeds_file = feeds_file or FEEDS_FILE
+    with storage.file_lock(feeds_file), item_store.connect(feeds_file) as conn:
+        if not item_store.sync(conn, feeds_file):
+            return 0
+        updated = item_store.update_items(conn, updates)
+        touched = set(updates)
+        if updated and any("hasTranscript" in fields for fields in updates.values()):
+            changes = dedup.rank_clusters(item_store.query(conn))
+            item_store.update_items(conn, {item_id: {"duplicateOf": duplicate_of}
+                                           for item_id, duplicate_of in changes.items()})
+            touched.update(changes)
+        if updated:
+            export_feeds(conn, feeds_file, touched)
+        return updated
+
+
+def select_shards(manifest, platforms=None, domains=None, since=None):
+    """
+    Shards that can contain matching items
+
+    Args:
+        platforms: platforms to include (all if None)
+        domains: include shards with at least one of these domains
+        since: "YYYY-MM" or ISO date; older months are skipped
+    """
+    selected = []
+    for shard in manifest["shards"]:
+        if platforms and shard["platform"] not in platforms:
+            continue
+        if domains and not any(d in shard["domains"] for d in domains):
+            continue
+        if since and shard["month"] != "unknown" and shard["month"] < since[:7]:
+            continue
+        selected.append(shard)
+    return selected
+
+
+def iter_items(platforms=None, domains=None, since=None, directory=None):
+    """
+    Card entries of matching items, reading only the shards needed
+
+    Items come shard by shard (newest month first), newest first within
+    a shard.
+    """
+    directory = Path(directory or STORE_DIR)
+    manifest = load_manifest(directory)
+    if manifest is None:
+        return
+    for shard in select_shards(manifest, platforms, domains, since):
+        data = storage.read_json(directory / shard["path"], {"items": []})
+        for item in data["items"]:
+            if domains and not any(d in item.get("domains", []) for d in domains):
+                continue
+            if since and (item.get("published") or "") < since:
+                continue
+            yield item
+
+
+def load_item(item_id, directory=None):
+    """Full item from its detail file, or None"""
+    return storage.read_json(item_path(directory or STORE_DIR, item_id))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded feed store")
+    parser.add_argument("--platform", action="append", help="list items of this platform")
+    parser.add_argument("--domain", action="append", help="list items of this domain")
+    parser.add_argument("--since", help="list items published since (YYYY-MM or ISO date)")
+    parser.add_argument("--export", action="store_true",
+                        help="rewrite feeds.json and the store from the item database")
+    args = parser.parse_args()
+
+    if args.export:
+        with item_store.connect() as conn:
+            if not item_store.sync(conn):
+                print("No feeds.json found. Run fetch_all.py first.")
+            else:
+                data = export_feeds(conn)
+                print(f"Exported {data['count']} items to {FEEDS_FILE}")
+    elif args.platform or args.domain or args.since:
+        for item in iter_items(args.platform, args.domain, args.since):
+            print(f"{item.get('published', '')[:10]}  [{item['platform']}] "
+                  f"{item.get('title') or (item.get('content') or '')[:60]}")
+    else:
+        feeds = storage.read_json(FEEDS_FILE)
+        if feeds is None:
+            print("No feeds.json found. Run fetch_all.py first.")
+        else:
+            with storage.file_lock(FEEDS_FILE):
+                written = write_store(feeds.get("items", []), last_updated=feeds.get("last_updated"))
+            print("Wrote {} shards and {} items, removed {} files".format(*written))
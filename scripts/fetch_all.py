@@ -4,13 +4,23 @@ Oasis Feed Fetcher - Main Entry Point
 Fetches content from all configured sources and saves to feeds.json
 """
 
-import json
+import argparse
 import os
+import threading
 import yaml
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlparse
 
 from fetchers import fetch_youtube, fetch_bilibili, fetch_twitter, fetch_podcast
+from fetchers import bilibili, http_cache, twitter, youtube
+import dedup
+import feed_store
+import http_client
+import metrics
+import scheduler
+import storage
 
 # Paths
 SCRIPT_DIR = Path(__file__).parent
@@ -26,82 +36,224 @@ def load_sources():
         return yaml.safe_load(f)
 
 
-def save_feeds(items):
-    """Save feed items to JSON file"""
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
+# Fields owned by transcript.py / summarize.py, kept when an item is re-fetched
+ENRICHMENT_FIELDS = ("hasTranscript", "transcriptPreview", "hasSummary")
+
+# Items kept per source once they fall off the source's RSS feed
+HISTORY_PER_SOURCE = 50
+
+
+def load_feeds():
+    """Load existing feeds.json, or None if missing/corrupt"""
+    return storage.read_json(FEEDS_FILE)
+
+
+def merge_items(existing, fetched, history=HISTORY_PER_SOURCE):
+    """
+    Upsert fetched items into the existing item list, keyed by id
+
+    Existing items keep their enrichment fields and first-seen published
+    date; items no longer in a source's RSS feed are kept until the source
+    has more than `history` newer items.
+
+    Returns:
+        merged list of items, newest first
+    """
+    merged = {item["id"]: item for item in existing}
     
-    # Sort by published date (newest first)
-    items.sort(key=lambda x: x.get("published", ""), reverse=True)
+    for item in fetched:
+        old = merged.get(item["id"])
+        if old:
+            item = {**old, **item}
+            for field in ENRICHMENT_FIELDS + ("published",):
+                if field in old:
+                    item[field] = old[field]
+        merged[item["id"]] = item
+    
+    # Keep a bounded history window per source
+    by_source = {}
+    for item in merged.values():
+        by_source.setdefault(item.get("sourceId"), []).append(item)
     
-    data = {
-        "last_updated": datetime.utcnow().isoformat() + "Z",
-        "count": len(items),
-        "items": items
-    }
+    items = []
+    for group in by_source.values():
+        group.sort(key=lambda x: x.get("published", ""), reverse=True)
+        items.extend(group[:history])
     
-    with open(FEEDS_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    items.sort(key=lambda x: x.get("published", ""), reverse=True)
+    return items
+
+
+def apply_updates(items, updates):
+    """Set per-item fields ({item_id: {field: value}}) on the items present"""
+    for item in items:
+        fields = updates.get(item["id"])
+        if fields:
+            item.update(fields)
+
+
+def save_feeds(items, replace=False, history=HISTORY_PER_SOURCE, updates=None):
+    """
+    Save feed items to JSON file
+
+    By default the fetched items are merged into the existing feeds.json,
+    and the file is left untouched when the merge changes nothing. With
+    replace=True the file is rewritten with only the fetched items.
+
+    Args:
+        updates: optional {item_id: {field: value}} applied after the
+            merge (e.g. transcript/summary flags set during the run)
+
+    Returns:
+        the saved list of items
+    """
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
     
-    print(f"Saved {len(items)} items to {FEEDS_FILE}")
+    # Held from read to write, so transcript/summary flags written by
+    # a concurrent stage in between aren't lost
+    with storage.file_lock(FEEDS_FILE):
+        existing = None if replace else load_feeds()
+        
+        if existing is None:
+            # Sort by published date (newest first)
+            items = sorted(items, key=lambda x: x.get("published", ""), reverse=True)
+            apply_updates(items, updates or {})
+            dedup.mark_duplicates(items)
+        else:
+            old_items = existing.get("items", [])
+            # Merge into copies so old_items stays comparable
+            items = merge_items([dict(i) for i in old_items], items, history)
+            apply_updates(items, updates or {})
+            dedup.mark_duplicates(items)
+            if items == old_items:
+                print(f"No changes, {FEEDS_FILE} left as is ({len(items)} items)")
+                # Builds the sharded store on the first run after migrating
+                feed_store.write_store(items, last_updated=existing.get("last_updated"))
+                return items
+            added = len({i["id"] for i in items} - {i["id"] for i in old_items})
+            print(f"Merged {added} new items")
+        
+        data = {
+            "last_updated": datetime.utcnow().isoformat() + "Z",
+            "count": len(items),
+            "items": items
+        }
+        
+        shards, changed, _ = feed_store.save_feeds(data, FEEDS_FILE)
+    print(f"Saved {len(items)} items to {FEEDS_FILE} ({shards} shards, {changed} item files updated)")
+    return items
 
 
-def fetch_all():
-    """Fetch content from all sources"""
-    config = load_sources()
-    sources = config.get("sources", [])
+# Platform fetch order and display labels
+PLATFORMS = [
+    ("youtube", "YouTube", "channels", fetch_youtube),
+    ("bilibili", "Bilibili", "users", fetch_bilibili),
+    ("x", "X/Twitter", "accounts", fetch_twitter),
+    ("podcast", "Podcast", "feeds", fetch_podcast),
+]
+
+# Concurrency settings
+MAX_WORKERS = 8
+DEFAULT_HOST_LIMIT = 4
+HOST_LIMITS = {
+    "www.youtube.com": 4,
+    "rsshub.app": 2,  # Public RSSHub rate-limits aggressively
+    "nitter": 2,  # Shared by all Nitter instances
+}
+
+
+def source_host(source):
+    """Return the host key used to limit concurrent requests for a source"""
+    platform = source["platform"]
+    if platform == "youtube":
+        return urlparse(youtube.RSS_URL).netloc
+    if platform == "bilibili":
+        return urlparse(bilibili.RSS_URL).netloc
+    if platform == "x":
+        return "nitter"
+    return urlparse(source.get("feed_url") or "").netloc or platform
+
+
+def fetch_all(sources=None, workers=MAX_WORKERS, host_limits=None, outcomes=None, on_items=None):
+    """
+    Fetch content from all sources
+
+    Sources are fetched concurrently, at most workers at once. Each host
+    has its own pool sized to its limit, so a host never sees more than
+    its limit of in-flight requests and a busy host never holds up the
+    sources of the others. Results are reported per platform in config
+    order, and a failing source never affects the others.
+
+    Args:
+        sources: list of source dicts (defaults to sources.yaml)
+        workers: maximum number of sources fetched at once
+        host_limits: dict of host -> max concurrent requests
+        outcomes: optional dict filled with source id -> True if the
+            source returned items, False if it failed or came back empty
+        on_items: optional callback(source, items), called from the
+            worker thread as soon as a source has been fetched
+
+    Returns:
+        list of feed items
+    """
+    if sources is None:
+        sources = load_sources().get("sources", [])
+    limits = {**HOST_LIMITS, **(host_limits or {})}
     all_items = []
     
     # Group sources by platform
-    youtube_sources = [s for s in sources if s["platform"] == "youtube"]
-    bilibili_sources = [s for s in sources if s["platform"] == "bilibili"]
-    twitter_sources = [s for s in sources if s["platform"] == "x"]
-    podcast_sources = [s for s in sources if s["platform"] == "podcast"]
+    groups = [
+        (label, noun, fetcher, [s for s in sources if s["platform"] == platform])
+        for platform, label, noun, fetcher in PLATFORMS
+    ]
     
     print(f"Fetching from {len(sources)} sources...")
     
-    # Fetch YouTube
-    if youtube_sources:
-        print(f"\n[YouTube] Fetching {len(youtube_sources)} channels...")
-        for source in youtube_sources:
-            try:
-                items = fetch_youtube(source)
-                all_items.extend(items)
-                print(f"  ✓ {source['name']}: {len(items)} items")
-            except Exception as e:
-                print(f"  ✗ {source['name']}: {e}")
-    
-    # Fetch Bilibili
-    if bilibili_sources:
-        print(f"\n[Bilibili] Fetching {len(bilibili_sources)} users...")
-        for source in bilibili_sources:
-            try:
-                items = fetch_bilibili(source)
-                all_items.extend(items)
-                print(f"  ✓ {source['name']}: {len(items)} items")
-            except Exception as e:
-                print(f"  ✗ {source['name']}: {e}")
-    
-    # Fetch Twitter/X
-    if twitter_sources:
-        print(f"\n[X/Twitter] Fetching {len(twitter_sources)} accounts...")
-        for source in twitter_sources:
-            try:
-                items = fetch_twitter(source)
-                all_items.extend(items)
-                print(f"  ✓ {source['name']}: {len(items)} items")
-            except Exception as e:
-                print(f"  ✗ {source['name']}: {e}")
-    
-    # Fetch Podcasts
-    if podcast_sources:
-        print(f"\n[Podcast] Fetching {len(podcast_sources)} feeds...")
-        for source in podcast_sources:
-            try:
-                items = fetch_podcast(source)
-                all_items.extend(items)
-                print(f"  ✓ {source['name']}: {len(items)} items")
-            except Exception as e:
-                print(f"  ✗ {source['name']}: {e}")
+    slots = threading.BoundedSemaphore(max(1, workers))
+    
+    def run(fetcher, source):
+        # Only threads whose host has capacity get here, so waiting for a
+        # slot never blocks a source of another host
+        with slots:
+            with metrics.timer(f"source.{source['platform']}.{source['id']}"):
+                items = fetcher(source)
+        if on_items is not None:
+            on_items(source, items)
+        return items
+    
+    executors = {}
+    try:
+        futures = []  # (label, noun, [(source, future)]) per platform
+        for label, noun, fetcher, group in groups:
+            submitted = []
+            for source in group:
+                host = source_host(source)
+                if host not in executors:
+                    executors[host] = ThreadPoolExecutor(
+                        max_workers=max(1, min(workers, limits.get(host, DEFAULT_HOST_LIMIT))))
+                submitted.append((source, executors[host].submit(run, fetcher, source)))
+            futures.append((label, noun, submitted))
+        
+        for label, noun, submitted in futures:
+            if not submitted:
+                continue
+            print(f"\n[{label}] Fetching {len(submitted)} {noun}...")
+            for source, future in submitted:
+                try:
+                    items = future.result()
+                    all_items.extend(items)
+                    metrics.incr(f"items.{source['platform']}", len(items))
+                    if outcomes is not None:
+                        outcomes[source["id"]] = bool(items)
+                    print(f"  ✓ {source['name']}: {len(items)} items")
+                except Exception as e:
+                    metrics.incr(f"failures.{source['platform']}")
+                    if outcomes is not None:
+                        outcomes[source["id"]] = False
+                    print(f"  ✗ {source['name']}: {e}")
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=True)
     
     print(f"\n{'='*50}")
     print(f"Total items fetched: {len(all_items)}")
@@ -109,8 +261,43 @@ def fetch_all():
     return all_items
 
 
+def select_due(sources, schedule, poll_all=False):
+    """Sources to poll this run, counted in the run metrics"""
+    if poll_all:
+        due = sources
+    else:
+        due = scheduler.due_sources(sources, schedule)
+        print(f"{len(due)} of {len(sources)} sources due, {len(sources) - len(due)} not yet")
+    metrics.incr("sources.polled", len(due))
+    metrics.incr("sources.skipped", len(sources) - len(due))
+    return due
+
+
+def update_schedule(schedule, sources, due, outcomes, items):
+    """Learn posting cadence from the saved items and write the schedule"""
+    published = {}
+    for item in items:
+        published.setdefault(item.get("sourceId"), []).append(item.get("published"))
+    for source in due:
+        scheduler.record_poll(schedule, source, outcomes.get(source["id"], False),
+                              published.get(source["id"], []))
+    scheduler.prune(schedule, sources)
+    scheduler.save_schedule(schedule)
+
+
 def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="Fetch content from all sources")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help=f"max sources fetched at once (default: {MAX_WORKERS}, 1 = sequential)")
+    parser.add_argument("--replace", action="store_true",
+                        help="rewrite feeds.json with only this run's items instead of merging")
+    parser.add_argument("--history", type=int, default=HISTORY_PER_SOURCE,
+                        help=f"items kept per source when merging (default: {HISTORY_PER_SOURCE})")
+    parser.add_argument("--all", action="store_true",
+                        help="poll every source, not only those the scheduler considers due")
+    args = parser.parse_args()
+    
     print("=" * 50)
     print("Oasis Feed Fetcher")
     print(f"Started at: {datetime.now().isoformat()}")
@@ -120,11 +307,25 @@ def main():
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     TRANSCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
     
+    # Only poll sources that are due (--replace needs every source)
+    sources = load_sources().get("sources", [])
+    schedule = scheduler.load_schedule()
+    due = select_due(sources, schedule, args.all or args.replace)
+    
     # Fetch all content
-    items = fetch_all()
+    outcomes = {}
+    items = fetch_all(due, workers=args.workers, outcomes=outcomes)
     
     # Save to JSON
-    save_feeds(items)
+    saved = save_feeds(items, replace=args.replace, history=args.history)
+    http_cache.save_cache()
+    twitter.save_health()
+    
+    # Learn posting cadence from the saved items
+    update_schedule(schedule, sources, due, outcomes, saved)
+    
+    metrics.add_counters("http", http_client.stats())
+    metrics.write_run("fetch", {"workers": args.workers})
     
     print(f"\nCompleted at: {datetime.now().isoformat()}")
 
@@ -3,10 +3,10 @@ Bilibili RSS Fetcher
 Fetches videos from Bilibili users via RSSHub
 """
 
-import re
-import feedparser
-from datetime import datetime
-from dateutil import parser as date_parser
+from . import http_cache
+from .utils import BVID_RE, IMG_SRC_RE, published_iso
+
+RSS_URL = "https://rsshub.app/bilibili/user/video/{uid}"
 
 
 def parse_duration_text(text):
@@ -27,7 +27,7 @@ def parse_duration_text(text):
 
 def extract_bvid(url):
     """Extract BV ID from Bilibili URL"""
-    match = re.search(r'BV[\w]+', url)
+    match = BVID_RE.search(url)
     if match:
         return match.group(0)
     return None
@@ -48,9 +48,11 @@ def fetch_bilibili(source):
         raise ValueError(f"No uid for {source['name']}")
     
     # Use RSSHub to fetch Bilibili user videos
-    rss_url = f"https://rsshub.app/bilibili/user/video/{uid}"
+    rss_url = RSS_URL.format(uid=uid)
     
-    feed = feedparser.parse(rss_url)
+    feed, cached_items = http_cache.parse_feed(rss_url, source)
+    if cached_items is not None:
+        return cached_items  # 304 Not Modified
     
     if feed.bozo and not feed.entries:
         raise Exception(f"Failed to parse RSS: {feed.bozo_exception}")
@@ -65,17 +67,12 @@ def fetch_bilibili(source):
             continue
         
         # Parse published date
-        published = entry.get("published", "")
-        try:
-            published_dt = date_parser.parse(published)
-            published = published_dt.isoformat()
-        except:
-            published = datetime.utcnow().isoformat()
+        published = published_iso(entry.get("published", ""))
         
         # Try to extract thumbnail from description
         thumbnail = None
         description = entry.get("description", "")
-        img_match = re.search(r'<img[^>]+src=["\']([^"\']+)["\']', description)
+        img_match = IMG_SRC_RE.search(description)
         if img_match:
             thumbnail = img_match.group(1)
             # Fix protocol-relative URLs
@@ -102,5 +99,6 @@ def fetch_bilibili(source):
         
         items.append(item)
     
+    http_cache.remember(rss_url, source, feed, items)
     return items
 
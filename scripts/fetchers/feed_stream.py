@@ -0,0 +1,141 @@
+"""
+Streaming Feed Parser
+Incremental RSS 2.0 / Atom parser for the fetchers that only need the
+newest few entries
+
+The document is read with iterparse, each entry is mapped to the handful of
+fields the fetchers use and then discarded, and parsing stops once `limit`
+entries were seen. Entries are returned as feedparser.FeedParserDict with
+feedparser's key names (id, link, links/enclosures, title, published,
+summary, image, itunes_duration, yt_videoid, media_content), so the fetchers
+work the same on either parser. (feedparser exposes enclosures through
+`links` and maps itunes:image to `image`; so does this parser.)
+
+parse() returns None for anything it doesn't handle (malformed XML, HTML
+entities XML doesn't define, RDF feeds, ...); callers then fall back to
+feedparser.
+"""
+
+import io
+import xml.etree.ElementTree as ET
+
+from feedparser import FeedParserDict
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+ITUNES = "{http://www.itunes.com/dtds/podcast-1.0.dtd}"
+MEDIA = "{http://search.yahoo.com/mrss/}"
+YT = "{http://www.youtube.com/xml/schemas/2015}"
+
+ENTRY_TAGS = ("item", ATOM + "entry")
+
+
+def _text(elem, tag):
+    """Stripped text of the first child with tag, or None"""
+    child = elem.find(tag)
+    if child is None:
+        return None
+    return (child.text or "").strip()
+
+
+def _set(entry, key, value):
+    """Set a key only when there is a value, like feedparser"""
+    if value is not None:
+        entry[key] = value
+
+
+def _rss_entry(elem):
+    entry = FeedParserDict()
+    _set(entry, "title", _text(elem, "title"))
+    _set(entry, "link", _text(elem, "link"))
+    _set(entry, "id", _text(elem, "guid"))
+    _set(entry, "published", _text(elem, "pubDate"))
+    _set(entry, "summary", _text(elem, "description"))
+
+    links = [
+        FeedParserDict(rel="enclosure", href=enc.get("url", ""), type=enc.get("type", ""),
+                       length=enc.get("length", ""))
+        for enc in elem.iter("enclosure")
+    ]
+    if links:
+        entry["links"] = links
+
+    image = elem.find(ITUNES + "image")
+    if image is not None and image.get("href"):
+        entry["image"] = FeedParserDict(href=image.get("href"))
+    _set(entry, "itunes_duration", _text(elem, ITUNES + "duration"))
+    return entry
+
+
+def _atom_entry(elem):
+    entry = FeedParserDict()
+    _set(entry, "title", _text(elem, ATOM + "title"))
+    _set(entry, "id", _text(elem, ATOM + "id"))
+    _set(entry, "published", _text(elem, ATOM + "published") or _text(elem, ATOM + "updated"))
+    _set(entry, "yt_videoid", _text(elem, YT + "videoId"))
+
+    for link in elem.iter(ATOM + "link"):
+        if link.get("rel", "alternate") == "alternate":
+            entry["link"] = link.get("href", "")
+            break
+
+    summary = _text(elem, ATOM + "summary")
+    if summary is None:
+        summary = _text(elem, f"{MEDIA}group/{MEDIA}description")
+    _set(entry, "summary", summary)
+
+    media = [FeedParserDict(content.attrib) for content in elem.iter(MEDIA + "content")]
+    if media:
+        entry["media_content"] = media
+    return entry
+
+
+def parse(content, limit):
+    """
+    Parse up to limit entries of an RSS 2.0 or Atom document
+
+    Args:
+        content: raw feed bytes
+        limit: number of entries to read before stopping
+
+    Returns:
+        FeedParserDict with feed (channel image fields), entries and
+        bozo=0, or None if the document should go to feedparser instead
+    """
+    feed = FeedParserDict()
+    entries = []
+    depth_in_entry = 0
+    root = None
+
+    try:
+        for event, elem in ET.iterparse(io.BytesIO(content), events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                if root is None:
+                    root = elem
+                    if tag not in ("rss", ATOM + "feed"):
+                        return None
+                if tag in ENTRY_TAGS:
+                    depth_in_entry += 1
+                continue
+
+            if tag in ENTRY_TAGS:
+                depth_in_entry -= 1
+                entries.append(_rss_entry(elem) if tag == "item" else _atom_entry(elem))
+                # Drop the parsed subtree; the root keeps only an empty stub
+                elem.clear()
+                if len(entries) >= limit:
+                    break
+            elif depth_in_entry == 0:
+                # Channel-level artwork (podcasts)
+                if tag == "image" and _text(elem, "url"):
+                    feed["image"] = FeedParserDict(href=_text(elem, "url"))
+                elif tag == ITUNES + "image" and elem.get("href"):
+                    feed["image"] = FeedParserDict(href=elem.get("href"))
+    except (ET.ParseError, ValueError, LookupError):
+        # Malformed XML, or an encoding expat can't decode (gb2312, GBK, Big5)
+        return None
+
+    if root is not None:
+        root.clear()
+
+    return FeedParserDict(feed=feed, entries=entries, bozo=0)
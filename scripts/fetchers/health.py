@@ -0,0 +1,71 @@
+"""
+Instance Health Table
+Tracks latency and success rate of interchangeable mirror instances (e.g.
+Nitter) across runs, ranks them, and circuit-breaks instances that keep
+failing during the current run
+"""
+
+from datetime import datetime
+
+import storage
+
+# Health settings
+EWMA_ALPHA = 0.3  # Weight of the newest observation in latency/success averages
+BREAKER_THRESHOLD = 3  # Consecutive failures before an instance is skipped for the run
+UNKNOWN_SUCCESS = 0.5  # Assumed success rate of an instance never tried
+UNKNOWN_LATENCY = 5.0  # Assumed latency (seconds) of an instance never tried
+
+
+class HealthTable(storage.JsonTable):
+    """
+    Persistent per-instance health
+
+    Each entry holds an exponentially weighted success rate and latency,
+    attempt/success counts and the time of the last failure. Consecutive
+    failures within a run are counted separately and open the circuit
+    breaker; they are not persisted, so every run gives instances a new
+    chance.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._run_failures = {}
+
+    def score(self, instance):
+        """Expected seconds per successful fetch (lower is better)"""
+        with self.lock:
+            entry = self.entries().get(instance)
+        if not entry:
+            return UNKNOWN_LATENCY / UNKNOWN_SUCCESS
+        return entry["latency"] / max(entry["success_rate"], 0.05)
+
+    def is_broken(self, instance):
+        """Whether the circuit breaker is open for this run"""
+        with self.lock:
+            return self._run_failures.get(instance, 0) >= BREAKER_THRESHOLD
+
+    def ranked(self, instances):
+        """Usable instances, healthiest first (ties keep the given order)"""
+        usable = [i for i in instances if not self.is_broken(i)]
+        return sorted(usable, key=self.score)
+
+    def record(self, instance, ok, latency):
+        """Record the outcome of one request to an instance"""
+        with self.lock:
+            entry = self.entries().setdefault(instance, {
+                "latency": latency,
+                "success_rate": 1.0 if ok else 0.0,
+                "attempts": 0,
+                "successes": 0,
+                "last_failure": None,
+            })
+            entry["attempts"] += 1
+            entry["success_rate"] += EWMA_ALPHA * ((1.0 if ok else 0.0) - entry["success_rate"])
+            if ok:
+                entry["successes"] += 1
+                entry["latency"] += EWMA_ALPHA * (latency - entry["latency"])
+                self._run_failures[instance] = 0
+            else:
+                entry["last_failure"] = datetime.utcnow().isoformat() + "Z"
+                self._run_failures[instance] = self._run_failures.get(instance, 0) + 1
+            self.mark_dirty()
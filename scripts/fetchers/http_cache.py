@@ -0,0 +1,152 @@
+"""
+HTTP Validator Cache
+Remembers ETag/Last-Modified per feed URL and sends conditional requests,
+so feeds that have not changed since the last run are neither downloaded
+nor parsed again
+
+The cache keeps only the validators and the ids of the items extracted
+from the feed; on 304 Not Modified the items are read back from
+feeds.json. If one of them is no longer there, the request is sent
+without validators.
+
+Feeds are downloaded through the shared http_client session, so they count
+towards the run's request, byte and retry metrics.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import feedparser
+
+import http_client
+import metrics
+import storage
+
+from . import feed_stream
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+CACHE_FILE = DATA_DIR / "cache" / "http_validators.json"
+FEEDS_FILE = DATA_DIR / "feeds.json"
+
+_cache = storage.JsonTable(CACHE_FILE)
+_feeds_lock = threading.Lock()
+_feeds = None  # (signature, {item id: item}) of the feeds.json read last
+
+# Feed download settings
+FEED_TIMEOUT = 20
+FEED_RETRIES = 1  # Callers like the Nitter fetcher have their own fallbacks
+
+
+def _feed_items():
+    """Items of feeds.json by id, re-read when the file changed (caller holds _feeds_lock)"""
+    global _feeds
+    try:
+        st = os.stat(FEEDS_FILE)
+    except OSError:
+        return {}
+    signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+    if _feeds is None or _feeds[0] != signature:
+        data = storage.read_json(FEEDS_FILE) or {}
+        _feeds = (signature, {item["id"]: item for item in data.get("items", [])})
+    return _feeds[1]
+
+
+def rehydrate(item_ids):
+    """
+    The items with the given ids from feeds.json
+
+    Returns:
+        list of item copies, or None if any of them is missing
+    """
+    with _feeds_lock:
+        items = _feed_items()
+        if not all(item_id in items for item_id in item_ids):
+            return None
+        return [copy.deepcopy(items[item_id]) for item_id in item_ids]
+
+
+def source_fingerprint(source):
+    """Hash of the source config, so edits in sources.yaml invalidate cached items"""
+    raw = json.dumps(source, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def parse_feed(url, source, timeout=FEED_TIMEOUT, limit=None):
+    """
+    Parse a feed with a conditional request
+
+    Args:
+        url: feed URL
+        source: source dict the feed belongs to
+        timeout: request timeout in seconds
+        limit: if set, only the first limit entries are needed and the
+            streaming parser is tried before feedparser
+
+    Returns:
+        (feed, cached_items): feed is None and cached_items is the list of
+        items extracted last time (as now in feeds.json) when the server
+        answers 304 Not Modified; otherwise feed is the parsed feed and
+        cached_items is None
+    """
+    fingerprint = source_fingerprint(source)
+    with _cache.lock:
+        entry = _cache.entries().get(url)
+    if entry and (entry.get("source") != fingerprint or "item_ids" not in entry):
+        entry = None
+    # A 304 can only be answered if every item is still in feeds.json
+    cached_items = rehydrate(entry["item_ids"]) if entry else None
+    if cached_items is None:
+        entry = None
+    
+    headers = {"User-Agent": feedparser.USER_AGENT}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("modified"):
+        headers["If-Modified-Since"] = entry["modified"]
+    
+    response = http_client.get(url, headers=headers, timeout=timeout, max_retries=FEED_RETRIES)
+    
+    if entry and response.status_code == 304:
+        metrics.incr("http_cache.hits")
+        return None, cached_items
+    metrics.incr("http_cache.misses")
+    
+    feed = feed_stream.parse(response.content, limit) if limit else None
+    if feed is None:
+        feed = feedparser.parse(response.content, response_headers=dict(response.headers))
+    else:
+        metrics.incr("feed_stream.parsed")
+    feed["status"] = response.status_code
+    feed["etag"] = response.headers.get("ETag")
+    feed["modified"] = response.headers.get("Last-Modified")
+    return feed, None
+
+
+def remember(url, source, feed, items):
+    """Store the validators of a freshly parsed feed with the ids of its extracted items"""
+    etag = feed.get("etag")
+    modified = feed.get("modified")
+    
+    with _cache.lock:
+        entries = _cache.entries()
+        if not etag and not modified:
+            # Nothing to validate against next time
+            if entries.pop(url, None) is not None:
+                _cache.mark_dirty()
+            return
+        entries[url] = {
+            "etag": etag,
+            "modified": modified,
+            "source": source_fingerprint(source),
+            "item_ids": [item["id"] for item in items],
+        }
+        _cache.mark_dirty()
+
+
+def save_cache():
+    """Write the cache back to disk if anything changed"""
+    _cache.save()
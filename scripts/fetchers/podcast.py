@@ -3,10 +3,10 @@ Podcast RSS Fetcher
 Fetches episodes from podcast RSS feeds
 """
 
-import re
-import feedparser
-from datetime import datetime
-from dateutil import parser as date_parser
+from . import http_cache
+from .utils import NON_ALNUM_RE, html_to_text, published_iso
+
+MAX_ENTRIES = 10  # Most recent episodes kept per run
 
 
 def parse_duration(duration_str):
@@ -44,7 +44,9 @@ def fetch_podcast(source):
     if not feed_url:
         raise ValueError(f"No feed_url for {source['name']}")
     
-    feed = feedparser.parse(feed_url)
+    feed, cached_items = http_cache.parse_feed(feed_url, source, limit=MAX_ENTRIES)
+    if cached_items is not None:
+        return cached_items  # 304 Not Modified
     
     if feed.bozo and not feed.entries:
         raise Exception(f"Failed to parse RSS: {feed.bozo_exception}")
@@ -58,18 +60,13 @@ def fetch_podcast(source):
     
     items = []
     
-    for entry in feed.entries[:10]:  # Limit to 10 most recent
+    for entry in feed.entries[:MAX_ENTRIES]:
         # Generate unique ID
         guid = entry.get("id", "") or entry.get("link", "")
-        episode_id = re.sub(r'[^a-zA-Z0-9]', '_', guid)[:50]
+        episode_id = NON_ALNUM_RE.sub('_', guid)[:50]
         
         # Parse published date
-        published = entry.get("published", "")
-        try:
-            published_dt = date_parser.parse(published)
-            published = published_dt.isoformat()
-        except:
-            published = datetime.utcnow().isoformat()
+        published = published_iso(entry.get("published", ""))
         
         # Get episode artwork or fall back to podcast artwork
         thumbnail = None
@@ -99,8 +96,7 @@ def fetch_podcast(source):
             description = entry.description
         
         # Clean HTML from description
-        clean_desc = re.sub(r'<[^>]+>', '', description)
-        clean_desc = re.sub(r'\s+', ' ', clean_desc).strip()
+        clean_desc = html_to_text(description)
         
         item = {
             "id": f"pod_{source['id']}_{episode_id}",
@@ -120,5 +116,6 @@ def fetch_podcast(source):
         
         items.append(item)
     
+    http_cache.remember(feed_url, source, feed, items)
     return items
 
@@ -1,12 +1,33 @@
 """
 Twitter/X RSS Fetcher
 Fetches tweets via Nitter RSS (note: may be unstable)
+
+Nitter instances come and go, so their health (latency, success rate,
+last failure) is tracked across runs. For every account the healthiest
+instances are raced and the first usable feed wins; an instance that
+keeps failing is skipped for the rest of the run.
 """
 
-import re
-import feedparser
-from datetime import datetime
-from dateutil import parser as date_parser
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from . import http_cache
+from .health import HealthTable
+from .utils import IMG_SRC_RE, TWEET_ID_RE, html_to_text, published_iso
+
+# Nitter instances (they can be unstable)
+NITTER_INSTANCES = [
+    "nitter.poast.org",
+    "nitter.privacydev.net",
+    "nitter.net",
+]
+NITTER_URL = "https://{instance}/{username}/rss"
+NITTER_TIMEOUT = 8  # Seconds; a dead instance must not stall the run
+RACE_WIDTH = 2  # Instances raced at once per account
+
+HEALTH_FILE = Path(__file__).parent.parent.parent / "data" / "cache" / "nitter_health.json"
+health = HealthTable(HEALTH_FILE)
 
 
 def extract_images(content):
@@ -16,7 +37,7 @@ def extract_images(content):
     
     images = []
     # Find all img tags
-    for match in re.finditer(r'<img[^>]+src=["\']([^"\']+)["\']', content):
+    for match in IMG_SRC_RE.finditer(content):
         url = match.group(1)
         # Filter to only include actual tweet images
         if 'pbs.twimg.com' in url or 'pic.twitter.com' in url:
@@ -26,22 +47,60 @@ def extract_images(content):
 
 
 def clean_content(html):
-    """Remove HTML tags and clean up content"""
-    if not html:
-        return ""
+    """Remove HTML tags, decode entities and clean up whitespace"""
+    return html_to_text(html)
+
+
+def fetch_from_instance(instance, username, source):
+    """
+    Fetch an account's RSS from one Nitter instance and record its health
+
+    Returns:
+        (rss_url, feed, cached_items) if the instance answered with a
+        usable feed (or 304 Not Modified), otherwise None
+    """
+    rss_url = NITTER_URL.format(instance=instance, username=username)
+    start = time.perf_counter()
+    try:
+        feed, cached_items = http_cache.parse_feed(rss_url, source, timeout=NITTER_TIMEOUT)
+    except Exception:
+        feed, cached_items = None, None
     
-    # Remove HTML tags
-    text = re.sub(r'<[^>]+>', '', html)
-    # Clean up whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    # Decode HTML entities
-    text = text.replace('&amp;', '&')
-    text = text.replace('&lt;', '<')
-    text = text.replace('&gt;', '>')
-    text = text.replace('&quot;', '"')
-    text = text.replace('&#39;', "'")
+    ok = cached_items is not None or bool(feed and feed.entries)
+    health.record(instance, ok, time.perf_counter() - start)
+    return (rss_url, feed, cached_items) if ok else None
+
+
+def race_instances(username, source):
+    """
+    Race the healthiest instances, RACE_WIDTH at a time
+
+    Returns:
+        the first successful fetch_from_instance() result, or None
+    """
+    candidates = health.ranked(NITTER_INSTANCES)
     
-    return text
+    while candidates:
+        wave, candidates = candidates[:RACE_WIDTH], candidates[RACE_WIDTH:]
+        executor = ThreadPoolExecutor(max_workers=len(wave))
+        try:
+            futures = [executor.submit(fetch_from_instance, i, username, source) for i in wave]
+            for future in as_completed(futures):
+                result = future.result()
+                if result:
+                    return result
+        finally:
+            # Don't wait for the losers; they still record their health
+            executor.shutdown(wait=False)
+        
+        candidates = [i for i in candidates if not health.is_broken(i)]
+    
+    return None
+
+
+def save_health():
+    """Persist the Nitter instance health table"""
+    health.save()
 
 
 def fetch_twitter(source):
@@ -58,45 +117,28 @@ def fetch_twitter(source):
     if not username:
         raise ValueError(f"No username for {source['name']}")
     
-    # Try multiple Nitter instances (they can be unstable)
-    nitter_instances = [
-        "nitter.poast.org",
-        "nitter.privacydev.net",
-        "nitter.net",
-    ]
-    
-    feed = None
-    for instance in nitter_instances:
-        try:
-            rss_url = f"https://{instance}/{username}/rss"
-            feed = feedparser.parse(rss_url)
-            if feed.entries:
-                break
-        except:
-            continue
-    
-    if not feed or not feed.entries:
+    result = race_instances(username, source)
+    if not result:
         # Return empty list instead of raising error (X is often unstable)
         return []
     
+    rss_url, feed, cached_items = result
+    if cached_items is not None:
+        return cached_items  # 304 Not Modified
+    
     items = []
     
     for entry in feed.entries[:10]:  # Limit to 10 most recent
         # Extract tweet ID from link
         link = entry.get("link", "")
-        tweet_id_match = re.search(r'/status/(\d+)', link)
+        tweet_id_match = TWEET_ID_RE.search(link)
         if not tweet_id_match:
             continue
         
         tweet_id = tweet_id_match.group(1)
         
         # Parse published date
-        published = entry.get("published", "")
-        try:
-            published_dt = date_parser.parse(published)
-            published = published_dt.isoformat()
-        except:
-            published = datetime.utcnow().isoformat()
+        published = published_iso(entry.get("published", ""))
         
         # Get content and images
         description = entry.get("description", "")
@@ -123,5 +165,6 @@ def fetch_twitter(source):
         
         items.append(item)
     
+    http_cache.remember(rss_url, source, feed, items)
     return items
 
@@ -0,0 +1,99 @@
+"""
+Fetcher Utilities
+Shared, precompiled extraction helpers for the fetchers: link/ID patterns,
+a fast published-date parser and an HTML-to-text converter
+"""
+
+import html
+import re
+from datetime import datetime, timedelta, timezone
+
+from dateutil import parser as date_parser
+
+# Patterns used on every entry
+IMG_SRC_RE = re.compile(r'<img[^>]+src=["\']([^"\']+)["\']')
+BVID_RE = re.compile(r'BV\w+')
+TWEET_ID_RE = re.compile(r'/status/(\d+)')
+YOUTUBE_ID_RE = re.compile(r'v=([a-zA-Z0-9_-]+)')
+ISO_DURATION_RE = re.compile(r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?')
+NON_ALNUM_RE = re.compile(r'[^a-zA-Z0-9]')
+TAG_RE = re.compile(r'<[^>]+>')
+
+# RFC 822 dates as used by RSS: "Mon, 01 Jun 2026 08:00:00 +0000" / "... GMT"
+RFC822_RE = re.compile(
+    r'(?:[A-Za-z]{3},\s*)?(\d{1,2})\s+([A-Za-z]{3})\s+(\d{4})\s+'
+    r'(\d{1,2}):(\d{2})(?::(\d{2}))?\s*([+-]\d{4}|GMT|UTC|UT|Z)'
+)
+MONTHS = {m: i for i, m in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1
+)}
+
+
+def _rfc822(value):
+    match = RFC822_RE.fullmatch(value)
+    if not match:
+        return None
+    day, month, year, hour, minute, second, zone = match.groups()
+    month = MONTHS.get(month.lower())
+    if month is None:
+        return None
+    if zone[0] in "+-":
+        offset = timedelta(hours=int(zone[1:3]), minutes=int(zone[3:5]))
+        tz = timezone(-offset if zone[0] == "-" else offset)
+    else:
+        tz = timezone.utc
+    return datetime(int(year), month, int(day), int(hour), int(minute), int(second or 0), tzinfo=tz)
+
+
+def parse_date(value):
+    """
+    Parse a feed date string to a datetime
+
+    RFC 822 (RSS) and ISO 8601 (Atom) with an explicit zone take a fast
+    path; anything else goes through dateutil, so results match what
+    dateutil would return.
+
+    Raises:
+        ValueError/OverflowError if the string can't be parsed
+    """
+    value = value.strip()
+    try:
+        parsed = _rfc822(value)
+        if parsed is None and value[:4].isdigit():
+            parsed = datetime.fromisoformat(value)
+            if parsed.tzinfo is None:
+                parsed = None
+    except ValueError:
+        parsed = None
+    if parsed is not None:
+        return parsed
+    return date_parser.parse(value)
+
+
+def published_iso(value):
+    """ISO string for an entry's published date, or now if it can't be parsed"""
+    try:
+        return parse_date(value).isoformat()
+    except (ValueError, OverflowError, TypeError, AttributeError):
+        return datetime.utcnow().isoformat()
+
+
+def html_to_text(text):
+    """
+    Strip tags, collapse whitespace and decode entities
+
+    Each step runs in C (one regex substitution, str.split, str.replace
+    for the common entities); html.unescape only runs for other entities.
+    A single regex pass with a Python callback per token measured 2-3x
+    slower. Entities are decoded last, so an escaped "&lt;b&gt;" stays
+    text.
+    """
+    if not text:
+        return ""
+    text = " ".join(TAG_RE.sub("", text).split())
+    if "&" not in text:
+        return text
+    text = text.replace("&lt;", "<").replace("&gt;", ">").replace("&quot;", '"').replace("&#39;", "'")
+    if text.count("&") == text.count("&amp;"):
+        return text.replace("&amp;", "&")
+    return html.unescape(text)
@@ -3,10 +3,11 @@ YouTube RSS Fetcher
 Fetches videos from YouTube channels via RSS
 """
 
-import re
-import feedparser
-from datetime import datetime
-from dateutil import parser as date_parser
+from . import http_cache
+from .utils import ISO_DURATION_RE, YOUTUBE_ID_RE, published_iso
+
+RSS_URL = "https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
+MAX_ENTRIES = 10  # Most recent videos kept per run
 
 
 def parse_duration(duration_str):
@@ -15,7 +16,7 @@ def parse_duration(duration_str):
         return None
     
     # Try to parse PT1H30M45S format
-    match = re.match(r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?', duration_str)
+    match = ISO_DURATION_RE.match(duration_str)
     if match:
         hours = int(match.group(1) or 0)
         minutes = int(match.group(2) or 0)
@@ -39,21 +40,23 @@ def fetch_youtube(source):
     if not channel_id:
         raise ValueError(f"No channel_id for {source['name']}")
     
-    rss_url = f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
+    rss_url = RSS_URL.format(channel_id=channel_id)
     
-    feed = feedparser.parse(rss_url)
+    feed, cached_items = http_cache.parse_feed(rss_url, source, limit=MAX_ENTRIES)
+    if cached_items is not None:
+        return cached_items  # 304 Not Modified
     
     if feed.bozo and not feed.entries:
         raise Exception(f"Failed to parse RSS: {feed.bozo_exception}")
     
     items = []
     
-    for entry in feed.entries[:10]:  # Limit to 10 most recent
+    for entry in feed.entries[:MAX_ENTRIES]:
         video_id = entry.get("yt_videoid", "")
         
         # Extract video ID from link if not available directly
         if not video_id and entry.get("link"):
-            match = re.search(r'v=([a-zA-Z0-9_-]+)', entry.link)
+            match = YOUTUBE_ID_RE.search(entry.link)
             if match:
                 video_id = match.group(1)
         
@@ -61,12 +64,7 @@ def fetch_youtube(source):
             continue
         
         # Parse published date
-        published = entry.get("published", "")
-        try:
-            published_dt = date_parser.parse(published)
-            published = published_dt.isoformat()
-        except:
-            published = datetime.utcnow().isoformat()
+        published = published_iso(entry.get("published", ""))
         
         # Get thumbnail (high quality)
         thumbnail = f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg"
@@ -95,5 +93,6 @@ def fetch_youtube(source):
         
         items.append(item)
     
+    http_cache.remember(rss_url, source, feed, items)
     return items
 
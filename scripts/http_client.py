@@ -0,0 +1,149 @@
+"""
+HTTP Client
+Shared keep-alive session with retry/backoff, used for feeds and API calls
+
+Every attempt is timed per host in the run metrics (http.<host>).
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# Connection pool settings
+POOL_CONNECTIONS = 10  # Number of hosts kept in the pool
+POOL_MAXSIZE = 16  # Keep-alive connections per host
+
+# Retry settings
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0  # Seconds, doubled on every attempt
+BACKOFF_MAX = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout)
+# Non-idempotent requests (POST) are only retried when the server can't
+# have done the work: connection failures (refused, DNS, connect timeout)
+# and 429. A 5xx or a read timeout may come after it was processed and billed.
+POST_RETRY_STATUSES = {429}
+CONNECT_ERRORS = (requests.ConnectionError,)
+
+
+class RateLimited(Exception):
+    """Raised by callers when a server keeps answering 429 after all retries"""
+
+
+_session = None
+_lock = threading.Lock()
+_stats = {"requests": 0, "retries": 0, "failures": 0, "bytes": 0}
+
+
+def get_session():
+    """Return the shared requests.Session, creating it on first use"""
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _count(key, n=1):
+    with _lock:
+        _stats[key] += n
+
+
+def retry_after(response):
+    """Seconds to wait according to a Retry-After header, or None"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for the given attempt (0-based)"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def request(method, url, max_retries=MAX_RETRIES, retry_statuses=RETRY_STATUSES,
+            retry_errors=RETRY_ERRORS, **kwargs):
+    """
+    Send a request through the shared session
+
+    Connection errors, timeouts and retry_statuses responses (429/5xx by
+    default) are retried up to max_retries times with exponential
+    backoff, honoring Retry-After. Callers that adapt their own rate to
+    429s pass a set without 429 and get the response right away. post()
+    defaults to POST_RETRY_STATUSES and CONNECT_ERRORS.
+
+    Returns:
+        requests.Response (the last one, if every retry failed with a status)
+
+    Raises:
+        requests.RequestException when the last attempt fails to connect,
+        or at once for errors not in retry_errors
+    """
+    session = get_session()
+    host = urlparse(url).netloc
+    
+    for attempt in range(max_retries + 1):
+        _count("requests")
+        try:
+            with metrics.timer(f"http.{host}"):
+                response = session.request(method, url, **kwargs)
+                _count("bytes", len(response.content))
+        except retry_errors:
+            if attempt == max_retries:
+                _count("failures")
+                raise
+            delay = backoff_delay(attempt)
+        except RETRY_ERRORS:
+            # Not retryable for this caller
+            _count("failures")
+            raise
+        else:
+            if response.status_code not in retry_statuses:
+                return response
+            if attempt == max_retries:
+                _count("failures")
+                return response
+            delay = retry_after(response)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            delay = min(delay, BACKOFF_MAX)
+        
+        _count("retries")
+        time.sleep(delay)
+
+
+def get(url, **kwargs):
+    """GET through the shared session"""
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    """POST through the shared session, retrying only what the server can't have processed"""
+    kwargs.setdefault("retry_statuses", POST_RETRY_STATUSES)
+    kwargs.setdefault("retry_errors", CONNECT_ERRORS)
+    return request("POST", url, **kwargs)
+
+
+def stats():
+    """Snapshot of request/retry/failure/byte counters"""
+    with _lock:
+        return dict(_stats)
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+SQLite Item Store
+Working copy of the feed items, with indexed point updates instead of
+rewriting the whole item list:
+
+    data/items.db    SQLite database in WAL mode, next to feeds.json
+
+Tables:
+    items        the full item (JSON) plus indexed columns: id, source_id,
+                 platform, published, has_transcript, has_summary
+    meta         the feeds.json header and the signature of the
+                 feeds.json the items were last imported from/exported to
+
+feeds.json stays the published format (the frontend and git history read
+it) and is exported from the store by feed_store. The database is not
+committed: on a fresh checkout, or when feeds.json was changed behind the
+store's back (git pull, a manual edit), the items are re-imported from
+feeds.json before use; only rows that differ are rewritten. WAL lets the
+stages read while another one commits; writes are short IMMEDIATE
+transactions.
+
+Only items are stored. Transcript and summary metadata stay in their
+files (data/transcripts, data/summaries: the summary's provenance is what
+summarize compares), and per-source fetch state stays in the scheduler's
+data/cache/schedule.json. The files are committed or cached and the
+database is rebuilt on every CI run, so tables mirroring them would
+have to be re-imported from the same files before they could be read.
+
+The point updates remove the linear scans, but the export still rewrites
+feeds.json in full (the sharded store only rewrites the shards of the
+updated items, see feed_store): update_feeds exports it once per call, i.e. at each
+transcript/summary checkpoint of the standalone scripts and once per
+pipeline run.
+
+Usage:
+    python item_store.py                 # sync from feeds.json and print counts
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import storage
+
+# Paths
+SCRIPT_DIR = Path(__file__).parent
+DATA_DIR = SCRIPT_DIR.parent / "data"
+FEEDS_FILE = DATA_DIR / "feeds.json"
+DB_NAME = "items.db"  # Kept next to the feeds.json it mirrors
+
+SCHEMA_VERSION = 2
+BUSY_TIMEOUT = 30  # Seconds a writer waits for another one to commit
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    source_id TEXT,
+    platform TEXT,
+    published TEXT,
+    has_transcript INTEGER NOT NULL DEFAULT 0,
+    has_summary INTEGER NOT NULL DEFAULT 0,
+    duplicate_of TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_source ON items (source_id);
+CREATE INDEX IF NOT EXISTS items_platform ON items (platform, published);
+CREATE INDEX IF NOT EXISTS items_published ON items (published);
+CREATE INDEX IF NOT EXISTS items_position ON items (position);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+-- Metadata tables of schema version 1
+DROP TABLE IF EXISTS transcripts;
+DROP TABLE IF EXISTS summaries;
+DROP TABLE IF EXISTS fetch_state;
+"""
+
+# Databases whose schema was checked by this process
+_initialized = set()
+_initialized_lock = threading.Lock()
+
+
+def db_file(feeds_file=None):
+    """The database that mirrors a feeds.json"""
+    return Path(feeds_file or FEEDS_FILE).with_name(DB_NAME)
+
+
+@contextmanager
+def connect(feeds_file=None):
+    """
+    Open the store of a feeds.json (created on first use)
+
+    Yields:
+        sqlite3.Connection in autocommit mode; use transaction() to write
+    """
+    path = db_file(feeds_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+    try:
+        with _initialized_lock:
+            if str(path) not in _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                    conn.executescript(SCHEMA)
+                    conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+                _initialized.add(str(path))
+        # WAL keeps the database consistent on a crash with NORMAL; only
+        # the last commits can be lost, and feeds.json is re-imported then
+        conn.execute("PRAGMA synchronous=NORMAL")
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def transaction(conn):
+    """Write transaction holding the write lock from the start (no upgrade deadlocks)"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def utcnow():
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def get_meta(conn, key, default=None):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return json.loads(row[0]) if row else default
+
+
+def set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                 (key, json.dumps(value, ensure_ascii=False)))
+
+
+def file_signature(path):
+    """Identifies one version of a file (atomic_write replaces the inode), or None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def _row(item, position):
+    return (
+        item["id"],
+        position,
+        item.get("sourceId"),
+        item.get("platform"),
+        item.get("published"),
+        1 if item.get("hasTranscript") else 0,
+        1 if item.get("hasSummary") else 0,
+        item.get("duplicateOf"),
+        json.dumps(item, ensure_ascii=False),
+    )
+
+
+def replace_items(conn, data):
+    """
+    Make the items those of a feeds.json document
+
+    Only new and changed items are written, and items that are no longer
+    in the document are deleted; items that only moved (new items are
+    inserted at the top) get their position updated. The header
+    (last_updated, ...) is kept for the export.
+
+    Returns:
+        number of items written or deleted
+    """
+    rows = [_row(item, position) for position, item in enumerate(data.get("items", []))]
+    with transaction(conn):
+        stored = {item_id: (position, blob) for item_id, position, blob
+                  in conn.execute("SELECT id, position, data FROM items")}
+        changed, moved = [], []
+        for row in rows:
+            position, blob = stored.get(row[0], (None, None))
+            if blob != row[-1]:
+                changed.append(row)
+            elif position != row[1]:
+                moved.append((row[1], row[0]))
+        removed = stored.keys() - {row[0] for row in rows}
+        conn.executemany("DELETE FROM items WHERE id = ?", ((item_id,) for item_id in removed))
+        conn.executemany("INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", changed)
+        conn.executemany("UPDATE items SET position = ? WHERE id = ?", moved)
+        set_meta(conn, "header", {k: v for k, v in data.items() if k not in ("count", "items")})
+        set_meta(conn, "feeds_signature", None)
+    return len(changed) + len(removed)
+
+
+def mark_synced(conn, feeds_file):
+    """Record that feeds_file now matches the store"""
+    set_meta(conn, "feeds_signature", file_signature(feeds_file))
+
+
+def sync(conn, feeds_file=None):
+    """
+    Re-import feeds.json if it changed since the store last wrote or read it
+
+    Returns:
+        False if there is no readable feeds.json, True otherwise
+    """
+    feeds_file = feeds_file or FEEDS_FILE
+    signature = file_signature(feeds_file)
+    if signature is None:
+        return False
+    if get_meta(conn, "feeds_signature") == signature:
+        return True
+
+    with storage.file_lock(feeds_file):
+        signature = file_signature(feeds_file)
+        if get_meta(conn, "feeds_signature") == signature:
+            return True
+        data = storage.read_json(feeds_file)
+        if data is None:
+            return False
+        replace_items(conn, data)
+        mark_synced(conn, feeds_file)
+    return True
+
+
+def update_items(conn, updates):
+    """
+    Merge per-item field updates ({item_id: {field: value}})
+
+    Each item is looked up by its primary key; items that are no longer
+    in the store are skipped. A value of None removes the field.
+
+    Returns:
+        number of items whose fields changed
+    """
+    updated = 0
+    with transaction(conn):
+        for item_id, fields in updates.items():
+            row = conn.execute("SELECT position, data FROM items WHERE id = ?", (item_id,)).fetchone()
+            if row is None:
+                continue
+            item = json.loads(row[1])
+            if all(item.get(k) == v for k, v in fields.items()):
+                continue
+            item.update(fields)
+            for key in [k for k, v in fields.items() if v is None]:
+                del item[key]
+            conn.execute("UPDATE items SET source_id = ?, platform = ?, published = ?, has_transcript = ?, "
+                         "has_summary = ?, duplicate_of = ?, data = ? WHERE id = ?",
+                         _row(item, row[0])[2:] + (item_id,))
+            updated += 1
+    return updated
+
+
+def query(conn, platforms=None, has_transcript=None, duplicates=True, source_id=None):
+    """
+    Items matching the filters, in feeds.json order
+
+    Args:
+        platforms: optional list of platforms
+        has_transcript: optional True/False
+        duplicates: False leaves out items marked as duplicates
+        source_id: optional source id
+    """
+    where, params = [], []
+    if platforms:
+        where.append(f"platform IN ({', '.join('?' * len(platforms))})")
+        params.extend(platforms)
+    if has_transcript is not None:
+        where.append("has_transcript = ?")
+        params.append(1 if has_transcript else 0)
+    if not duplicates:
+        where.append("duplicate_of IS NULL")
+    if source_id is not None:
+        where.append("source_id = ?")
+        params.append(source_id)
+    sql = "SELECT data FROM items"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return [json.loads(row[0]) for row in conn.execute(sql + " ORDER BY position", params)]
+
+
+def export(conn):
+    """The feeds.json document for the current items"""
+    items = query(conn)
+    header = get_meta(conn, "header") or {}
+    return {
+        "last_updated": header.pop("last_updated", None) or utcnow(),
+        "count": len(items),
+        "items": items,
+        **header,
+    }
+
+
+def load_items(feeds_file=None, **filters):
+    """
+    Items of a feeds.json via the store (see query() for the filters)
+
+    Returns:
+        list of items, or None if there is no feeds.json
+    """
+    with connect(feeds_file) as conn:
+        if not sync(conn, feeds_file):
+            return None
+        return query(conn, **filters)
+
+
+def stats(conn):
+    """Item counts per platform and transcript/summary/duplicate flag"""
+    counts = {
+        "items": conn.execute("SELECT COUNT(*) FROM items").fetchone()[0],
+        "platforms": dict(conn.execute(
+            "SELECT platform, COUNT(*) FROM items GROUP BY platform ORDER BY platform").fetchall()),
+    }
+    for key, sql in (
+        ("with_transcript", "SELECT COUNT(*) FROM items WHERE has_transcript = 1"),
+        ("with_summary", "SELECT COUNT(*) FROM items WHERE has_summary = 1"),
+        ("duplicates", "SELECT COUNT(*) FROM items WHERE duplicate_of IS NOT NULL"),
+    ):
+        counts[key] = conn.execute(sql).fetchone()[0]
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite item store")
+    parser.parse_args()
+
+    with connect() as conn:
+        if not sync(conn):
+            print("No feeds.json found. Run fetch_all.py first.")
+        else:
+            counts = stats(conn)
+            print(f"{db_file()}: {counts['items']} items")
+            for platform, count in counts["platforms"].items():
+                print(f"  {platform}: {count}")
+            print(f"  With transcript: {counts['with_transcript']}")
+            print(f"  With summary: {counts['with_summary']}")
+            print(f"  Duplicates: {counts['duplicates']}")
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Run Metrics
+Collects counters and latencies while a pipeline stage runs, and writes a
+machine-readable report at the end of every run:
+
+    data/metrics/<stage>_latest.json   full report of the last run
+    data/metrics/history.jsonl         one rolled-up line per run
+
+Counters are plain numbers (items, bytes, retries, cache hits, LLM tokens).
+Timings are lists of durations in seconds, keyed by name; names use dots
+for grouping, e.g. "source.youtube.lex_fridman" or "llm.call". Timings
+recorded with a label (an item id) also keep the slowest labels per name.
+
+Usage:
+    python metrics.py                  # compare the last two runs per stage
+    python metrics.py --stage fetch
+"""
+
+import argparse
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import storage
+
+# Paths
+SCRIPT_DIR = Path(__file__).parent
+DATA_DIR = SCRIPT_DIR.parent / "data"
+METRICS_DIR = DATA_DIR / "metrics"
+HISTORY_FILE = METRICS_DIR / "history.jsonl"
+
+HISTORY_LIMIT = 1000  # Runs kept in history.jsonl
+REGRESSION_THRESHOLD = 0.25  # Relative change flagged by the comparison
+SLOWEST_KEPT = 10  # Slowest labelled timings reported per name
+
+_lock = threading.Lock()
+_counters = {}
+_timings = {}
+_slowest = {}
+_started = time.time()
+
+
+def incr(name, n=1):
+    """Add n to a counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def add_counters(prefix, counts):
+    """Add a dict of counts under prefix.<key>"""
+    for key, n in counts.items():
+        incr(f"{prefix}.{key}", n)
+
+
+def observe(name, seconds, label=None):
+    """Record one duration, optionally labelled with the item it belongs to"""
+    with _lock:
+        _timings.setdefault(name, []).append(seconds)
+        if label is not None:
+            slowest = _slowest.setdefault(name, [])
+            slowest.append((round(seconds, 3), label))
+            slowest.sort(reverse=True)
+            del slowest[SLOWEST_KEPT:]
+
+
+@contextmanager
+def timer(name, label=None):
+    """Time a block and record it under name (also when it raises)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, label)
+
+
+def reset():
+    """Clear everything recorded so far and restart the run clock"""
+    global _started
+    with _lock:
+        _counters.clear()
+        _timings.clear()
+        _slowest.clear()
+        _started = time.time()
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize_timings(values):
+    """count/total/mean/p50/p95/max of a list of durations"""
+    values = sorted(values)
+    total = sum(values)
+    return {
+        "count": len(values),
+        "total": round(total, 3),
+        "mean": round(total / len(values), 3) if values else 0.0,
+        "p50": round(percentile(values, 0.5), 3),
+        "p95": round(percentile(values, 0.95), 3),
+        "max": round(values[-1], 3) if values else 0.0,
+    }
+
+
+def snapshot():
+    """Counters and summarized timings recorded so far"""
+    with _lock:
+        counters = dict(_counters)
+        timings = {name: list(values) for name, values in _timings.items()}
+        slowest = {name: [[label, seconds] for seconds, label in entries]
+                   for name, entries in sorted(_slowest.items())}
+    return {
+        "counters": dict(sorted(counters.items())),
+        "timings": {name: summarize_timings(values) for name, values in sorted(timings.items())},
+        "slowest": slowest,
+    }
+
+
+def write_run(stage, extra=None):
+    """
+    Write the report for a finished run
+
+    Args:
+        stage: pipeline stage name (fetch, transcript, summarize)
+        extra: optional dict merged into the report (e.g. run options)
+
+    Returns:
+        the report dict
+    """
+    finished = time.time()
+    report = {
+        "stage": stage,
+        "started": datetime.utcfromtimestamp(_started).isoformat() + "Z",
+        "finished": datetime.utcfromtimestamp(finished).isoformat() + "Z",
+        "duration": round(finished - _started, 3),
+        **(extra or {}),
+        **snapshot(),
+    }
+
+    storage.write_json(METRICS_DIR / f"{stage}_latest.json", report)
+
+    # History keeps counters and the headline numbers of every timing
+    rollup = {
+        **{k: v for k, v in report.items() if k not in ("counters", "timings", "slowest")},
+        "counters": report["counters"],
+        "timings": {
+            name: {k: summary[k] for k in ("count", "total", "p95")}
+            for name, summary in report["timings"].items()
+        },
+    }
+    # Stages running at the same time append to the same history
+    with storage.file_lock(HISTORY_FILE):
+        lines = read_history()
+        lines.append(rollup)
+        storage.atomic_write(HISTORY_FILE, "".join(
+            json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for line in lines[-HISTORY_LIMIT:]
+        ))
+
+    return report
+
+
+def read_history():
+    """All rolled-up runs, oldest first"""
+    runs = []
+    try:
+        with open(HISTORY_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    runs.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return runs
+
+
+def compare_runs(previous, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Changes between two rolled-up runs of the same stage
+
+    Returns:
+        list of (name, old, new, relative change) for the run duration,
+        counters and timing totals that moved by more than threshold
+    """
+    pairs = [("duration", previous.get("duration", 0), current.get("duration", 0))]
+    for name in sorted(set(previous["counters"]) | set(current["counters"])):
+        pairs.append((name, previous["counters"].get(name, 0), current["counters"].get(name, 0)))
+    for name in sorted(set(previous["timings"]) | set(current["timings"])):
+        old = previous["timings"].get(name, {}).get("total", 0)
+        new = current["timings"].get(name, {}).get("total", 0)
+        pairs.append((f"{name} (total s)", old, new))
+
+    changes = []
+    for name, old, new in pairs:
+        if old == new:
+            continue
+        change = (new - old) / old if old else float("inf")
+        if abs(change) > threshold:
+            changes.append((name, old, new, change))
+    return changes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the last two runs of each stage")
+    parser.add_argument("--stage", help="only this stage")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="relative change to report (default %(default)s)")
+    args = parser.parse_args()
+
+    by_stage = {}
+    for run in read_history():
+        by_stage.setdefault(run["stage"], []).append(run)
+
+    for stage, runs in sorted(by_stage.items()):
+        if args.stage and stage != args.stage:
+            continue
+        latest = runs[-1]
+        print(f"[{stage}] {latest['finished']}  {latest['duration']:.1f}s")
+        if len(runs) < 2:
+            print("  (no previous run)")
+            continue
+        changes = compare_runs(runs[-2], latest, args.threshold)
+        if not changes:
+            print("  no changes above threshold")
+        for name, old, new, change in changes:
+            pct = "new" if change == float("inf") else f"{change:+.0%}"
+            print(f"  {name}: {old:g} -> {new:g} ({pct})")
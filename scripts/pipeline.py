@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Oasis Pipeline
+Runs fetch -> transcript -> summarize -> index in one process
+
+The stages are connected by bounded queues and overlap in time: a video
+goes to the transcript workers as soon as its source has been parsed, and
+to the summary workers as soon as its transcript is saved. A full queue
+blocks the stage feeding it, so a slow stage holds back the ones before it
+instead of piling up work. The fetched items are saved to feeds.json as
+soon as fetching is done; transcript and summary flags collected along the
+way are merged in with a second write once the later stages are drained,
+followed by the search index update. An error in a stage after the fetch
+is reported and the remaining stages still run, so it never costs the
+fetched items.
+
+Videos already in feeds.json without a transcript are queued once fetching
+is done, as transcript.py would pick them up; a known duplicate is skipped
+while its canonical item has a transcript or may still get one. Newly
+seen items are only marked as duplicates when the fetched items are
+saved, so a cross-posted video may be transcribed under both ids on its
+first run.
+
+Usage:
+    python pipeline.py                      # fetch, transcripts, summaries, index
+    python pipeline.py --no-summarize       # skip the LLM stage
+    python pipeline.py --asr                # also speech-to-text for podcasts (see asr.py)
+"""
+
+import argparse
+import queue
+import threading
+from datetime import datetime
+
+from fetchers import http_cache, twitter
+from ratelimit import AdaptiveWindow, TokenBucket
+import asr
+import dedup
+import feed_store
+import fetch_all
+import http_client
+import metrics
+import scheduler
+import search_index
+import summarize
+import transcript
+import transcript_store
+
+# Items waiting between stages; a full queue blocks the stage before it
+QUEUE_SIZE = 32
+
+_DONE = object()  # Queue sentinel, one per worker
+
+
+class Pipeline:
+    """
+    Transcript and summary stages fed while sources are being fetched
+
+    Workers record feed item changes in `updates` ({item_id: {field: value}})
+    instead of writing feeds.json; run() merges them in once the stages are
+    drained.
+    """
+
+    def __init__(self, known, transcript_workers=transcript.MAX_WORKERS,
+                 max_in_flight=summarize.MAX_IN_FLIGHT, summaries=True, transcripts=True):
+        self.known = known  # id -> item already in feeds.json
+        self.transcript_workers = max(1, transcript_workers)
+        self.max_in_flight = max(1, max_in_flight)
+        self.summaries = summaries
+        self.transcripts = transcripts
+
+        self.updates = {}
+        self.counts = {
+            "transcripts": {
+                "fetched": 0, "skipped": 0, "deferred": 0,
+                transcript.NO_CAPTIONS: 0, transcript.UNAVAILABLE: 0, transcript.ERROR: 0,
+            },
+            "summaries": {"generated": 0, "cached": 0, "current": 0, "failed": 0, "legacy": 0},
+        }
+        self._lock = threading.Lock()
+        self._queued = set()
+        self._transcript_queue = queue.Queue(QUEUE_SIZE)
+        self._summary_queue = queue.Queue(QUEUE_SIZE)
+        self._buckets = {
+            platform: TokenBucket(rate, burst)
+            for platform, (rate, burst) in transcript.PLATFORM_RATES.items()
+        }
+        self._window = AdaptiveWindow(self.max_in_flight)
+        self._threads = []
+
+    def _count(self, stage, key):
+        with self._lock:
+            self.counts[stage][key] += 1
+
+    def _update(self, item_id, fields):
+        with self._lock:
+            self.updates.setdefault(item_id, {}).update(fields)
+
+    def _flag(self, item_id, field):
+        """Whether the item has the flag in feeds.json or was given it this run"""
+        with self._lock:
+            if field in self.updates.get(item_id, {}):
+                return True
+        return bool(self.known.get(item_id, {}).get(field))
+
+    # ---------- stages ----------
+
+    def start(self):
+        """Start the transcript and summary workers"""
+        stages = []
+        if self.transcripts:
+            stages.append((self._transcript_worker, self.transcript_workers))
+        if self.summaries:
+            stages.append((self._summary_worker, self.max_in_flight))
+        for target, count in stages:
+            for _ in range(count):
+                thread = threading.Thread(target=target, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def offer(self, item):
+        """Queue a video for its transcript (once per run; blocks while the queue is full)"""
+        if not self.transcripts or item["platform"] not in dedup.VIDEO_PLATFORMS:
+            return
+        # Duplicates share the canonical item's transcript while it has or may still get one
+        if dedup.covered_by_canonical(self.known.get(item["id"], item), self.known, transcript.ledger):
+            return
+        with self._lock:
+            if item["id"] in self._queued:
+                return
+            self._queued.add(item["id"])
+        self._transcript_queue.put(item)
+
+    def on_source(self, source, items):
+        """fetch_all() callback: hand a parsed source's videos to the transcript stage"""
+        for item in items:
+            self.offer(item)
+
+    def finish(self):
+        """Queue the backlog, then drain both stages in order"""
+        for item in self.known.values():
+            self.offer(item)
+
+        transcript_threads = self._threads[:self.transcript_workers] if self.transcripts else []
+        for _ in transcript_threads:
+            self._transcript_queue.put(_DONE)
+        for thread in transcript_threads:
+            thread.join()
+
+        summary_threads = self._threads[len(transcript_threads):]
+        for _ in summary_threads:
+            self._summary_queue.put(_DONE)
+        for thread in summary_threads:
+            thread.join()
+
+    def _transcript_worker(self):
+        while True:
+            item = self._transcript_queue.get()
+            if item is _DONE:
+                return
+            try:
+                has_transcript = self._transcribe(item)
+            except Exception as e:
+                print(f"  ! Error fetching transcript of {item['id']}: {e}")
+                transcript.ledger.record_failure(item["id"], transcript.ERROR)
+                self._count("transcripts", transcript.ERROR)
+                has_transcript = False
+            if has_transcript and self.summaries:
+                self._summary_queue.put(item)
+
+    def _transcribe(self, item):
+        """Fetch and save an item's transcript unless stored; returns whether it has one"""
+        item_id = item["id"]
+        title = (item.get("title") or item_id)[:50]
+
+        if transcript_store.transcript_exists(transcript.TRANSCRIPTS_DIR, item_id):
+            self._count("transcripts", "skipped")
+            # Restore the flag if a previous run was interrupted before saving feeds.json
+            if not self._flag(item_id, "hasTranscript"):
+                with transcript_store.open_transcript(transcript.TRANSCRIPTS_DIR, item_id) as reader:
+                    self._update(item_id, transcript.transcript_fields({"full_text": reader.preview(201)}))
+            return True
+
+        # Failed before: wait for the retry time in the attempt ledger
+        if not transcript.ledger.is_due(item_id):
+            self._count("transcripts", "deferred")
+            return False
+
+        platform = item["platform"]
+        self._buckets[platform].acquire(transcript.REQUESTS_PER_VIDEO[platform])
+        with metrics.timer(f"transcript.{platform}", item_id):
+            transcript_data, reason = transcript.fetch_and_record(item)
+
+        if not transcript_data:
+            self._count("transcripts", reason)
+            print(f"  ✗ [transcript] {title}: {transcript.FAILURE_LABELS[reason]}")
+            return False
+
+        transcript.save_transcript(item_id, transcript_data)
+        self._update(item_id, transcript.transcript_fields(transcript_data))
+        self._count("transcripts", "fetched")
+        print(f"  ✓ [transcript] {title}: {transcript_data['word_count']} words")
+        return True
+
+    def _summary_worker(self):
+        while True:
+            item = self._summary_queue.get()
+            if item is _DONE:
+                return
+            try:
+                self._summarize(item)
+            except Exception as e:
+                print(f"  ! Error summarizing {item['id']}: {e}")
+                self._count("summaries", "failed")
+
+    def _summarize(self, item):
+        item_id = item["id"]
+        title = item.get("title", item_id)
+
+        status, summary_data, provenance = summarize.summarize_item(item, self._window)
+        self._count("summaries", status)
+
+        if summary_data:
+            summarize.save_summary(item_id, summary_data, title, provenance)
+            source = "from cache" if status == "cached" else "generated"
+            print(f"  ✓ [summary] {title[:50]}: {len(summary_data.get('key_points', []))} key points ({source})")
+        elif status == "failed":
+            print(f"  ✗ [summary] {title[:50]}: Failed to generate summary")
+            return
+
+        if not self._flag(item_id, "hasSummary"):
+            self._update(item_id, {"hasSummary": True})
+
+
+def run_stage(name, func, failed):
+    """Run a stage after the fetch, reporting an error instead of raising it"""
+    try:
+        return func()
+    except Exception as e:
+        print(f"  ! {name} failed: {e}")
+        failed.append(name)
+        return None
+
+
+def run(args):
+    sources = fetch_all.load_sources().get("sources", [])
+    schedule = scheduler.load_schedule()
+    due = fetch_all.select_due(sources, schedule, args.all or args.replace)
+
+    existing = fetch_all.load_feeds() or {}
+    known = {item["id"]: item for item in existing.get("items", [])}
+
+    pipeline = Pipeline(
+        known,
+        transcript_workers=args.transcript_workers,
+        max_in_flight=args.max_in_flight,
+        summaries=not args.no_summarize,
+        transcripts=not args.no_transcripts,
+    )
+    pipeline.start()
+
+    outcomes = {}
+    items = fetch_all.fetch_all(due, workers=args.workers, outcomes=outcomes, on_items=pipeline.on_source)
+
+    # Save the fetched items first, so a failure in a later stage doesn't lose them
+    saved = fetch_all.save_feeds(items, replace=args.replace, history=args.history)
+    http_cache.save_cache()
+    twitter.save_health()
+
+    failed = []
+    run_stage("schedule", lambda: fetch_all.update_schedule(schedule, sources, due, outcomes, saved), failed)
+    run_stage("transcripts", pipeline.finish, failed)
+
+    # Speech-to-text runs last: it needs to know which videos had no captions
+    if args.asr:
+        def on_transcript(item, transcript_data):
+            pipeline.updates[item["id"]] = transcript.transcript_fields(transcript_data)
+
+        candidates = {**known, **{item["id"]: item for item in items}}
+        asr_counts = run_stage("asr", lambda: asr.transcribe_items(
+            list(candidates.values()), workers=args.asr_workers, max_items=args.asr_max_items,
+            on_transcript=on_transcript, caption_ledger=transcript.ledger), failed)
+        metrics.add_counters("asr", asr_counts or {})
+
+    if pipeline.updates:
+        updated = run_stage("feeds", lambda: feed_store.update_feeds(pipeline.updates), failed)
+        print(f"Updated {updated or 0} items in {fetch_all.FEEDS_FILE}")
+    transcript.ledger.prune(item["id"] for item in saved)
+    transcript.ledger.save()
+
+    # Indexes feeds.json as updated above
+    run_stage("index", search_index.update_index, failed)
+
+    counts = pipeline.counts
+    transcripts = counts["transcripts"]
+    print(f"\nTranscripts: {transcripts['fetched']} fetched, {transcripts['skipped']} existing, "
+          f"{transcripts['deferred']} deferred, {transcripts[transcript.NO_CAPTIONS]} without captions, "
+          f"{transcripts[transcript.UNAVAILABLE]} unavailable, {transcripts[transcript.ERROR]} failed")
+    if pipeline.summaries:
+        print(f"Summaries: {counts['summaries']['generated']} generated, "
+              f"{counts['summaries']['cached']} from cache, {counts['summaries']['failed']} failed")
+    print(f"HTTP retries: {http_client.stats()['retries']}")
+    if failed:
+        print(f"Failed stages: {', '.join(failed)}")
+
+    for stage, stage_counts in counts.items():
+        metrics.add_counters(stage, stage_counts)
+    metrics.add_counters("http", http_client.stats())
+    metrics.write_run("pipeline", {
+        "workers": args.workers,
+        "transcript_workers": args.transcript_workers,
+        "max_in_flight": args.max_in_flight,
+        "summaries": pipeline.summaries,
+        "asr": args.asr,
+        "failed_stages": failed,
+    })
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Fetch, transcribe, summarize and index in one run")
+    parser.add_argument("--workers", type=int, default=fetch_all.MAX_WORKERS,
+                        help=f"max sources fetched at once (default: {fetch_all.MAX_WORKERS})")
+    parser.add_argument("--transcript-workers", type=int, default=transcript.MAX_WORKERS,
+                        help=f"videos transcribed at once (default: {transcript.MAX_WORKERS})")
+    parser.add_argument("--max-in-flight", type=int, default=summarize.MAX_IN_FLIGHT,
+                        help=f"concurrent LLM requests (default: {summarize.MAX_IN_FLIGHT})")
+    parser.add_argument("--no-transcripts", action="store_true", help="skip transcripts (and summaries)")
+    parser.add_argument("--no-summarize", action="store_true", help="skip the summary stage")
+    parser.add_argument("--asr", action="store_true",
+                        help="transcribe podcasts and caption-less videos locally (needs requirements-asr.txt)")
+    parser.add_argument("--asr-workers", type=int, default=asr.ASR_WORKERS,
+                        help=f"speech-to-text processes (default: {asr.ASR_WORKERS})")
+    parser.add_argument("--asr-max-items", type=int, default=asr.ASR_MAX_ITEMS,
+                        help=f"items transcribed locally per run (default: {asr.ASR_MAX_ITEMS})")
+    parser.add_argument("--replace", action="store_true",
+                        help="rewrite feeds.json with only this run's items instead of merging")
+    parser.add_argument("--history", type=int, default=fetch_all.HISTORY_PER_SOURCE,
+                        help=f"items kept per source when merging (default: {fetch_all.HISTORY_PER_SOURCE})")
+    parser.add_argument("--all", action="store_true",
+                        help="poll every source, not only those the scheduler considers due")
+    args = parser.parse_args()
+    if args.no_transcripts:
+        args.no_summarize = True
+
+    print("=" * 50)
+    print("Oasis Pipeline")
+    print(f"Started at: {datetime.now().isoformat()}")
+    print("=" * 50)
+
+    fetch_all.DATA_DIR.mkdir(parents=True, exist_ok=True)
+    fetch_all.TRANSCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
+    run(args)
+
+    print(f"\nCompleted at: {datetime.now().isoformat()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Rate Limiting
+Thread-safe token bucket shared by the worker pools
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate` tokens per second, holding at most
+    `capacity` tokens. acquire() blocks until enough tokens are available.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        """Take `tokens` tokens, sleeping until the bucket has them"""
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveWindow:
+    """
+    Bounded window of in-flight requests that adapts to server pushback
+
+    The window starts at `max_size`. Every throttled request halves it
+    (down to `min_size`) and pauses new requests with exponential backoff;
+    every successful request grows it back additively (AIMD).
+    """
+
+    def __init__(self, max_size, min_size=1, max_pause=60.0):
+        self.max_size = max(1, max_size)
+        self.min_size = max(1, min(min_size, self.max_size))
+        self.max_pause = max_pause
+        self.size = float(self.max_size)
+        self._in_flight = 0
+        self._throttled = 0  # Consecutive throttled responses
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Block until a slot in the window is free"""
+        with self._cond:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0 and self._in_flight < int(self.size):
+                    self._in_flight += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, throttled=False):
+        """Free a slot, shrinking the window if the request was throttled"""
+        with self._cond:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                # Requests already in flight when the pause began count once
+                if now >= self._paused_until:
+                    self._throttled += 1
+                    self.size = max(self.min_size, self.size / 2)
+                    self._paused_until = now + min(self.max_pause, 2.0 ** self._throttled)
+            else:
+                self._throttled = 0
+                self.size = min(self.max_size, self.size + 1.0 / self.size)
+            self._cond.notify_all()
@@ -0,0 +1,139 @@
+"""
+Source Scheduler
+Decides which sources are due for polling, so each run only fetches
+sources that are likely to have posted something new
+
+Each source's polling interval is learned from the `published` dates of
+its items in feeds.json: a fraction of the median gap between posts,
+clamped to [MIN_INTERVAL, MAX_INTERVAL]. Sources that fail are backed off
+exponentially. Sources that are new, or whose config changed in
+sources.yaml, are always due.
+
+State is kept in data/cache/schedule.json:
+    {source id: {"next_poll", "interval", "failures", "last_poll",
+                 "last_success", "config"}}
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from statistics import median
+
+from dateutil import parser as date_parser
+
+import storage
+from fetchers.http_cache import source_fingerprint
+
+SCHEDULE_FILE = Path(__file__).parent.parent / "data" / "cache" / "schedule.json"
+
+# Interval settings (seconds)
+MIN_INTERVAL = 3600  # Never poll a source more often than this
+MAX_INTERVAL = 3 * 86400  # Even dormant sources are checked every few days
+CADENCE_FRACTION = 0.5  # Poll twice per typical gap between posts
+CADENCE_SAMPLES = 10  # Most recent posts used to estimate the gap
+GRACE = 2 * 3600  # Sources due within this window count as due now (runs are not exact)
+
+# Failure backoff (seconds), doubled for every consecutive failure
+FAILURE_BACKOFF = 3600
+MAX_FAILURE_BACKOFF = 3 * 86400
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+def load_schedule():
+    """Load the schedule, or an empty one"""
+    try:
+        with open(SCHEDULE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_schedule(schedule):
+    """Write the schedule back to disk"""
+    storage.write_json(SCHEDULE_FILE, schedule, sort_keys=True)
+
+
+def parse_time(value):
+    """Parse an ISO timestamp as an aware UTC datetime, or None"""
+    if not value:
+        return None
+    try:
+        parsed = date_parser.parse(value)
+    except (ValueError, OverflowError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def cadence_interval(published):
+    """
+    Polling interval for a source from its posts' published dates
+
+    Args:
+        published: list of ISO timestamps of the source's items
+
+    Returns:
+        interval in seconds (MIN_INTERVAL if there are fewer than two posts)
+    """
+    times = sorted(filter(None, (parse_time(p) for p in published)), reverse=True)[:CADENCE_SAMPLES]
+    if len(times) < 2:
+        return MIN_INTERVAL
+    gaps = [(a - b).total_seconds() for a, b in zip(times, times[1:])]
+    interval = median(gaps) * CADENCE_FRACTION
+    return int(min(MAX_INTERVAL, max(MIN_INTERVAL, interval)))
+
+
+def is_due(source, schedule, now=None):
+    """Whether a source should be polled in this run"""
+    entry = schedule.get(source["id"])
+    if not entry or entry.get("config") != source_fingerprint(source):
+        return True
+    next_poll = parse_time(entry.get("next_poll"))
+    if next_poll is None:
+        return True
+    return next_poll <= (now or utcnow()) + timedelta(seconds=GRACE)
+
+
+def due_sources(sources, schedule, now=None):
+    """Sources due for polling, in config order"""
+    now = now or utcnow()
+    return [source for source in sources if is_due(source, schedule, now)]
+
+
+def record_poll(schedule, source, ok, published, now=None):
+    """
+    Update a source's entry after it was polled
+
+    Args:
+        schedule: schedule dict (modified in place)
+        source: source dict
+        ok: whether the fetch succeeded
+        published: published timestamps of the source's items in feeds.json
+    """
+    now = now or utcnow()
+    entry = schedule.setdefault(source["id"], {})
+    entry["config"] = source_fingerprint(source)
+    entry["last_poll"] = now.isoformat()
+    entry["interval"] = cadence_interval(published)
+
+    if ok:
+        entry["failures"] = 0
+        entry["last_success"] = now.isoformat()
+        delay = entry["interval"]
+    else:
+        entry["failures"] = entry.get("failures", 0) + 1
+        backoff = min(MAX_FAILURE_BACKOFF, FAILURE_BACKOFF * 2 ** (entry["failures"] - 1))
+        delay = max(entry["interval"], backoff)
+
+    entry["next_poll"] = (now + timedelta(seconds=delay)).isoformat()
+
+
+def prune(schedule, sources):
+    """Drop entries of sources no longer in sources.yaml"""
+    ids = {source["id"] for source in sources}
+    for source_id in [s for s in schedule if s not in ids]:
+        del schedule[source_id]
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Search Index
+Builds a persistent inverted index over titles, sources, tweet/episode text
+and transcripts, and answers full-text queries against it
+
+Tokens are lowercase words for Latin text and overlapping character
+bigrams for CJK text, so Chinese phrases match without a dictionary.
+Postings are positional: every document has one position space, with the
+fields laid out one after another (title, source, content, transcript) and
+a gap between them. Transcript hits resolve to the start time of the
+segment they occur in.
+
+The index is updated incrementally: a document is only re-tokenized when
+its title, text or transcript changed since the last run. The index file
+is not committed; the daily workflow keeps it in the Actions cache.
+
+Usage:
+    python search_index.py                  # update the index from feeds.json
+    python search_index.py query "agent 编程"
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import re
+import time
+import unicodedata
+from bisect import bisect_right
+from pathlib import Path
+
+import storage
+import transcript_store
+
+# Paths
+SCRIPT_DIR = Path(__file__).parent
+DATA_DIR = SCRIPT_DIR.parent / "data"
+FEEDS_FILE = DATA_DIR / "feeds.json"
+TRANSCRIPTS_DIR = DATA_DIR / "transcripts"
+INDEX_FILE = DATA_DIR / "index" / "search.json.gz"
+
+INDEX_VERSION = 1
+
+# Indexed fields, in position order, with their ranking weight
+FIELDS = ["title", "source", "content", "transcript"]
+FIELD_WEIGHTS = {"title": 3.0, "source": 2.0, "content": 1.5, "transcript": 1.0}
+PHRASE_BONUS = 2.0  # Score multiplier when the query terms appear as a phrase
+MAX_HITS_PER_DOC = 5  # Transcript timestamps returned per result
+
+TOKEN_RE = re.compile(r"([\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+)|([a-z0-9]+)")
+
+
+def tokenize(text):
+    """
+    Split text into index terms
+
+    Latin words and numbers become lowercase words; runs of CJK characters
+    become overlapping bigrams (a lone character stays a unigram).
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKC", text).lower()
+    tokens = []
+    for cjk, word in TOKEN_RE.findall(text):
+        if word:
+            tokens.append(word)
+        elif len(cjk) == 1:
+            tokens.append(cjk)
+        else:
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+
+def item_content(item):
+    """Free text of an item besides its title (tweet text, episode notes)"""
+    if item.get("content"):
+        return item["content"]
+    if item["platform"] == "podcast":
+        return item.get("transcriptPreview") or ""
+    return ""
+
+
+def transcript_signature(item_id):
+    """
+    Change marker for a stored transcript (file name and content hash)
+
+    The content is hashed rather than stat'ed: a fresh checkout resets
+    mtimes, and a rewrite can keep the size. Hashing is far cheaper than
+    re-tokenizing.
+    """
+    path = transcript_store.transcript_path(TRANSCRIPTS_DIR, item_id)
+    if path is None:
+        return None
+    return f"{path.name}:{hashlib.sha1(path.read_bytes()).hexdigest()}"
+
+
+class SearchIndex:
+    """
+    Positional inverted index
+
+    docs maps a document number to its metadata: item id, display fields,
+    field boundaries in the position space, and the token offset and start
+    time of each transcript segment. postings maps a term to
+    {document number: sorted positions}.
+    """
+
+    def __init__(self):
+        self.docs = {}
+        self.postings = {}
+        self.ids = {}  # item id -> document number
+        self._next_doc = 0
+
+    # ---------- persistence ----------
+
+    @classmethod
+    def load(cls, path=None):
+        """Load an index from disk, or return an empty one"""
+        index = cls()
+        try:
+            with gzip.open(path or INDEX_FILE, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return index
+        if data.get("version") != INDEX_VERSION:
+            return index
+
+        index.docs = {int(doc): meta for doc, meta in data["docs"].items()}
+        index.ids = {meta["id"]: doc for doc, meta in index.docs.items()}
+        index._next_doc = max(index.docs, default=-1) + 1
+        for term, entries in data["postings"].items():
+            # Positions are stored delta-encoded
+            index.postings[term] = {
+                int(doc): list(_undelta(deltas)) for doc, deltas in entries.items()
+            }
+        return index
+
+    def save(self, path=None):
+        """Write the index to disk"""
+        path = Path(path or INDEX_FILE)
+        data = {
+            "version": INDEX_VERSION,
+            "docs": self.docs,
+            "postings": {
+                term: {doc: _delta(positions) for doc, positions in entries.items()}
+                for term, entries in sorted(self.postings.items())
+            },
+        }
+        raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        storage.atomic_write(path, gzip.compress(raw, compresslevel=6))
+
+    # ---------- updates ----------
+
+    def remove(self, item_id):
+        """Remove an item and its postings"""
+        doc = self.ids.pop(item_id, None)
+        if doc is None:
+            return
+        del self.docs[doc]
+        # Removals are rare, so scan the vocabulary instead of storing
+        # every document's term list
+        for term in [t for t, entries in self.postings.items() if doc in entries]:
+            entries = self.postings[term]
+            del entries[doc]
+            if not entries:
+                del self.postings[term]
+
+    def add(self, item, transcript=None, signature=None):
+        """
+        Index an item (replacing any previous version of it)
+
+        Args:
+            item: feed item dict
+            transcript: transcript dict with segments, or None
+            signature: change marker stored with the document
+        """
+        self.remove(item["id"])
+        doc = self._next_doc
+        self._next_doc += 1
+
+        positions = {}
+        bounds = []
+        seg_tokens = []
+        seg_times = []
+        pos = 0
+
+        def index_tokens(tokens):
+            nonlocal pos
+            for token in tokens:
+                positions.setdefault(token, []).append(pos)
+                pos += 1
+
+        index_tokens(tokenize(item.get("title") or ""))
+        bounds.append(pos)
+        pos += 1  # Gap so phrases never span two fields
+        index_tokens(tokenize(item.get("source") or ""))
+        bounds.append(pos)
+        pos += 1
+        index_tokens(tokenize(item_content(item)))
+        bounds.append(pos)
+        pos += 1
+        for seg in (transcript or {}).get("segments", []):
+            seg_tokens.append(pos)
+            seg_times.append(seg["start"])
+            index_tokens(tokenize(seg.get("text", "")))
+        bounds.append(pos)
+
+        for term, term_positions in positions.items():
+            self.postings.setdefault(term, {})[doc] = term_positions
+
+        self.docs[doc] = {
+            "id": item["id"],
+            "title": item.get("title") or (item.get("content") or "")[:80],
+            "source": item.get("source"),
+            "platform": item.get("platform"),
+            "published": item.get("published"),
+            "sig": signature,
+            "bounds": bounds,
+            "seg_tokens": seg_tokens,
+            "seg_times": seg_times,
+        }
+        self.ids[item["id"]] = doc
+
+    def update(self, items):
+        """
+        Bring the index in line with a list of feed items
+
+        Returns:
+            (added_or_changed, removed) counts
+        """
+        changed = 0
+        wanted = set()
+
+        for item in items:
+            item_id = item["id"]
+            wanted.add(item_id)
+            transcript_sig = transcript_signature(item_id)
+            raw = json.dumps(
+                [item.get("title"), item.get("source"), item_content(item), transcript_sig],
+                ensure_ascii=False,
+            )
+            signature = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+            doc = self.ids.get(item_id)
+            if doc is not None and self.docs[doc]["sig"] == signature:
+                continue
+
+            transcript = None
+            if transcript_sig:
+                transcript = transcript_store.load_transcript(TRANSCRIPTS_DIR, item_id)
+            self.add(item, transcript, signature)
+            changed += 1
+
+        stale = [item_id for item_id in self.ids if item_id not in wanted]
+        for item_id in stale:
+            self.remove(item_id)
+
+        return changed, len(stale)
+
+    # ---------- queries ----------
+
+    def field_of(self, doc, position):
+        """Name of the field a position falls in"""
+        return FIELDS[bisect_right(self.docs[doc]["bounds"], position)]
+
+    def timestamp_of(self, doc, position):
+        """Start time of the transcript segment containing a position"""
+        meta = self.docs[doc]
+        index = bisect_right(meta["seg_tokens"], position) - 1
+        return meta["seg_times"][index] if index >= 0 else None
+
+    def search(self, query, limit=20):
+        """
+        Find items containing every query term
+
+        Results are ranked by tf-idf (log tf) with per-field weights, with
+        a bonus when the terms appear consecutively (as a phrase).
+
+        Returns:
+            list of dicts with id, title, source, platform, published,
+            score, fields (where the match occurred) and timestamps
+            (transcript hit times in seconds)
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or any(term not in self.postings for term in terms):
+            return []
+
+        # Intersect, rarest term first
+        terms_by_rarity = sorted(terms, key=lambda term: len(self.postings[term]))
+        candidates = set(self.postings[terms_by_rarity[0]])
+        for term in terms_by_rarity[1:]:
+            candidates &= self.postings[term].keys()
+            if not candidates:
+                return []
+
+        total_docs = max(1, len(self.docs))
+        idf = {term: math.log(1 + total_docs / len(self.postings[term])) for term in terms}
+        query_terms = tokenize(query)
+
+        results = []
+        for doc in candidates:
+            score = 0.0
+            fields = set()
+            for term in terms:
+                # Sublinear term frequency per field, so long transcripts
+                # don't drown out title matches
+                counts = {}
+                for position in self.postings[term][doc]:
+                    field = self.field_of(doc, position)
+                    counts[field] = counts.get(field, 0) + 1
+                for field, count in counts.items():
+                    fields.add(field)
+                    score += FIELD_WEIGHTS[field] * idf[term] * (1 + math.log(count))
+
+            phrase_starts = self._phrase_starts(doc, query_terms)
+            if phrase_starts:
+                score *= PHRASE_BONUS
+
+            # Transcript hits: phrase matches if any, otherwise the rarest term
+            hit_positions = phrase_starts or self.postings[terms_by_rarity[0]][doc]
+            timestamps = []
+            for position in hit_positions:
+                if self.field_of(doc, position) == "transcript":
+                    timestamp = self.timestamp_of(doc, position)
+                    if timestamp is not None and timestamp not in timestamps:
+                        timestamps.append(timestamp)
+                        if len(timestamps) >= MAX_HITS_PER_DOC:
+                            break
+
+            meta = self.docs[doc]
+            results.append({
+                "id": meta["id"],
+                "title": meta["title"],
+                "source": meta["source"],
+                "platform": meta["platform"],
+                "published": meta["published"],
+                "score": round(score, 3),
+                "fields": sorted(fields, key=FIELDS.index),
+                "timestamps": timestamps,
+            })
+
+        results.sort(key=lambda r: (-r["score"], r["published"] or ""))
+        return results[:limit]
+
+    def _phrase_starts(self, doc, terms):
+        """Positions where terms occur consecutively in a document"""
+        if len(terms) < 2:
+            return []
+        starts = self.postings[terms[0]][doc]
+        for offset, term in enumerate(terms[1:], start=1):
+            following = set(self.postings[term][doc])
+            starts = [p for p in starts if p + offset in following]
+            if not starts:
+                return []
+        return starts
+
+
+def _delta(positions):
+    previous = 0
+    out = []
+    for position in positions:
+        out.append(position - previous)
+        previous = position
+    return out
+
+
+def _undelta(deltas):
+    position = 0
+    for delta in deltas:
+        position += delta
+        yield position
+
+
+def update_index(items=None):
+    """Update the on-disk index from feeds.json (or the given items)"""
+    if items is None:
+        if not FEEDS_FILE.exists():
+            print("No feeds.json found. Run fetch_all.py first.")
+            return
+
+        with open(FEEDS_FILE, "r", encoding="utf-8") as f:
+            items = json.load(f).get("items", [])
+
+    start = time.perf_counter()
+    index = SearchIndex.load()
+    changed, removed = index.update(items)
+
+    if changed or removed or not INDEX_FILE.exists():
+        index.save()
+
+    print(f"Indexed {len(index.docs)} items ({changed} updated, {removed} removed) "
+          f"with {len(index.postings)} terms in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Full-text search index")
+    sub = parser.add_subparsers(dest="command")
+    query_parser = sub.add_parser("query", help="search the index")
+    query_parser.add_argument("text")
+    query_parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "query":
+        index = SearchIndex.load()
+        for result in index.search(args.text, limit=args.limit):
+            times = ", ".join(f"{int(t // 60)}:{int(t % 60):02d}" for t in result["timestamps"])
+            print(f"{result['score']:8.2f}  [{result['platform']}] {result['title']}")
+            if times:
+                print(f"          at {times}")
+    else:
+        print("=" * 50)
+        print("Oasis Search Index")
+        print("=" * 50)
+        update_index()
@@ -0,0 +1,166 @@
+"""
+Crash-safe Storage
+Atomic writes and advisory file locks for the files under data/
+
+A write goes to a temp file in the target's directory, is fsynced and then
+renamed over the target, so a killed process leaves either the old or the
+new file, never a truncated one. Locks are flock()s on a "<name>.lock"
+file next to the target; they serialize read-modify-write cycles between
+processes (e.g. transcript.py and summarize.py updating feeds.json at the
+same time). On platforms without fcntl the locks are no-ops.
+
+JsonTable is the shared base of the small JSON state files kept between
+runs (HTTP validators, instance health, transcript attempts).
+"""
+
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# flock() locks belong to an open file, not a thread, so threads of one
+# process serialize on a per-path RLock and share one locked handle
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+
+class _PathLock:
+    def __init__(self):
+        self.rlock = threading.RLock()
+        self.depth = 0
+        self.handle = None
+
+
+def atomic_write(path, data):
+    """
+    Replace a file's content atomically
+
+    Args:
+        path: target file (parent directories are created)
+        data: str (written as UTF-8) or bytes
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(path.parent)
+
+
+def _fsync_dir(directory):
+    """Persist the rename itself (POSIX only)"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_json(path, data, **kwargs):
+    """Atomically write data as JSON (indent=2, non-ASCII kept, unless overridden)"""
+    kwargs.setdefault("ensure_ascii", False)
+    kwargs.setdefault("indent", 2)
+    atomic_write(path, json.dumps(data, **kwargs))
+
+
+def read_json(path, default=None):
+    """Load a JSON file, or default if it is missing or corrupt"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+class JsonTable:
+    """
+    A JSON object on disk, loaded on first use and written back only if changed
+
+    Thread-safe when callers hold `lock` around entries() and their
+    changes, and call mark_dirty() after changing anything.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self._entries = None
+        self._dirty = False
+
+    def entries(self):
+        """The table's dict, loaded on first use (caller holds the lock)"""
+        if self._entries is None:
+            self._entries = read_json(self.path, {})
+        return self._entries
+
+    def mark_dirty(self):
+        """Have the next save() write the table (caller holds the lock)"""
+        self._dirty = True
+
+    def save(self):
+        """Write the table back to disk if anything changed"""
+        with self.lock:
+            if not self._dirty or self._entries is None:
+                return
+            write_json(self.path, self._entries, sort_keys=True)
+            self._dirty = False
+
+
+def lock_path(path):
+    path = Path(path)
+    return path.with_name(path.name + ".lock")
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Hold an exclusive advisory lock on a file for the duration of the block
+
+    The lock is taken on "<path>.lock", so the target itself can be
+    replaced by atomic_write while the lock is held. Re-entrant within a
+    thread.
+    """
+    path = lock_path(path)
+    with _path_locks_guard:
+        lock = _path_locks.setdefault(str(path), _PathLock())
+
+    with lock.rlock:
+        if lock.depth == 0 and fcntl is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            lock.handle = open(path, "a+b")
+            fcntl.flock(lock.handle.fileno(), fcntl.LOCK_EX)
+        lock.depth += 1
+        try:
+            yield
+        finally:
+            lock.depth -= 1
+            if lock.depth == 0 and lock.handle is not None:
+                # Closing the handle releases the flock
+                lock.handle.close()
+                lock.handle = None
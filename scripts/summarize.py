@@ -4,12 +4,24 @@ AI Summary Generator
 Generates timeline-based summaries for video transcripts using Zhipu GLM API
 """
 
+import argparse
+import hashlib
 import json
 import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-import requests
+
+import dedup
+import feed_store
+import http_client
+import item_store
+import metrics
+import storage
+import transcript_store
+from ratelimit import AdaptiveWindow
 
 # Paths
 SCRIPT_DIR = Path(__file__).parent
@@ -17,10 +29,115 @@ DATA_DIR = SCRIPT_DIR.parent / "data"
 FEEDS_FILE = DATA_DIR / "feeds.json"
 TRANSCRIPTS_DIR = DATA_DIR / "transcripts"
 SUMMARIES_DIR = DATA_DIR / "summaries"
+SUMMARY_CACHE_DIR = DATA_DIR / "summary_cache"
 
 # Zhipu GLM API Configuration
 ZHIPU_API_KEY = os.environ.get("ZHIPU_API_KEY", "ac89591d75d3416da6fbf22bb4a510ca.s7Uw6LgQpqffES9N")
 ZHIPU_API_URL = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
+ZHIPU_MODEL = "glm-4-flash"  # 使用免费模型
+SYSTEM_PROMPT = "你是一个专业的视频内容分析助手。你的任务是分析视频字幕，生成带时间轴的内容摘要。请用中文回复。"
+
+# Concurrency settings
+MAX_IN_FLIGHT = 4  # Concurrent LLM requests
+GLM_RETRY_STATUSES = http_client.POST_RETRY_STATUSES - {429}  # Rate limits are handled by AdaptiveWindow
+RATE_LIMIT_RETRIES = 5  # Times a rate-limited call is retried before giving up
+CHECKPOINT_EVERY = 5  # Write feeds.json after this many new summaries
+
+# Chunked (map-reduce) summarization for long transcripts
+MAX_SINGLE_PASS_CHARS = 15000  # Longer transcripts are summarized in chunks
+CHUNK_CHARS = 12000  # Text budget per chunk
+CHUNK_MAX_SECONDS = 1200  # Max time span per chunk
+CHUNK_WORKERS = 4  # Chunks of one transcript summarized at once
+CHUNK_MARKER_SECONDS = 60  # Interval of [MM:SS] markers inside a chunk
+
+
+# Prompt templates. Editing a template changes the summary cache key, so
+# affected items are re-summarized on the next run; add a new version
+# instead to compare variants side by side.
+PROMPT_VERSION = "v1"
+PROMPT_TEMPLATES = {
+    "v1": """请分析以下视频内容，生成一个带时间轴的内容摘要。
+
+视频标题: {title}
+
+字幕内容:
+{full_text}
+
+时间参考点:
+{timestamps_info}
+
+请按以下JSON格式返回（只返回JSON，不要其他内容）:
+{{
+  "summary": "整体内容摘要，200-300字，5-6句话，全面概括视频主题",
+  "key_points": [
+    {{
+      "timestamp": 0,
+      "title": "要点标题",
+      "content": "这里需要写150-200字的详细内容。必须包含5-6句话。第一句概括要点。第二三句展开具体内容。第四五句补充案例、数据或深入分析。第六句总结意义。"
+    }}
+  ],
+  "tags": ["标签1", "标签2", "标签3"]
+}}
+
+【重要要求】：
+1. 提取5-8个关键要点，覆盖视频主要内容
+2. 时间戳根据内容位置估算
+3. summary必须200字以上，5-6句话
+4. 【最重要】每个key_point的content必须写150-200字、5-6句完整的话！不能只写一两句！要详细展开讲解该时间段的核心观点、论据、案例和意义
+5. tags提取3-5个主题标签
+6. 全部使用中文""",
+}
+
+# Map step for one time window of a long transcript
+CHUNK_PROMPT = """请分析以下视频片段的字幕，提取该片段的要点。
+
+视频标题: {title}
+片段: 第{index}/{total}段，时间 {start_label} - {end_label}（{start}-{end}秒）
+
+片段字幕（方括号内为时间点）:
+{text}
+
+请按以下JSON格式返回（只返回JSON，不要其他内容）:
+{{
+  "summary": "该片段内容概括，80-120字",
+  "key_points": [
+    {{
+      "timestamp": {start},
+      "title": "要点标题",
+      "content": "150-200字的详细内容，5-6句完整的话，讲清该时间段的核心观点、论据、案例和意义。"
+    }}
+  ],
+  "tags": ["标签1", "标签2"]
+}}
+
+【重要要求】：
+1. 提取1-2个关键要点
+2. timestamp 为秒数，根据字幕中的时间点填写，必须在 {start} 到 {end} 之间
+3. 全部使用中文"""
+
+# Reduce step merging the window summaries
+REDUCE_PROMPT = """以下是一个长视频按时间分段的内容摘要和候选要点，请合并为整体摘要。
+
+视频标题: {title}
+
+分段摘要:
+{sections}
+
+候选要点:
+{candidates}
+
+请按以下JSON格式返回（只返回JSON，不要其他内容）:
+{{
+  "summary": "整体内容摘要，200-300字，5-6句话，全面概括视频主题",
+  "key_points": [1, 3, 5],
+  "tags": ["标签1", "标签2", "标签3"]
+}}
+
+【重要要求】：
+1. key_points 从候选要点中选出5-8个最重要的编号，覆盖视频主要内容
+2. summary必须200字以上，5-6句话
+3. tags提取3-5个主题标签
+4. 全部使用中文"""
 
 
 def format_timestamp(seconds):
@@ -33,6 +150,9 @@ def format_timestamp(seconds):
 def call_zhipu_api(prompt, max_tokens=8000):
     """
     Call Zhipu GLM API
+
+    Raises:
+        http_client.RateLimited if the API is still rate-limiting after retries
     """
     headers = {
         "Content-Type": "application/json",
@@ -40,11 +160,11 @@ def call_zhipu_api(prompt, max_tokens=8000):
     }
     
     data = {
-        "model": "glm-4-flash",  # 使用免费模型
+        "model": ZHIPU_MODEL,
         "messages": [
             {
                 "role": "system",
-                "content": "你是一个专业的视频内容分析助手。你的任务是分析视频字幕，生成带时间轴的内容摘要。请用中文回复。"
+                "content": SYSTEM_PROMPT
             },
             {
                 "role": "user",
@@ -56,25 +176,245 @@ def call_zhipu_api(prompt, max_tokens=8000):
     }
     
     try:
-        response = requests.post(ZHIPU_API_URL, headers=headers, json=data, timeout=120)
+        metrics.incr("llm.calls")
+        with metrics.timer("llm.call"):
+            # 429s go straight to the caller, so the in-flight window sees every one;
+            # only connection failures are resent (see http_client.post)
+            response = http_client.post(ZHIPU_API_URL, headers=headers, json=data, timeout=120,
+                                        retry_statuses=GLM_RETRY_STATUSES)
+        if response.status_code == 429:
+            metrics.incr("llm.rate_limited")
+            raise http_client.RateLimited(response.text[:200])
         response.raise_for_status()
         result = response.json()
+        metrics.add_counters("llm", {
+            key: value for key, value in (result.get("usage") or {}).items()
+            if key in ("prompt_tokens", "completion_tokens", "total_tokens")
+        })
         return result["choices"][0]["message"]["content"]
+    except http_client.RateLimited:
+        raise
     except Exception as e:
+        metrics.incr("llm.errors")
         print(f"  ! API Error: {e}")
         return None
 
 
-def generate_summary(transcript_data, title):
+def call_llm(prompt, window=None, max_tokens=8000):
+    """
+    Call the LLM inside the in-flight window (if given)
+
+    Rate-limited attempts shrink the window and are retried after its
+    backoff pause, up to RATE_LIMIT_RETRIES times; without a window they
+    are retried after an exponential backoff.
+
+    Returns:
+        the response text, or None if the call failed or stayed rate-limited
+    """
+    if window is None:
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            try:
+                return call_zhipu_api(prompt, max_tokens)
+            except http_client.RateLimited:
+                if attempt < RATE_LIMIT_RETRIES:
+                    time.sleep(http_client.backoff_delay(attempt))
+        print("  ! Still rate limited, giving up")
+        return None
+    
+    for _ in range(RATE_LIMIT_RETRIES + 1):
+        window.acquire()
+        try:
+            response = call_zhipu_api(prompt, max_tokens)
+        except http_client.RateLimited:
+            window.release(throttled=True)
+            print(f"  ! Rate limited, window now {int(window.size)}")
+            continue
+        except Exception:
+            window.release()
+            raise
+        window.release()
+        return response
+    
+    return None
+
+
+def parse_json_response(response):
+    """Extract the JSON object from an LLM response"""
+    if not response:
+        return None
+    
+    # 尝试解析JSON
+    try:
+        # 提取JSON部分
+        json_match = re.search(r'\{[\s\S]*\}', response)
+        if json_match:
+            return json.loads(json_match.group())
+    except json.JSONDecodeError as e:
+        print(f"  ! JSON Parse Error: {e}")
+        print(f"  Response: {response[:200]}...")
+    
+    return None
+
+
+def split_segments(segments, chunk_chars=CHUNK_CHARS, max_seconds=CHUNK_MAX_SECONDS):
+    """
+    Split segments into consecutive time windows
+
+    A window closes when adding the next segment would exceed chunk_chars
+    of text or max_seconds of video. Each window's text carries a
+    [MM:SS] marker every CHUNK_MARKER_SECONDS.
+
+    Returns:
+        list of dicts with start, end (seconds) and text
+    """
+    chunks = []
+    parts = []
+    size = 0
+    start = None
+    end = 0
+    last_marker = None
+    
+    for seg in segments:
+        text = seg.get("text", "")
+        if start is not None and (size + len(text) > chunk_chars or seg["end"] - start > max_seconds):
+            chunks.append({"start": start, "end": end, "text": " ".join(parts)})
+            parts, size, start, last_marker = [], 0, None, None
+        
+        if start is None:
+            start = seg["start"]
+        if last_marker is None or seg["start"] - last_marker >= CHUNK_MARKER_SECONDS:
+            text = f"[{format_timestamp(seg['start'])}] {text}"
+            last_marker = seg["start"]
+        parts.append(text)
+        size += len(text) + 1
+        end = max(end, seg["end"])
+    
+    if parts:
+        chunks.append({"start": start, "end": end, "text": " ".join(parts)})
+    
+    return chunks
+
+
+def summarize_chunk(chunk, index, total, title, window=None):
+    """Map step: summarize one time window and extract its key points"""
+    start, end = int(chunk["start"]), int(chunk["end"])
+    
+    prompt = CHUNK_PROMPT.format(
+        title=title, index=index, total=total, start=start, end=end,
+        start_label=format_timestamp(start), end_label=format_timestamp(end), text=chunk["text"]
+    )
+
+    result = parse_json_response(call_llm(prompt, window, max_tokens=2000))
+    if not result:
+        return None
+    
+    # Keep timestamps inside the chunk they came from
+    key_points = []
+    for point in result.get("key_points", []) or []:
+        try:
+            timestamp = int(float(point.get("timestamp", start)))
+        except (TypeError, ValueError):
+            timestamp = start
+        key_points.append({**point, "timestamp": min(max(timestamp, start), end)})
+    
+    return {
+        "start": start,
+        "end": end,
+        "summary": result.get("summary", ""),
+        "key_points": key_points,
+        "tags": result.get("tags", []) or [],
+    }
+
+
+def pick_evenly(points, count):
+    """Pick up to count points spread evenly over the list"""
+    if len(points) <= count:
+        return list(points)
+    step = len(points) / count
+    return [points[int(i * step)] for i in range(count)]
+
+
+def generate_chunked_summary(transcript_data, title, window=None,
+                             chunk_chars=CHUNK_CHARS, chunk_workers=CHUNK_WORKERS):
+    """
+    Map-reduce summary for long transcripts
+
+    Segments are split into time windows summarized in parallel (map),
+    then one more call merges the partial summaries and picks the key
+    points (reduce). Key point timestamps always come from the chunk
+    they were extracted from.
+
+    Returns None if any chunk or the reduce step fails, so the item is
+    retried on the next run instead of caching a summary with missing
+    sections.
+    """
+    chunks = split_segments(transcript_data.get("segments", []), chunk_chars)
+    total = len(chunks)
+    print(f"    Summarizing {total} chunks of {title[:30]}...")
+    
+    with ThreadPoolExecutor(max_workers=max(1, chunk_workers)) as executor:
+        futures = [
+            executor.submit(summarize_chunk, chunk, i + 1, total, title, window)
+            for i, chunk in enumerate(chunks)
+        ]
+        partials = [f.result() for f in futures]
+    
+    if not partials or not all(partials):
+        return None
+    
+    candidates = [point for p in partials for point in p["key_points"]]
+    sections = "\n".join(
+        f"[{format_timestamp(p['start'])}-{format_timestamp(p['end'])}] {p['summary']}"
+        for p in partials
+    )
+    candidate_list = "\n".join(
+        f"{i + 1}. [{format_timestamp(point['timestamp'])}] {point.get('title', '')}"
+        for i, point in enumerate(candidates)
+    )
+    
+    prompt = REDUCE_PROMPT.format(title=title, sections=sections, candidates=candidate_list)
+
+    merged = parse_json_response(call_llm(prompt, window))
+    if not merged or not merged.get("summary"):
+        return None
+    
+    selected = []
+    for index in merged.get("key_points", []) or []:
+        if isinstance(index, int) and 1 <= index <= len(candidates):
+            point = candidates[index - 1]
+            if point not in selected:
+                selected.append(point)
+    if not selected:
+        selected = pick_evenly(candidates, 8)
+    
+    tags = merged.get("tags")
+    if not tags:
+        tags = list(dict.fromkeys(tag for p in partials for tag in p["tags"]))[:5]
+    
+    return {
+        "summary": merged["summary"],
+        "key_points": sorted(selected, key=lambda point: point["timestamp"]),
+        "tags": tags,
+    }
+
+
+def generate_summary(transcript_data, title, window=None, chunk_chars=CHUNK_CHARS,
+                     chunk_workers=CHUNK_WORKERS, prompt_version=PROMPT_VERSION):
     """
     Generate timeline summary from transcript
+
+    Transcripts longer than MAX_SINGLE_PASS_CHARS are summarized in
+    chunks (see generate_chunked_summary).
     """
     full_text = transcript_data.get("full_text", "")
     segments = transcript_data.get("segments", [])
     
-    # 如果文本太长，截取前15000字符
-    if len(full_text) > 15000:
-        full_text = full_text[:15000] + "..."
+    if len(full_text) > MAX_SINGLE_PASS_CHARS and segments:
+        return generate_chunked_summary(transcript_data, title, window, chunk_chars, chunk_workers)
+    
+    # 没有时间轴的长文本，截取前15000字符
+    if len(full_text) > MAX_SINGLE_PASS_CHARS:
+        full_text = full_text[:MAX_SINGLE_PASS_CHARS] + "..."
     
     # 获取一些时间戳信息
     timestamps_info = ""
@@ -87,57 +427,126 @@ def generate_summary(transcript_data, title):
             sample_points.append(f"[{format_timestamp(seg['start'])}] {seg['text'][:50]}...")
         timestamps_info = "\n".join(sample_points[:10])
     
-    prompt = f"""请分析以下视频内容，生成一个带时间轴的内容摘要。
+    prompt = PROMPT_TEMPLATES[prompt_version].format(
+        title=title, full_text=full_text, timestamps_info=timestamps_info
+    )
 
-视频标题: {title}
+    return parse_json_response(call_llm(prompt, window))
 
-字幕内容:
-{full_text}
 
-时间参考点:
-{timestamps_info}
+def sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-请按以下JSON格式返回（只返回JSON，不要其他内容）:
-{{
-  "summary": "整体内容摘要，200-300字，5-6句话，全面概括视频主题",
-  "key_points": [
-    {{
-      "timestamp": 0,
-      "title": "要点标题",
-      "content": "这里需要写150-200字的详细内容。必须包含5-6句话。第一句概括要点。第二三句展开具体内容。第四五句补充案例、数据或深入分析。第六句总结意义。"
-    }}
-  ],
-  "tags": ["标签1", "标签2", "标签3"]
-}}
 
-【重要要求】：
-1. 提取5-8个关键要点，覆盖视频主要内容
-2. 时间戳根据内容位置估算
-3. summary必须200字以上，5-6句话
-4. 【最重要】每个key_point的content必须写150-200字、5-6句完整的话！不能只写一两句！要详细展开讲解该时间段的核心观点、论据、案例和意义
-5. tags提取3-5个主题标签
-6. 全部使用中文"""
+def summary_inputs(transcript_data, prompt_version=PROMPT_VERSION, chunk_chars=CHUNK_CHARS):
+    """
+    Describe everything that determines a summary's output
 
-    response = call_zhipu_api(prompt)
+    Returns:
+        (cache_key, provenance): the key is a hash of the transcript text,
+        prompt templates, model and (for long transcripts) chunking params.
+        Chunked summaries don't use the versioned template, so their
+        prompt_version is None and bumping it doesn't invalidate them.
+    """
+    full_text = transcript_data.get("full_text", "")
+    chunked = len(full_text) > MAX_SINGLE_PASS_CHARS and bool(transcript_data.get("segments"))
     
-    if not response:
-        return None
+    if chunked:
+        prompts = [SYSTEM_PROMPT, CHUNK_PROMPT, REDUCE_PROMPT]
+    else:
+        prompts = [SYSTEM_PROMPT, PROMPT_TEMPLATES[prompt_version]]
     
-    # 尝试解析JSON
+    provenance = {
+        "transcript_sha256": sha256(json.dumps(
+            [full_text, transcript_data.get("segments", [])], ensure_ascii=False
+        )),
+        "prompt_version": None if chunked else prompt_version,
+        "prompt_sha256": sha256("\0".join(prompts)),
+        "model": ZHIPU_MODEL,
+        "chunking": {
+            "chunk_chars": chunk_chars,
+            "chunk_max_seconds": CHUNK_MAX_SECONDS,
+            "marker_seconds": CHUNK_MARKER_SECONDS,
+        } if chunked else None,
+    }
+    cache_key = sha256(json.dumps(provenance, sort_keys=True))
+    return cache_key, {"cache_key": cache_key, **provenance}
+
+
+def same_inputs(published, provenance):
+    """
+    Whether a published summary was made from the same transcript, prompts,
+    model and chunking (its cache key may predate chunked summaries
+    dropping prompt_version)
+    """
+    keys = ("transcript_sha256", "prompt_sha256", "model", "chunking")
+    return bool(published) and all(published.get(k) == provenance.get(k) for k in keys)
+
+
+def summary_cache_path(cache_key):
+    return SUMMARY_CACHE_DIR / cache_key[:2] / f"{cache_key}.json"
+
+
+def load_cached_summary(cache_key):
+    """Return the cached summary data for a key, or None"""
     try:
-        # 提取JSON部分
-        json_match = re.search(r'\{[\s\S]*\}', response)
-        if json_match:
-            summary_data = json.loads(json_match.group())
-            return summary_data
-    except json.JSONDecodeError as e:
-        print(f"  ! JSON Parse Error: {e}")
-        print(f"  Response: {response[:200]}...")
-    
-    return None
+        with open(summary_cache_path(cache_key), "r", encoding="utf-8") as f:
+            return json.load(f)["summary"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def store_cached_summary(cache_key, summary_data, provenance):
+    """Store generated summary data under its cache key"""
+    storage.write_json(summary_cache_path(cache_key), {"provenance": provenance, "summary": summary_data})
+
+
+def published_provenance(item_id):
+    """
+    Provenance of the summary currently in data/summaries
+
+    Returns:
+        provenance dict, {} for summaries written before provenance was
+        recorded, or None if the item has no summary
+    """
+    try:
+        with open(SUMMARIES_DIR / f"{item_id}.json", "r", encoding="utf-8") as f:
+            return json.load(f).get("provenance") or {}
+    except (OSError, ValueError):
+        return None
+
+
+def adopt_legacy_summary(item_id, transcript_data, provenance):
+    """
+    Record provenance for a summary written before provenance was recorded
+
+    Such a summary has no transcript hash to compare, so its generated_at
+    is compared with the transcript's fetched_at instead: a summary written
+    after the transcript was fetched was made from it, and the current
+    inputs are recorded so later runs compare hashes like for any other
+    summary.
+
+    Returns:
+        True if the summary was adopted, False if the transcript is newer
+        and the summary should be regenerated
+    """
+    path = SUMMARIES_DIR / f"{item_id}.json"
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            published = json.load(f)
+        generated_at = datetime.fromisoformat(published["generated_at"].replace("Z", "+00:00"))
+        fetched_at = transcript_data.get("fetched_at")
+        if fetched_at and datetime.fromisoformat(fetched_at.replace("Z", "+00:00")) > generated_at:
+            return False
+    except (OSError, ValueError, KeyError, AttributeError):
+        return False
+
+    published["provenance"] = {**provenance, "generated_at": published["generated_at"], "adopted": True}
+    storage.write_json(path, published)
+    return True
 
 
-def save_summary(item_id, summary_data, title):
+def save_summary(item_id, summary_data, title, provenance=None):
     """Save summary to JSON file"""
     SUMMARIES_DIR.mkdir(parents=True, exist_ok=True)
     
@@ -145,85 +554,168 @@ def save_summary(item_id, summary_data, title):
         "video_id": item_id,
         "title": title,
         **summary_data,
-        "generated_at": datetime.utcnow().isoformat() + "Z"
+        "generated_at": (provenance or {}).get("generated_at") or datetime.utcnow().isoformat() + "Z",
     }
+    if provenance:
+        output["provenance"] = provenance
     
     filepath = SUMMARIES_DIR / f"{item_id}.json"
     
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
+    storage.write_json(filepath, output)
 
 
-def update_feed_with_summary(feeds_data, item_id):
-    """Update feed item to mark it has summary"""
-    for item in feeds_data.get("items", []):
-        if item["id"] == item_id:
-            item["hasSummary"] = True
-            break
+def update_feed_with_summary(updates, item_id):
+    """Record that a feed item has a summary, for the next save"""
+    updates[item_id] = {"hasSummary": True}
 
 
-def generate_all_summaries():
-    """Generate summaries for all transcripts"""
-    if not FEEDS_FILE.exists():
+def save_feeds_data(updates):
+    """
+    Merge pending item updates into feeds.json (and the sharded store)
+
+    feeds.json is re-read under its lock, so a transcript.py or
+    fetch_all.py run writing it at the same time keeps its changes.
+    """
+    feed_store.update_feeds(updates, FEEDS_FILE)
+    updates.clear()
+
+
+def summarize_item(item, window, chunk_chars=CHUNK_CHARS, chunk_workers=CHUNK_WORKERS,
+                   prompt_version=PROMPT_VERSION):
+    """
+    Load an item's transcript and produce its summary
+
+    Returns:
+        (status, summary_data, provenance) where status is "current" if the
+        published summary already matches the inputs, "legacy" if a summary
+        without provenance was kept (see adopt_legacy_summary), "cached" if
+        it came from the summary cache, "generated" or "failed"
+    """
+    item_id = item["id"]
+    title = item.get("title", item_id)
+    
+    # 读取字幕
+    transcript_data = transcript_store.load_transcript(TRANSCRIPTS_DIR, item_id)
+    
+    cache_key, provenance = summary_inputs(transcript_data, prompt_version, chunk_chars)
+    
+    published = published_provenance(item_id)
+    if published == {} and adopt_legacy_summary(item_id, transcript_data, provenance):
+        return "legacy", None, None
+    published = published or {}
+    if published.get("cache_key") == cache_key or same_inputs(published, provenance):
+        return "current", None, None
+    
+    summary_data = load_cached_summary(cache_key)
+    if summary_data:
+        return "cached", summary_data, provenance
+    
+    with metrics.timer("summary.generate", item_id):
+        summary_data = generate_summary(transcript_data, title, window, chunk_chars,
+                                        chunk_workers, prompt_version)
+    if not summary_data:
+        return "failed", None, None
+    
+    provenance["generated_at"] = datetime.utcnow().isoformat() + "Z"
+    store_cached_summary(cache_key, summary_data, provenance)
+    return "generated", summary_data, provenance
+
+
+def generate_all_summaries(max_in_flight=MAX_IN_FLIGHT, chunk_chars=CHUNK_CHARS,
+                           chunk_workers=CHUNK_WORKERS, prompt_version=PROMPT_VERSION):
+    """
+    Generate summaries for all transcripts
+
+    A summary is only requested from the LLM when no cached summary
+    matches the transcript, prompt version, model and chunking params.
+    Summaries written before provenance was recorded are kept, and get
+    their provenance recorded, unless the transcript is newer than them.
+
+    Up to max_in_flight LLM requests run at once, counting the chunk
+    requests of long transcripts; the window adapts to rate-limit
+    responses. feeds.json is checkpointed every CHECKPOINT_EVERY
+    summaries and once more at the end.
+    """
+    items = item_store.load_items(FEEDS_FILE)
+    if items is None:
         print("No feeds.json found.")
         return
     
-    with open(FEEDS_FILE, "r", encoding="utf-8") as f:
-        feeds_data = json.load(f)
-    
-    # 获取所有有字幕的视频
+    # 获取所有有字幕的视频（规范条目已有字幕的重复条目除外）
+    by_id = {item["id"]: item for item in items}
     items_with_transcript = [
-        item for item in feeds_data.get("items", [])
-        if item.get("hasTranscript", False)
+        item for item in items
+        if item.get("hasTranscript") and not dedup.covered_by_canonical(item, by_id)
     ]
     
     print(f"Found {len(items_with_transcript)} items with transcripts")
     
-    generated = 0
-    skipped = 0
-    failed = 0
+    counts = {"generated": 0, "cached": 0, "current": 0, "legacy": 0, "failed": 0}
+    updates = {}  # item id -> fields not yet written to feeds.json
+    pending = []
     
     for item in items_with_transcript:
         item_id = item["id"]
-        title = item.get("title", item_id)
-        
-        # 检查是否已有摘要
-        summary_file = SUMMARIES_DIR / f"{item_id}.json"
-        if summary_file.exists():
-            skipped += 1
-            continue
         
         # 检查是否有字幕文件
-        transcript_file = TRANSCRIPTS_DIR / f"{item_id}.json"
-        if not transcript_file.exists():
+        if not transcript_store.transcript_exists(TRANSCRIPTS_DIR, item_id):
             continue
         
-        print(f"  Generating summary: {title[:50]}...")
-        
-        # 读取字幕
-        with open(transcript_file, "r", encoding="utf-8") as f:
-            transcript_data = json.load(f)
-        
-        # 生成摘要
-        summary_data = generate_summary(transcript_data, title)
+        pending.append(item)
+    
+    print(f"Checking {len(pending)} items (prompt {prompt_version}), up to {max_in_flight} in flight...")
+    
+    window = AdaptiveWindow(max_in_flight)
+    executor = ThreadPoolExecutor(max_workers=max(1, max_in_flight))
+    try:
+        futures = {
+            executor.submit(summarize_item, item, window, chunk_chars, chunk_workers, prompt_version): item
+            for item in pending
+        }
         
-        if summary_data:
-            save_summary(item_id, summary_data, title)
-            update_feed_with_summary(feeds_data, item_id)
-            generated += 1
-            print(f"    ✓ Generated {len(summary_data.get('key_points', []))} key points")
-        else:
-            failed += 1
-            print(f"    ✗ Failed to generate summary")
-    
-    # 保存更新后的 feeds
-    with open(FEEDS_FILE, "w", encoding="utf-8") as f:
-        json.dump(feeds_data, f, ensure_ascii=False, indent=2)
+        for future in as_completed(futures):
+            item = futures[future]
+            item_id = item["id"]
+            title = item.get("title", item_id)
+            
+            try:
+                status, summary_data, provenance = future.result()
+            except Exception as e:
+                print(f"  ! Error summarizing {item_id}: {e}")
+                status, summary_data, provenance = "failed", None, None
+            
+            counts[status] += 1
+            
+            if summary_data:
+                save_summary(item_id, summary_data, title, provenance)
+                if not item.get("hasSummary"):
+                    update_feed_with_summary(updates, item_id)
+                source = "from cache" if status == "cached" else "generated"
+                print(f"  ✓ {title[:50]}: {len(summary_data.get('key_points', []))} key points ({source})")
+                
+                if updates and (counts["generated"] + counts["cached"]) % CHECKPOINT_EVERY == 0:
+                    save_feeds_data(updates)
+            elif status == "failed":
+                print(f"  ✗ {title[:50]}: Failed to generate summary")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        # 保存更新后的 feeds
+        if updates:
+            save_feeds_data(updates)
     
     print(f"\nSummary generation complete:")
-    print(f"  Generated: {generated}")
-    print(f"  Skipped (existing): {skipped}")
-    print(f"  Failed: {failed}")
+    print(f"  Generated: {counts['generated']}")
+    print(f"  From cache: {counts['cached']}")
+    print(f"  Skipped (up to date): {counts['current'] + counts['legacy']}")
+    print(f"  Failed: {counts['failed']}")
+    print(f"  HTTP retries: {http_client.stats()['retries']}")
+    
+    metrics.add_counters("summaries", counts)
+    metrics.add_counters("http", http_client.stats())
+    metrics.write_run("summarize", {
+        "max_in_flight": max_in_flight,
+        "prompt_version": prompt_version,
+    })
 
 
 if __name__ == "__main__":
@@ -231,7 +723,19 @@ if __name__ == "__main__":
     # 禁用输出缓冲
     sys.stdout.reconfigure(line_buffering=True)
     
+    parser = argparse.ArgumentParser(description="Generate summaries for transcripts")
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT,
+                        help=f"concurrent LLM requests (default: {MAX_IN_FLIGHT})")
+    parser.add_argument("--chunk-chars", type=int, default=CHUNK_CHARS,
+                        help=f"text budget per chunk for long transcripts (default: {CHUNK_CHARS})")
+    parser.add_argument("--chunk-workers", type=int, default=CHUNK_WORKERS,
+                        help=f"chunks of one transcript summarized at once (default: {CHUNK_WORKERS})")
+    parser.add_argument("--prompt-version", default=PROMPT_VERSION, choices=sorted(PROMPT_TEMPLATES),
+                        help=f"prompt template to use (default: {PROMPT_VERSION})")
+    args = parser.parse_args()
+    
     print("=" * 50)
     print("Oasis AI Summary Generator")
     print("=" * 50)
-    generate_all_summaries()
+    generate_all_summaries(max_in_flight=args.max_in_flight, chunk_chars=args.chunk_chars,
+                           chunk_workers=args.chunk_workers, prompt_version=args.prompt_version)
@@ -4,16 +4,135 @@ Transcript Fetcher
 Fetches video transcripts/subtitles from YouTube and Bilibili
 """
 
-import json
+import argparse
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 
+import dedup
+import feed_store
+import http_client
+import item_store
+import metrics
+import transcript_store
+from ratelimit import TokenBucket
+from transcript_ledger import (
+    ERROR, NO_CAPTIONS, UNAVAILABLE, AttemptLedger, TranscriptUnavailable,
+)
+
 # Paths
 SCRIPT_DIR = Path(__file__).parent
 DATA_DIR = SCRIPT_DIR.parent / "data"
 FEEDS_FILE = DATA_DIR / "feeds.json"
 TRANSCRIPTS_DIR = DATA_DIR / "transcripts"
+ATTEMPTS_FILE = DATA_DIR / "cache" / "transcript_attempts.json"
+
+# Concurrency settings
+MAX_WORKERS = 4
+CHECKPOINT_EVERY = 10  # Write feeds.json after this many new transcripts
+
+# Per-platform request rate (requests/second, burst) and requests per video
+PLATFORM_RATES = {
+    "youtube": (2.0, 4),
+    "bilibili": (4.0, 6),
+}
+REQUESTS_PER_VIDEO = {
+    "youtube": 2,  # list + fetch
+    "bilibili": 3,  # view + player/v2 + subtitle JSON
+}
+
+BILIBILI_API = "https://api.bilibili.com"
+CAPTION_LANGUAGES = ['en', 'zh-Hans', 'zh-Hant', 'zh']
+# Bilibili view API codes for videos that are gone: not found, invisible, under review
+BILIBILI_UNAVAILABLE_CODES = (-404, 62002, 62004)
+
+# Failed attempts and when to retry them, shared with pipeline.py
+ledger = AttemptLedger(ATTEMPTS_FILE)
+
+
+# Caption normalization (YouTube auto-captions overlap and roll)
+SENTENCE_END_RE = re.compile(r'[.!?。！？…]["\'”’)）]*$')
+SEGMENT_MAX_CHARS = 240  # Close a merged segment at this length even without punctuation
+SEGMENT_MAX_SECONDS = 20.0
+ROLLING_OVERLAP_WORDS = 12  # Longest repeated prefix looked for in a rolling caption
+MIN_OVERLAP_WORDS = 2  # Shorter repeats are usually genuine ("the" / "the")
+
+
+def strip_rolling_prefix(previous, text):
+    """
+    Remove the words at the start of a caption that repeat the end of the
+    previous caption
+
+    Returns:
+        the new part of text ("" if it repeats the previous caption entirely)
+    """
+    if text == previous:
+        return ""
+    prev_words = previous.split()
+    words = text.split()
+    longest = min(ROLLING_OVERLAP_WORDS, len(prev_words), len(words))
+    for k in range(longest, MIN_OVERLAP_WORDS - 1, -1):
+        if prev_words[-k:] == words[:k]:
+            return " ".join(words[k:])
+    return text
+
+
+def normalize_segments(segments):
+    """
+    Merge overlapping and rolling caption segments into sentence-level,
+    non-overlapping segments
+
+    One pass over the segments: each caption is clipped so it ends where
+    the next one starts (or starts where the previous one ended), text
+    repeated from the previous caption is dropped, and captions are joined
+    until one ends a sentence or the merged segment reaches
+    SEGMENT_MAX_CHARS / SEGMENT_MAX_SECONDS.
+    Merged segments start and end on original caption boundaries, so no
+    timestamp is interpolated.
+    """
+    merged = []
+    parts = []
+    start = end = None
+    previous = ""
+    
+    def flush():
+        if parts:
+            merged.append({"start": start, "end": end, "text": " ".join(parts)})
+    
+    for i, seg in enumerate(segments):
+        text = " ".join(seg["text"].split())
+        new_text = strip_rolling_prefix(previous, text)
+        if text:
+            previous = text
+        
+        seg_end = seg["end"]
+        if i + 1 < len(segments) and segments[i + 1]["start"] > seg["start"]:
+            seg_end = min(seg_end, segments[i + 1]["start"])
+        
+        if not new_text:
+            # Pure repeat: it only extends the current segment in time
+            if parts:
+                end = max(end, seg_end)
+            continue
+        
+        if parts and (len(" ".join(parts)) + len(new_text) > SEGMENT_MAX_CHARS
+                      or seg_end - start > SEGMENT_MAX_SECONDS):
+            flush()
+            parts = []
+        
+        if not parts:
+            # Captions sharing a start time would overlap the previous segment
+            start = max(seg["start"], merged[-1]["end"]) if merged else seg["start"]
+        parts.append(new_text)
+        end = max(seg_end, start)
+        
+        if SENTENCE_END_RE.search(new_text):
+            flush()
+            parts = []
+    
+    flush()
+    return merged
 
 
 def fetch_youtube_transcript(video_id):
@@ -24,10 +143,15 @@ def fetch_youtube_transcript(video_id):
         video_id: YouTube video ID
     
     Returns:
-        dict with transcript data or None if not available
+        dict with transcript data, or None on a request error
+    
+    Raises:
+        TranscriptUnavailable if the video is gone or has no captions
     """
     try:
-        from youtube_transcript_api import YouTubeTranscriptApi
+        from youtube_transcript_api import (
+            InvalidVideoId, NoTranscriptFound, TranscriptsDisabled, VideoUnavailable, YouTubeTranscriptApi,
+        )
     except ImportError:
         print("  ! youtube-transcript-api not installed")
         return None
@@ -37,7 +161,12 @@ def fetch_youtube_transcript(video_id):
         api = YouTubeTranscriptApi()
         
         # Try to get transcript in preferred languages
-        transcript_list = api.list(video_id)
+        try:
+            transcript_list = api.list(video_id)
+        except TranscriptsDisabled:
+            raise TranscriptUnavailable(NO_CAPTIONS, "captions disabled")
+        except (VideoUnavailable, InvalidVideoId):
+            raise TranscriptUnavailable(UNAVAILABLE, "video unavailable")
         
         # Prefer manual transcripts over auto-generated
         transcript = None
@@ -45,28 +174,27 @@ def fetch_youtube_transcript(video_id):
         
         # Try to find manual transcript first
         try:
-            transcript = transcript_list.find_manually_created_transcript(['en', 'zh-Hans', 'zh-Hant', 'zh'])
+            transcript = transcript_list.find_manually_created_transcript(CAPTION_LANGUAGES)
             language = transcript.language_code
-        except:
+        except NoTranscriptFound:
             pass
         
         # Fall back to auto-generated
         if not transcript:
             try:
-                transcript = transcript_list.find_generated_transcript(['en', 'zh-Hans', 'zh-Hant', 'zh'])
+                transcript = transcript_list.find_generated_transcript(CAPTION_LANGUAGES)
                 language = transcript.language_code
-            except:
+            except NoTranscriptFound:
                 pass
         
         if not transcript:
-            return None
+            raise TranscriptUnavailable(NO_CAPTIONS, "no captions in " + ", ".join(CAPTION_LANGUAGES))
         
         # Fetch the actual transcript
         transcript_data = transcript.fetch()
         
         # Build segments
         segments = []
-        full_text_parts = []
         
         for item in transcript_data:
             segment = {
@@ -75,12 +203,13 @@ def fetch_youtube_transcript(video_id):
                 "text": item.text
             }
             segments.append(segment)
-            full_text_parts.append(item.text)
         
-        full_text = ' '.join(full_text_parts)
+        segments = normalize_segments(segments)
+        full_text = ' '.join(seg["text"] for seg in segments)
         
         return {
             "source": "youtube_caption",
+            "normalized": True,
             "language": language,
             "full_text": full_text,
             "segments": segments,
@@ -88,6 +217,8 @@ def fetch_youtube_transcript(video_id):
             "fetched_at": datetime.utcnow().isoformat() + "Z"
         }
         
+    except TranscriptUnavailable:
+        raise
     except Exception as e:
         print(f"  ! Error fetching YouTube transcript: {e}")
         return None
@@ -101,28 +232,28 @@ def fetch_bilibili_transcript(bvid):
         bvid: Bilibili BV ID
     
     Returns:
-        dict with transcript data or None if not available
-    """
-    try:
-        import requests
-    except ImportError:
-        return None
+        dict with transcript data, or None on a request error
     
+    Raises:
+        TranscriptUnavailable if the video is gone or has no CC subtitles
+    """
     try:
         # First, get video info to find subtitle URL
         # This is a simplified approach - bilibili-api-python provides more robust methods
         
         # Get cid from video page
-        video_url = f"https://api.bilibili.com/x/web-interface/view?bvid={bvid}"
+        video_url = f"{BILIBILI_API}/x/web-interface/view?bvid={bvid}"
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
         
-        resp = requests.get(video_url, headers=headers, timeout=10)
+        resp = http_client.get(video_url, headers=headers, timeout=10)
         if resp.status_code != 200:
             return None
         
         data = resp.json()
+        if data.get("code") in BILIBILI_UNAVAILABLE_CODES:
+            raise TranscriptUnavailable(UNAVAILABLE, data.get("message") or "video unavailable")
         if data.get("code") != 0:
             return None
         
@@ -133,8 +264,8 @@ def fetch_bilibili_transcript(bvid):
             return None
         
         # Get subtitle list
-        subtitle_url = f"https://api.bilibili.com/x/player/v2?cid={cid}&aid={aid}&bvid={bvid}"
-        resp = requests.get(subtitle_url, headers=headers, timeout=10)
+        subtitle_url = f"{BILIBILI_API}/x/player/v2?cid={cid}&aid={aid}&bvid={bvid}"
+        resp = http_client.get(subtitle_url, headers=headers, timeout=10)
         
         if resp.status_code != 200:
             return None
@@ -143,7 +274,7 @@ def fetch_bilibili_transcript(bvid):
         subtitles = data.get("data", {}).get("subtitle", {}).get("subtitles", [])
         
         if not subtitles:
-            return None
+            raise TranscriptUnavailable(NO_CAPTIONS, "no CC subtitles")
         
         # Get the first available subtitle
         subtitle_info = subtitles[0]
@@ -157,7 +288,7 @@ def fetch_bilibili_transcript(bvid):
             subtitle_json_url = "https:" + subtitle_json_url
         
         # Fetch subtitle content
-        resp = requests.get(subtitle_json_url, headers=headers, timeout=10)
+        resp = http_client.get(subtitle_json_url, headers=headers, timeout=10)
         if resp.status_code != 200:
             return None
         
@@ -165,7 +296,7 @@ def fetch_bilibili_transcript(bvid):
         body = subtitle_data.get("body", [])
         
         if not body:
-            return None
+            raise TranscriptUnavailable(NO_CAPTIONS, "empty CC subtitles")
         
         # Build segments
         segments = []
@@ -191,95 +322,244 @@ def fetch_bilibili_transcript(bvid):
             "fetched_at": datetime.utcnow().isoformat() + "Z"
         }
         
+    except TranscriptUnavailable:
+        raise
     except Exception as e:
         print(f"  ! Error fetching Bilibili transcript: {e}")
         return None
 
 
 def save_transcript(item_id, transcript_data):
-    """Save transcript to JSON file"""
-    TRANSCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
+    """Save transcript in the configured storage format (see transcript_store)"""
+    transcript_store.save_transcript(TRANSCRIPTS_DIR, item_id, transcript_data)
+
+
+def transcript_fields(transcript_data):
+    """Feed item fields for a transcript"""
+    # Add preview (first 200 chars)
+    full_text = transcript_data.get("full_text", "")
+    return {
+        "hasTranscript": True,
+        "transcriptPreview": full_text[:200] + "..." if len(full_text) > 200 else full_text,
+    }
+
+
+def update_feed_with_transcript(updates, item_id, transcript_data):
+    """Record the transcript fields of a feed item for the next save"""
+    updates[item_id] = transcript_fields(transcript_data)
+
+
+def save_feeds_data(updates):
+    """
+    Merge pending item updates into feeds.json (and the sharded store)
+
+    feeds.json is re-read under its lock, so a summarize.py or
+    fetch_all.py run writing it at the same time keeps its changes.
+    """
+    feed_store.update_feeds(updates, FEEDS_FILE)
+    updates.clear()
+
+
+def fetch_transcript(item):
+    """Fetch the transcript for a single video item"""
+    item_id = item["id"]
+    
+    if item["platform"] == "youtube":
+        # Extract video ID
+        video_id = item_id.replace("yt_", "")
+        return fetch_youtube_transcript(video_id)
     
-    filepath = TRANSCRIPTS_DIR / f"{item_id}.json"
+    elif item["platform"] == "bilibili":
+        # Extract BV ID
+        bvid = item_id.replace("bl_", "")
+        return fetch_bilibili_transcript(bvid)
     
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(transcript_data, f, ensure_ascii=False, indent=2)
+    return None
+
+
+def fetch_and_record(item):
+    """
+    Fetch an item's transcript and record the outcome in the attempt ledger
+
+    Returns:
+        (transcript_data, None) on success, (None, failure reason) otherwise
+    """
+    try:
+        transcript_data = fetch_transcript(item)
+    except TranscriptUnavailable as e:
+        ledger.record_failure(item["id"], e.reason)
+        return None, e.reason
+    if not transcript_data:
+        ledger.record_failure(item["id"], ERROR)
+        return None, ERROR
+    ledger.record_success(item["id"])
+    return transcript_data, None
 
 
-def update_feed_with_transcript(feeds_data, item_id, transcript_data):
-    """Update feed item with transcript info"""
-    for item in feeds_data.get("items", []):
-        if item["id"] == item_id:
-            item["hasTranscript"] = True
-            # Add preview (first 200 chars)
-            full_text = transcript_data.get("full_text", "")
-            item["transcriptPreview"] = full_text[:200] + "..." if len(full_text) > 200 else full_text
-            break
+FAILURE_LABELS = {
+    NO_CAPTIONS: "No captions",
+    UNAVAILABLE: "Video unavailable",
+    ERROR: "Failed, will retry",
+}
 
 
-def fetch_all_transcripts():
-    """Fetch transcripts for all video items in feeds.json"""
-    if not FEEDS_FILE.exists():
+def fetch_all_transcripts(workers=MAX_WORKERS, retry_all=False):
+    """
+    Fetch transcripts for all video items in feeds.json
+
+    Videos are fetched by a worker pool, rate-limited per platform. Each
+    transcript is saved as soon as it arrives and feeds.json is
+    checkpointed every CHECKPOINT_EVERY transcripts, so an interrupted
+    run resumes where it stopped.
+
+    Failed attempts are kept in the attempt ledger, and an item is only
+    retried once its backoff has passed (see transcript_ledger), unless
+    retry_all is set.
+    """
+    items = item_store.load_items(FEEDS_FILE)
+    if items is None:
         print("No feeds.json found. Run fetch_all.py first.")
         return
     
-    with open(FEEDS_FILE, "r", encoding="utf-8") as f:
-        feeds_data = json.load(f)
+    # Duplicates share the canonical item's transcript while it has or may still get one
+    by_id = {item["id"]: item for item in items}
+    video_items = [
+        item for item in items
+        if item["platform"] in dedup.VIDEO_PLATFORMS and not dedup.covered_by_canonical(item, by_id, ledger)
+    ]
     
-    items = feeds_data.get("items", [])
-    video_items = [i for i in items if i["platform"] in ("youtube", "bilibili")]
+    updates = {}  # item id -> fields not yet written to feeds.json
     
     print(f"Found {len(video_items)} video items to process")
     
-    fetched = 0
-    skipped = 0
-    failed = 0
+    counts = {"fetched": 0, "skipped": 0, "deferred": 0, NO_CAPTIONS: 0, UNAVAILABLE: 0, ERROR: 0}
+    pending = []
     
     for item in video_items:
         item_id = item["id"]
         
         # Skip if transcript already exists
-        transcript_file = TRANSCRIPTS_DIR / f"{item_id}.json"
-        if transcript_file.exists():
-            skipped += 1
+        if transcript_store.transcript_exists(TRANSCRIPTS_DIR, item_id):
+            counts["skipped"] += 1
+            # Restore the flag if a previous run was interrupted before saving feeds.json
+            if not item.get("hasTranscript"):
+                # Only the preview is needed; .otr files are read lazily
+                with transcript_store.open_transcript(TRANSCRIPTS_DIR, item_id) as reader:
+                    update_feed_with_transcript(updates, item_id, {"full_text": reader.preview(201)})
             continue
         
-        print(f"  Fetching: {item.get('title', item_id)[:50]}...")
-        
-        transcript = None
+        # Skip failed items until their retry time
+        if not retry_all and not ledger.is_due(item_id):
+            counts["deferred"] += 1
+            continue
         
-        if item["platform"] == "youtube":
-            # Extract video ID
-            video_id = item_id.replace("yt_", "")
-            transcript = fetch_youtube_transcript(video_id)
-        
-        elif item["platform"] == "bilibili":
-            # Extract BV ID
-            bvid = item_id.replace("bl_", "")
-            transcript = fetch_bilibili_transcript(bvid)
-        
-        if transcript:
-            save_transcript(item_id, transcript)
-            update_feed_with_transcript(feeds_data, item_id, transcript)
-            fetched += 1
-            print(f"    ✓ Got {transcript['word_count']} words")
-        else:
-            failed += 1
-            print(f"    ✗ No transcript available")
+        pending.append(item)
+    
+    buckets = {
+        platform: TokenBucket(rate, burst)
+        for platform, (rate, burst) in PLATFORM_RATES.items()
+    }
+    
+    def run(item):
+        buckets[item["platform"]].acquire(REQUESTS_PER_VIDEO[item["platform"]])
+        with metrics.timer(f"transcript.{item['platform']}", item["id"]):
+            return fetch_and_record(item)
+    
+    print(f"Fetching {len(pending)} transcripts with {workers} workers...")
     
-    # Save updated feeds
-    with open(FEEDS_FILE, "w", encoding="utf-8") as f:
-        json.dump(feeds_data, f, ensure_ascii=False, indent=2)
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        futures = {executor.submit(run, item): item for item in pending}
+        
+        for future in as_completed(futures):
+            item = futures[future]
+            item_id = item["id"]
+            title = (item.get("title") or item_id)[:50]
+            
+            try:
+                transcript, reason = future.result()
+            except Exception as e:
+                print(f"  ! Error fetching {item_id}: {e}")
+                ledger.record_failure(item_id, ERROR)
+                transcript, reason = None, ERROR
+            
+            if transcript:
+                save_transcript(item_id, transcript)
+                update_feed_with_transcript(updates, item_id, transcript)
+                counts["fetched"] += 1
+                print(f"  ✓ {title}: {transcript['word_count']} words")
+                
+                if counts["fetched"] % CHECKPOINT_EVERY == 0:
+                    save_feeds_data(updates)
+                    ledger.save()
+            else:
+                counts[reason] += 1
+                print(f"  ✗ {title}: {FAILURE_LABELS[reason]}")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        # Save updated feeds
+        if updates:
+            save_feeds_data(updates)
+        ledger.prune(i["id"] for i in video_items)
+        ledger.save()
     
     print(f"\nTranscript fetch complete:")
-    print(f"  Fetched: {fetched}")
-    print(f"  Skipped (existing): {skipped}")
-    print(f"  Failed/unavailable: {failed}")
+    print(f"  Fetched: {counts['fetched']}")
+    print(f"  Skipped (existing): {counts['skipped']}")
+    print(f"  Deferred (retry later): {counts['deferred']}")
+    print(f"  No captions: {counts[NO_CAPTIONS]}")
+    print(f"  Unavailable: {counts[UNAVAILABLE]}")
+    print(f"  Failed (will retry): {counts[ERROR]}")
+    print(f"  HTTP retries: {http_client.stats()['retries']}")
+    
+    metrics.add_counters("transcripts", counts)
+    metrics.add_counters("http", http_client.stats())
+    metrics.write_run("transcript", {"workers": workers})
+
+
+def renormalize_transcripts():
+    """Apply normalize_segments() to stored YouTube transcripts saved before it existed"""
+    updated = 0
+    before = after = 0
+    
+    for path in sorted(TRANSCRIPTS_DIR.glob("yt_*.*")):
+        item_id = path.stem
+        transcript = transcript_store.load_transcript(TRANSCRIPTS_DIR, item_id)
+        if not transcript or transcript.get("normalized") or transcript.get("source") != "youtube_caption":
+            continue
+        
+        segments = normalize_segments(transcript["segments"])
+        full_text = ' '.join(seg["text"] for seg in segments)
+        before += len(transcript["segments"])
+        after += len(segments)
+        
+        transcript.update({
+            "normalized": True,
+            "full_text": full_text,
+            "segments": segments,
+            "word_count": len(full_text.split()),
+        })
+        save_transcript(item_id, transcript)
+        updated += 1
+    
+    print(f"Normalized {updated} transcripts: {before} -> {after} segments")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch transcripts for video items")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help=f"videos fetched at once (default: {MAX_WORKERS})")
+    parser.add_argument("--renormalize", action="store_true",
+                        help="merge overlapping caption segments in stored YouTube transcripts and exit")
+    parser.add_argument("--retry-all", action="store_true",
+                        help="also retry videos that failed recently (ignore the attempt ledger backoff)")
+    args = parser.parse_args()
+    
     print("=" * 50)
     print("Oasis Transcript Fetcher")
     print("=" * 50)
-    fetch_all_transcripts()
+    if args.renormalize:
+        renormalize_transcripts()
+    else:
+        fetch_all_transcripts(workers=args.workers, retry_all=args.retry_all)
 
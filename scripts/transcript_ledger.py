@@ -0,0 +1,122 @@
+"""
+Transcript Attempt Ledger
+Remembers videos whose transcript couldn't be fetched, why, and when to
+try again
+
+Each failed item gets an entry with the failure reason, the number of
+attempts and the first/last attempt times. Retries back off exponentially
+per reason: a video without captions is retried rarely (auto-captions can
+appear hours after upload, so it isn't written off at once), a transient
+error (network, rate limit) soon. Permanent failures (audio too long to
+transcribe) are not retried at all. A successful fetch removes the entry.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import storage
+
+# Failure reasons
+NO_CAPTIONS = "no_captions"  # The video has no usable captions
+UNAVAILABLE = "unavailable"  # Deleted, private or region-locked
+ERROR = "error"  # Network/API error, worth retrying soon
+TOO_LONG = "too_long"  # Longer than the stage accepts, never retried
+
+PERMANENT = {TOO_LONG}
+
+# Backoff per reason: (first retry after, cap), in seconds; doubles per attempt
+BACKOFF = {
+    NO_CAPTIONS: (12 * 3600, 30 * 86400),
+    UNAVAILABLE: (3 * 86400, 90 * 86400),
+    ERROR: (3600, 86400),
+}
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+def retry_delay(reason, attempts):
+    """Seconds to wait before attempt number attempts + 1"""
+    base, cap = BACKOFF.get(reason, BACKOFF[ERROR])
+    return min(cap, base * 2 ** (max(attempts, 1) - 1))
+
+
+class TranscriptUnavailable(Exception):
+    """Raised by the transcript fetchers when the platform says there is no transcript"""
+
+    def __init__(self, reason, message=""):
+        super().__init__(message or reason)
+        self.reason = reason
+
+
+class AttemptLedger(storage.JsonTable):
+    """
+    Persistent per-item transcript attempts
+
+    Entries: {item_id: {"reason", "attempts", "first_attempt",
+    "last_attempt", "retry_after"}} with ISO timestamps. Thread-safe; the
+    file is written by save() only if something changed.
+    """
+
+    def get(self, item_id):
+        with self.lock:
+            entry = self.entries().get(item_id)
+            return dict(entry) if entry else None
+
+    def is_due(self, item_id, now=None):
+        """Whether an item should be attempted (never failed, or its backoff has passed and the failure isn't permanent)"""
+        with self.lock:
+            entry = self.entries().get(item_id)
+        if not entry:
+            return True
+        if entry.get("reason") in PERMANENT:
+            return False
+        try:
+            retry_after = datetime.fromisoformat(entry["retry_after"])
+        except (KeyError, TypeError, ValueError):
+            return True
+        return (now or utcnow()) >= retry_after
+
+    def record_failure(self, item_id, reason, now=None):
+        """Record a failed attempt and schedule the next one"""
+        now = now or utcnow()
+        with self.lock:
+            entry = self.entries().setdefault(item_id, {
+                "reason": reason,
+                "attempts": 0,
+                "first_attempt": now.isoformat(),
+            })
+            entry["reason"] = reason
+            entry["attempts"] += 1
+            entry["last_attempt"] = now.isoformat()
+            if reason in PERMANENT:
+                entry["retry_after"] = None
+            else:
+                delay = retry_delay(reason, entry["attempts"])
+                entry["retry_after"] = (now + timedelta(seconds=delay)).isoformat()
+            self.mark_dirty()
+            return dict(entry)
+
+    def record_success(self, item_id):
+        """Forget an item once its transcript was fetched"""
+        with self.lock:
+            if self.entries().pop(item_id, None) is not None:
+                self.mark_dirty()
+
+    def prune(self, item_ids):
+        """Drop entries of items that are no longer in feeds.json"""
+        keep = set(item_ids)
+        with self.lock:
+            entries = self.entries()
+            for item_id in list(entries):
+                if item_id not in keep:
+                    del entries[item_id]
+                    self.mark_dirty()
+
+    def counts(self):
+        """Number of entries per failure reason"""
+        with self.lock:
+            counts = {}
+            for entry in self.entries().values():
+                counts[entry["reason"]] = counts.get(entry["reason"], 0) + 1
+            return counts
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Transcript Storage
+Reads and writes transcripts as JSON or in the compact .otr format
+
+The .otr format stores the segment text once, as a single UTF-8 blob, with
+the segment start/end times as packed arrays and a uint32 array of byte
+offsets into the blob:
+
+    magic        b"OTR1"
+    compression  u8 (0 = none, 1 = gzip, 2 = zstd); the rest is compressed
+    header_len   u32, followed by a JSON header (source, language, ...)
+    starts       uint32[count], centiseconds
+    ends         uint32[count], centiseconds
+    offsets      uint32[count + 1], segment i = blob[offsets[i]:offsets[i+1] - 1]
+    blob         " ".join(segment texts), which is also full_text
+
+All numbers are little-endian. Times are stored as fixed-point centiseconds
+rather than floats: the fetchers round them to 0.01 s anyway, the values
+round-trip exactly, and dividing by 100 on read is much cheaper than
+rounding floats.
+
+JSON stays the default format because the web frontend imports
+data/transcripts/{id}.json directly; set OASIS_TRANSCRIPT_FORMAT=otr to
+write compact files.
+
+TranscriptReader gives random access (time ranges, previews); for .otr
+files it does so without decoding the whole transcript, and uncompressed
+.otr files are memory-mapped. JSON files are parsed whole.
+
+Usage:
+    python transcript_store.py convert [--compression gzip] [--keep-json]
+    python transcript_store.py stats
+"""
+
+import argparse
+import gzip
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from pathlib import Path
+
+import storage
+
+# Paths
+SCRIPT_DIR = Path(__file__).parent
+DATA_DIR = SCRIPT_DIR.parent / "data"
+TRANSCRIPTS_DIR = DATA_DIR / "transcripts"
+
+# Storage settings
+TRANSCRIPT_FORMAT = os.environ.get("OASIS_TRANSCRIPT_FORMAT", "json")  # json / otr
+TRANSCRIPT_COMPRESSION = os.environ.get("OASIS_TRANSCRIPT_COMPRESSION", "none")  # none / gzip / zstd
+
+MAGIC = b"OTR1"
+COMPRESSIONS = {"none": 0, "gzip": 1, "zstd": 2}
+EXTENSIONS = {"json": ".json", "otr": ".otr"}
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstandard not installed (pip install zstandard)")
+    return zstandard
+
+
+def _le(values):
+    """array in little-endian byte order"""
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def encode(transcript_data, compression="none"):
+    """
+    Encode a transcript dict as .otr bytes
+
+    Args:
+        transcript_data: dict with full_text, segments and metadata
+        compression: none / gzip / zstd
+
+    Returns:
+        bytes
+    """
+    segments = transcript_data.get("segments", [])
+    texts = [seg.get("text", "") for seg in segments]
+    blob = " ".join(texts)
+
+    header = {k: v for k, v in transcript_data.items() if k not in ("full_text", "segments")}
+    header["count"] = len(segments)
+    if transcript_data.get("full_text", blob) != blob:
+        header["full_text"] = transcript_data["full_text"]
+
+    offsets = array("I", [0])
+    for text in texts:
+        offsets.append(offsets[-1] + len(text.encode("utf-8")) + 1)
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    payload = b"".join([
+        struct.pack("<I", len(header_bytes)),
+        header_bytes,
+        _le(array("I", [round(seg["start"] * 100) for seg in segments])).tobytes(),
+        _le(array("I", [round(seg["end"] * 100) for seg in segments])).tobytes(),
+        _le(offsets).tobytes(),
+        blob.encode("utf-8"),
+    ])
+
+    if compression == "gzip":
+        payload = gzip.compress(payload, mtime=0)
+    elif compression == "zstd":
+        payload = _zstd().ZstdCompressor(level=10).compress(payload)
+    elif compression != "none":
+        raise ValueError(f"Unknown compression: {compression}")
+
+    return MAGIC + bytes([COMPRESSIONS[compression]]) + payload
+
+
+def unpack_payload(data):
+    """Return the uncompressed payload of .otr bytes"""
+    if data[:4] != MAGIC:
+        raise ValueError("Not an .otr transcript")
+    compression = data[4]
+    payload = data[5:]
+    if compression == 1:
+        return gzip.decompress(payload)
+    if compression == 2:
+        return _zstd().ZstdDecompressor().decompress(payload)
+    return payload
+
+
+def read_layout(payload, base=0):
+    """
+    Parse the header and locate the arrays inside an uncompressed payload
+
+    Returns:
+        (header, layout) where layout maps starts/ends/offsets/blob to
+        (position, length) in bytes, relative to the start of `payload`
+    """
+    header_len, = struct.unpack_from("<I", payload, base)
+    pos = base + 4
+    header = json.loads(bytes(payload[pos:pos + header_len]).decode("utf-8"))
+    pos += header_len
+    count = header["count"]
+
+    layout = {}
+    for name, size in (("starts", 4 * count), ("ends", 4 * count), ("offsets", 4 * (count + 1))):
+        layout[name] = (pos, size)
+        pos += size
+    layout["blob"] = (pos, len(payload) - pos)
+    return header, layout
+
+
+def read_array(payload, typecode, span):
+    """Read a little-endian array from a payload slice"""
+    pos, size = span
+    values = array(typecode)
+    values.frombytes(bytes(payload[pos:pos + size]))
+    return _le(values)
+
+
+def decode(data):
+    """Decode .otr bytes into the same dict json.load returns"""
+    payload = unpack_payload(data)
+    header, layout = read_layout(payload)
+
+    starts = read_array(payload, "I", layout["starts"]).tolist()
+    ends = read_array(payload, "I", layout["ends"]).tolist()
+    offsets = read_array(payload, "I", layout["offsets"]).tolist()
+    pos, size = layout["blob"]
+    blob = payload[pos:pos + size]
+    text = blob.decode("utf-8")
+    header.pop("count")
+
+    # Byte offsets equal character offsets for ASCII-only text
+    source = text if len(text) == len(blob) else blob
+    segments = [
+        {"start": start / 100, "end": end / 100, "text": source[a:b - 1]}
+        for start, end, a, b in zip(starts, ends, offsets, offsets[1:])
+    ]
+    if source is blob:
+        for seg in segments:
+            seg["text"] = seg["text"].decode("utf-8")
+
+    full_text = header.pop("full_text", None)
+    if full_text is None:
+        full_text = text
+
+    return {**header, "full_text": full_text, "segments": segments}
+
+
+def transcript_path(directory, item_id):
+    """Path of an item's stored transcript in any format, or None"""
+    for ext in (".otr", ".json"):
+        path = Path(directory) / f"{item_id}{ext}"
+        if path.exists():
+            return path
+    return None
+
+
+def transcript_exists(directory, item_id):
+    """Check if a transcript is stored for an item"""
+    return transcript_path(directory, item_id) is not None
+
+
+def load_transcript(directory, item_id):
+    """Load an item's transcript dict, or None if missing"""
+    path = transcript_path(directory, item_id)
+    if path is None:
+        return None
+    if path.suffix == ".otr":
+        return decode(path.read_bytes())
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_transcript(directory, item_id, transcript_data, fmt=None, compression=None):
+    """
+    Save a transcript, replacing any copy stored in another format
+
+    Returns:
+        path written
+    """
+    fmt = fmt or TRANSCRIPT_FORMAT
+    compression = compression or TRANSCRIPT_COMPRESSION
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    path = directory / f"{item_id}{EXTENSIONS[fmt]}"
+    if fmt == "otr":
+        storage.atomic_write(path, encode(transcript_data, compression))
+    else:
+        storage.write_json(path, transcript_data)
+
+    for ext in EXTENSIONS.values():
+        other = directory / f"{item_id}{ext}"
+        if other != path and other.exists():
+            other.unlink()
+
+    return path
+
+
+class TranscriptReader:
+    """
+    Random access to a stored transcript
+
+    Uncompressed .otr files are memory-mapped and only the time/offset
+    arrays are read up front; segment text is decoded on demand.
+    Compressed .otr files are decompressed into memory. JSON files have to
+    be parsed whole; their segments are served from the parsed dict, so
+    every format supports the same API.
+
+    Usage:
+        with open_transcript(TRANSCRIPTS_DIR, item_id) as reader:
+            reader.segments_between(60, 120)
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._mmap = None
+        self._segments = None
+
+        if self.path.suffix == ".otr":
+            with open(self.path, "rb") as f:
+                if f.read(5)[4:] == bytes([COMPRESSIONS["none"]]):
+                    self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._mmap is not None:
+                payload = memoryview(self._mmap)[5:]
+            else:
+                payload = unpack_payload(self.path.read_bytes())
+
+            self._payload = payload
+            self.header, layout = read_layout(payload)
+            self._starts = read_array(payload, "I", layout["starts"])
+            self._ends = read_array(payload, "I", layout["ends"])
+            self._offsets = read_array(payload, "I", layout["offsets"])
+            self._blob = layout["blob"][0]
+        else:
+            with open(self.path, "r", encoding="utf-8") as f:
+                transcript_data = json.load(f)
+            self._segments = transcript_data.get("segments", [])
+            self.header = {k: v for k, v in transcript_data.items() if k != "segments"}
+            self.header["count"] = len(self._segments)
+            self.header.setdefault("full_text", " ".join(seg.get("text", "") for seg in self._segments))
+            self._starts = [round(seg["start"] * 100) for seg in self._segments]
+            self._ends = [round(seg["end"] * 100) for seg in self._segments]
+
+        # Time index: running max of segment ends, so segments that start
+        # early but end late are still found by segments_between()
+        self._max_ends = list(accumulate(self._ends, max))
+
+    def __len__(self):
+        return self.header["count"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Release the memory map"""
+        if self._mmap is not None:
+            self._payload.release()
+            self._mmap.close()
+            self._mmap = None
+
+    def _text(self, start, end):
+        """Decode blob bytes [start, end)"""
+        return bytes(self._payload[self._blob + start:self._blob + end]).decode("utf-8", errors="ignore")
+
+    def segment(self, index):
+        """Segment dict at index"""
+        if self._segments is not None:
+            seg = self._segments[index]
+            return {"start": seg["start"], "end": seg["end"], "text": seg.get("text", "")}
+        return {
+            "start": self._starts[index] / 100,
+            "end": self._ends[index] / 100,
+            "text": self._text(self._offsets[index], self._offsets[index + 1] - 1),
+        }
+
+    def segments_between(self, t0, t1):
+        """Segments overlapping the time range [t0, t1) in seconds"""
+        first = bisect_right(self._max_ends, round(t0 * 100))
+        last = bisect_left(self._starts, round(t1 * 100), lo=first)
+        return [
+            self.segment(i) for i in range(first, last)
+            if self._ends[i] > t0 * 100
+        ]
+
+    def text_at(self, t):
+        """Text of the latest segment that starts at or before t and is still running, or None"""
+        index = bisect_right(self._starts, round(t * 100)) - 1
+        if index >= 0 and self._ends[index] > t * 100:
+            return self.segment(index)["text"]
+        return None
+
+    def preview(self, n=200):
+        """First n characters of the full text"""
+        if "full_text" in self.header:
+            return self.header["full_text"][:n]
+        # A UTF-8 character is at most 4 bytes
+        size = min(4 * n, self._offsets[-1])
+        return self._text(0, size)[:n]
+
+    @property
+    def full_text(self):
+        """Full transcript text"""
+        if "full_text" in self.header:
+            return self.header["full_text"]
+        return self._text(0, max(0, self._offsets[-1] - 1))
+
+
+def open_transcript(directory, item_id):
+    """Open a TranscriptReader for an item, or None if no transcript is stored"""
+    path = transcript_path(directory, item_id)
+    return TranscriptReader(path) if path else None
+
+
+def convert(directory=TRANSCRIPTS_DIR, compression="none", keep_json=False):
+    """Convert every JSON transcript in a directory to .otr"""
+    converted = 0
+    before = 0
+    after = 0
+
+    for path in sorted(Path(directory).glob("*.json")):
+        size = path.stat().st_size
+        with open(path, "r", encoding="utf-8") as f:
+            transcript_data = json.load(f)
+
+        data = encode(transcript_data, compression)
+        if decode(data) != transcript_data:
+            print(f"  ✗ {path.name}: round trip mismatch, left as JSON")
+            continue
+
+        storage.atomic_write(path.parent / f"{path.stem}.otr", data)
+        if not keep_json:
+            path.unlink()
+
+        before += size
+        after += len(data)
+        converted += 1
+
+    print(f"Converted {converted} transcripts: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+
+
+def stats(directory=TRANSCRIPTS_DIR):
+    """Print the size of each storage format for the current transcripts"""
+    totals = {"json": 0, "otr": 0, "otr+gzip": 0}
+    count = 0
+    for path in sorted(Path(directory).glob("*.json")) + sorted(Path(directory).glob("*.otr")):
+        transcript_data = load_transcript(path.parent, path.stem)
+        totals["json"] += len(json.dumps(transcript_data, ensure_ascii=False, indent=2).encode("utf-8"))
+        totals["otr"] += len(encode(transcript_data))
+        totals["otr+gzip"] += len(encode(transcript_data, "gzip"))
+        count += 1
+
+    print(f"{count} transcripts")
+    for name, size in totals.items():
+        print(f"  {name:<10} {size / 1e6:8.2f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcript storage tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = sub.add_parser("convert", help="convert JSON transcripts to .otr")
+    convert_parser.add_argument("--compression", default="none", choices=sorted(COMPRESSIONS))
+    convert_parser.add_argument("--keep-json", action="store_true", help="keep the original JSON files")
+
+    sub.add_parser("stats", help="compare storage format sizes")
+
+    args = parser.parse_args()
+    if args.command == "convert":
+        convert(compression=args.compression, keep_json=args.keep_json)
+    else:
+        stats()
@@ -4,17 +4,28 @@ import { use, useState, useEffect } from 'react';
 import Link from 'next/link';
 import Header from '@/components/Header';
 import { getFeedItem, formatDuration, formatRelativeTime, formatTimestamp, getVideoUrlWithTimestamp, isItemSaved, saveItem, unsaveItem } from '@/lib/data';
-import { PLATFORM_CONFIG, DOMAIN_CONFIG, Domain, Transcript, Summary } from '@/lib/types';
+import { PLATFORM_CONFIG, DOMAIN_CONFIG, Domain, FeedItem, Transcript, Summary } from '@/lib/types';
 
 export default function DetailPage({ params }: { params: Promise<{ id: string }> }) {
   const { id } = use(params);
-  const item = getFeedItem(id);
+  const [item, setItem] = useState<FeedItem | null>(null);
+  const [loadingItem, setLoadingItem] = useState(true);
   const [saved, setSaved] = useState(false);
   const [transcript, setTranscript] = useState<Transcript | null>(null);
   const [loadingTranscript, setLoadingTranscript] = useState(false);
   const [summary, setSummary] = useState<Summary | null>(null);
   const [loadingSummary, setLoadingSummary] = useState(false);
 
+  useEffect(() => {
+    // Only this item's detail file is loaded, not the whole feed
+    setLoadingItem(true);
+    getFeedItem(id)
+      .then(setItem)
+      .finally(() => {
+        setLoadingItem(false);
+      });
+  }, [id]);
+
   useEffect(() => {
     if (item) {
       setSaved(isItemSaved(item.id));
@@ -61,6 +72,17 @@ export default function DetailPage({ params }: { params: Promise<{ id: string }>
     }
   };
 
+  if (loadingItem) {
+    return (
+      <div className="min-h-screen">
+        <Header />
+        <main className="max-w-4xl mx-auto px-6 py-8">
+          <div className="text-center py-16 text-gray-500">Loading...</div>
+        </main>
+      </div>
+    );
+  }
+
   if (!item) {
     return (
       <div className="min-h-screen">
@@ -4,7 +4,7 @@ import { useState, useMemo } from 'react';
 import Header from '@/components/Header';
 import ContentCard from '@/components/ContentCard';
 import FilterBar from '@/components/FilterBar';
-import { getFeeds } from '@/lib/data';
+import { getFeeds } from '@/lib/feeds';
 import { Domain, Platform, FeedItem } from '@/lib/types';
 
 export default function Dashboard() {
@@ -3,14 +3,14 @@
 import { useState, useEffect, useMemo } from 'react';
 import Header from '@/components/Header';
 import ContentCard from '@/components/ContentCard';
-import { getFeeds, getSavedIds, getWatchedIds, markWatched, markUnwatched, unsaveItem } from '@/lib/data';
+import { getFeedItems, getSavedIds, getWatchedIds, markWatched, markUnwatched, unsaveItem } from '@/lib/data';
 import { FeedItem } from '@/lib/types';
 
 type FilterType = 'all' | 'unwatched' | 'watched';
 
 export default function SavedPage() {
-  const feeds = getFeeds();
   const [savedIds, setSavedIds] = useState<string[]>([]);
+  const [savedItems, setSavedItems] = useState<FeedItem[]>([]);
   const [watchedIds, setWatchedIds] = useState<string[]>([]);
   const [filter, setFilter] = useState<FilterType>('all');
   const [refreshKey, setRefreshKey] = useState(0);
@@ -20,10 +20,18 @@ export default function SavedPage() {
     setWatchedIds(getWatchedIds());
   }, [refreshKey]);
 
-  // Get saved items
-  const savedItems = useMemo(() => {
-    return feeds.items.filter(item => savedIds.includes(item.id));
-  }, [feeds.items, savedIds]);
+  // Load only the saved items' detail files, newest first like the feed
+  useEffect(() => {
+    let cancelled = false;
+    getFeedItems(savedIds).then(items => {
+      if (!cancelled) {
+        setSavedItems(items.sort((a, b) => b.published.localeCompare(a.published)));
+      }
+    });
+    return () => {
+      cancelled = true;
+    };
+  }, [savedIds]);
 
   // Filter by watched status
   const filteredItems = useMemo(() => {
@@ -1,16 +1,21 @@
 // Data loading utilities
-import { FeedsData, Transcript, SourcesConfig, FeedItem } from './types';
-import feedsJson from '../data/feeds.json';
+import { Transcript, SourcesConfig, FeedItem } from './types';
 
-// Load feeds data
-export function getFeeds(): FeedsData {
-  return feedsJson as FeedsData;
+// Load a single feed item from its detail file (written by scripts/feed_store.py),
+// so pages that show a few items don't need the whole feed
+export async function getFeedItem(id: string): Promise<FeedItem | null> {
+  try {
+    const item = await import(`../data/feeds/items/${id}.json`);
+    return item.default as FeedItem;
+  } catch {
+    return null;
+  }
 }
 
-// Get a single feed item by ID
-export function getFeedItem(id: string): FeedItem | undefined {
-  const feeds = getFeeds();
-  return feeds.items.find(item => item.id === id);
+// Load feed items by ID, skipping missing ones
+export async function getFeedItems(ids: string[]): Promise<FeedItem[]> {
+  const items = await Promise.all(ids.map(getFeedItem));
+  return items.filter((item): item is FeedItem => item !== null);
 }
 
 // Load transcript for a feed item
@@ -0,0 +1,9 @@
+// The whole feed index, kept out of lib/data so that pages which only show
+// a few items (detail, saved) don't bundle feeds.json
+import { FeedsData } from './types';
+import feedsJson from '../data/feeds.json';
+
+// Load feeds data
+export function getFeeds(): FeedsData {
+  return feedsJson as FeedsData;
+}
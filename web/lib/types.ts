@@ -21,6 +21,7 @@ export interface FeedItem {
   hasTranscript: boolean;
   transcriptPreview?: string | null;
   hasSummary?: boolean;
+  duplicateOf?: string;
 }
 
 export interface FeedsData {